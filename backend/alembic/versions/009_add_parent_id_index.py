@@ -0,0 +1,22 @@
+"""Add index on persons.parent_id
+
+Revision ID: 009_parent_id_index
+Revises: 008_multi_user
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009_parent_id_index'
+down_revision = '008_multi_user'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_persons_parent_id', 'persons', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_persons_parent_id', table_name='persons')
@@ -0,0 +1,43 @@
+"""Add persons.lineage_path (materialized ancestor path) and backfill it
+
+Revision ID: 010_lineage_path
+Revises: 009_parent_id_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '010_lineage_path'
+down_revision = '009_parent_id_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('persons', sa.Column('lineage_path', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    # Walk down from every root; a child's path is its parent's path plus the parent id
+    conn.execute(sa.text("""
+        WITH RECURSIVE lineage(id, path) AS (
+            SELECT id, '/'::text FROM persons WHERE parent_id IS NULL
+            UNION ALL
+            SELECT p.id, l.path || p.parent_id || '/'
+            FROM persons p JOIN lineage l ON p.parent_id = l.id
+        )
+        UPDATE persons SET lineage_path = lineage.path
+        FROM lineage WHERE persons.id = lineage.id
+    """))
+    # Rows caught in a parent_id cycle are unreachable from any root; treat them as roots
+    conn.execute(sa.text("UPDATE persons SET lineage_path = '/' WHERE lineage_path IS NULL"))
+
+    op.create_index(
+        'ix_persons_owner_lineage_path', 'persons', ['owner_id', 'lineage_path'],
+        unique=False, postgresql_ops={'lineage_path': 'text_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_persons_owner_lineage_path', table_name='persons')
+    op.drop_column('persons', 'lineage_path')
@@ -0,0 +1,38 @@
+"""Add composite indexes for tree loads, child lookups and name-ordered pages
+
+Revision ID: 011_tree_access_indexes
+Revises: 010_lineage_path
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011_tree_access_indexes'
+down_revision = '010_lineage_path'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Children of a person in birth order (get_children, subtree CTE, child counts) and roots
+    op.create_index(
+        'ix_persons_owner_parent_birth', 'persons', ['owner_id', 'parent_id', 'birth_date', 'id'], unique=False
+    )
+    # Whole-tree loads (load_persons): the owner's rows already in birth_date, id order
+    op.create_index('ix_persons_owner_birth', 'persons', ['owner_id', 'birth_date', 'id'], unique=False)
+    # /api/persons?order_by=name; the expression must match models.last_name_key
+    op.create_index(
+        'ix_persons_owner_name', 'persons',
+        ['owner_id', sa.text("coalesce(last_name, '')"), 'first_name', 'id'], unique=False,
+    )
+    # owner_id is the leading column of every index above. ix_persons_parent_id stays:
+    # the self-referencing foreign key looks children up by parent_id alone.
+    op.drop_index('ix_persons_owner_id', table_name='persons')
+
+
+def downgrade() -> None:
+    op.create_index('ix_persons_owner_id', 'persons', ['owner_id'], unique=False)
+    op.drop_index('ix_persons_owner_name', table_name='persons')
+    op.drop_index('ix_persons_owner_birth', table_name='persons')
+    op.drop_index('ix_persons_owner_parent_birth', table_name='persons')
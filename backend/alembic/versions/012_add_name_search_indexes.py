@@ -0,0 +1,37 @@
+"""Add pg_trgm and the indexes behind /api/persons/search
+
+Revision ID: 012_name_search_indexes
+Revises: 011_tree_access_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '012_name_search_indexes'
+down_revision = '011_tree_access_indexes'
+branch_labels = None
+depends_on = None
+
+# Must match models.search_name_key / models.search_last_name_key
+SEARCH_NAME = "lower(first_name || ' ' || coalesce(last_name, ''))"
+SEARCH_LAST_NAME = "lower(coalesce(last_name, ''))"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Typeahead: "starts with" on the full name and on the last name, as b-tree range scans
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_name ON persons (owner_id, {SEARCH_NAME} text_pattern_ops)"
+    )
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_last_name ON persons (owner_id, {SEARCH_LAST_NAME} text_pattern_ops)"
+    )
+    # Fuzzy matches (word_similarity, the <% operator); owner_id is filtered after the bitmap scan
+    op.execute(f"CREATE INDEX ix_persons_search_name_trgm ON persons USING gin ({SEARCH_NAME} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_persons_search_name_trgm', table_name='persons')
+    op.drop_index('ix_persons_owner_search_last_name', table_name='persons')
+    op.drop_index('ix_persons_owner_search_name', table_name='persons')
+    # pg_trgm is left installed; other objects may depend on it
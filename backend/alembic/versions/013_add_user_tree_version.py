@@ -0,0 +1,22 @@
+"""Add users.tree_version, the per-owner tree version shared by all workers
+
+Revision ID: 013_user_tree_version
+Revises: 012_name_search_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '013_user_tree_version'
+down_revision = '012_name_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('tree_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'tree_version')
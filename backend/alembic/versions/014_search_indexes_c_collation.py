@@ -0,0 +1,52 @@
+"""Rebuild the name search indexes: "C"-collated prefix b-trees, owner-scoped trigram GIN
+
+The text_pattern_ops b-trees from 012 served LIKE 'q%' but not ORDER BY name in the
+database collation, so Postgres sorted every match before applying LIMIT. "C"-collated
+keys serve both, and search.py orders by the same COLLATE "C" expressions. The trigram
+index gains owner_id (btree_gin), so fuzzy search only reads the owner's entries.
+
+Revision ID: 014_search_indexes_c_collation
+Revises: 013_user_tree_version
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '014_search_indexes_c_collation'
+down_revision = '013_user_tree_version'
+branch_labels = None
+depends_on = None
+
+# Must match models.search_name_key / models.search_last_name_key
+SEARCH_NAME = "lower(first_name || ' ' || coalesce(last_name, ''))"
+SEARCH_LAST_NAME = "lower(coalesce(last_name, ''))"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.drop_index('ix_persons_search_name_trgm', table_name='persons')
+    op.drop_index('ix_persons_owner_search_last_name', table_name='persons')
+    op.drop_index('ix_persons_owner_search_name', table_name='persons')
+    # Each tier's ORDER BY is a prefix of its index, so the scan stops after LIMIT rows
+    op.execute(f'CREATE INDEX ix_persons_owner_search_name ON persons (owner_id, ({SEARCH_NAME}) COLLATE "C", id)')
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_last_name ON persons "
+        f'(owner_id, ({SEARCH_LAST_NAME}) COLLATE "C", ({SEARCH_NAME}) COLLATE "C", id)'
+    )
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_name_trgm ON persons USING gin (owner_id, {SEARCH_NAME} gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_persons_owner_search_name_trgm', table_name='persons')
+    op.drop_index('ix_persons_owner_search_last_name', table_name='persons')
+    op.drop_index('ix_persons_owner_search_name', table_name='persons')
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_name ON persons (owner_id, {SEARCH_NAME} text_pattern_ops)"
+    )
+    op.execute(
+        f"CREATE INDEX ix_persons_owner_search_last_name ON persons (owner_id, {SEARCH_LAST_NAME} text_pattern_ops)"
+    )
+    op.execute(f"CREATE INDEX ix_persons_search_name_trgm ON persons USING gin ({SEARCH_NAME} gin_trgm_ops)")
+    # btree_gin is left installed, like pg_trgm in 012
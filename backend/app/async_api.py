@@ -0,0 +1,181 @@
+"""Async versions of the read endpoints, used when DATABASE_ASYNC is set.
+
+The handlers run on the event loop with an AsyncSession (asyncpg), so concurrent requests
+are not capped by the threadpool size. Routes and responses match the sync handlers in
+app/main.py, which install() replaces.
+"""
+from typing import List, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import database, encoding, models, schemas
+from app.columnar import COLUMNAR_MEDIA_TYPE
+from app.main import (
+    MAX_PAGE_SIZE, NDJSON_MEDIA_TYPE, _etag_matches, _stream_persons, _subtree_response, _tree_json,
+    bearer_token, layout_writes, remember_principal, security, token_payload,
+)
+from app.pagination import decode_cursor, encode_cursor, parse_fields, persons_page_statement
+from app.principal_cache import Principal, principal_cache
+from app.services import AsyncFamilyTreeService, MAX_SUBTREE_DEPTH, PERSON_COLUMNS, PERSON_FIELDS, person_dict
+from app.tree_cache import tree_cache
+
+router = APIRouter()
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: AsyncSession = Depends(database.get_async_db),
+) -> Principal:
+    token = bearer_token(credentials)
+    principal = principal_cache.get(token)
+    if principal is None:
+        payload = token_payload(token)
+        user = (await db.execute(select(models.User).where(models.User.username == payload["sub"]))).scalar()
+        principal = remember_principal(token, payload, user)
+    return principal
+
+
+async def _flush_layout_writes(owner_id: int) -> None:
+    if layout_writes.pending(owner_id):  # the flush itself is blocking; keep it off the loop
+        await run_in_threadpool(layout_writes.flush, owner_id)
+
+
+async def _require_owner(db: AsyncSession, person_id: int, current_user: Principal):
+    row = (await db.execute(
+        select(*PERSON_COLUMNS, models.Person.lineage_path)
+        .where(models.Person.id == person_id, models.Person.owner_id == current_user.id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return row
+
+
+@router.get("/api/tree", response_model=Union[schemas.PersonTree, schemas.PersonSubtree])
+async def get_family_tree(
+    request: Request,
+    layout: Optional[Literal["radial"]] = None,
+    root_id: Optional[int] = None,
+    depth: Optional[int] = Query(None, ge=0, le=MAX_SUBTREE_DEPTH),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Async GET /api/tree.
+
+    Rows are fetched with awaited queries; building and serializing the tree runs on the
+    threadpool (the same code as the sync handler), so a cold build doesn't block the loop.
+    """
+    owner_id = current_user.id
+    await _flush_layout_writes(owner_id)
+    service = AsyncFamilyTreeService(db, owner_id=owner_id)
+    if root_id is not None or depth is not None:
+        if layout is not None:
+            raise HTTPException(status_code=400, detail="layout is not supported with root_id/depth")
+        if root_id is None:
+            root_id = await service.find_root_id()
+            if root_id is None:
+                raise HTTPException(status_code=404, detail="No family tree data found")
+        tree = await service.build_subtree_data(root_id, depth)
+        if not tree:
+            raise HTTPException(status_code=404, detail="Person not found")
+        return _subtree_response(request, await run_in_threadpool(encoding.dumps, tree))
+
+    columnar = COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+    key = f"tree:{layout}:{'columnar' if columnar else 'nested'}"
+    version = (await db.execute(select(models.User.tree_version).where(models.User.id == owner_id))).scalar() or 0
+
+    async def build():
+        return await run_in_threadpool(_tree_json, await service.load_persons(), layout, columnar)
+
+    cached = await tree_cache.get_async(owner_id, version, key, build)
+    if not cached:
+        raise HTTPException(status_code=404, detail="No family tree data found")
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept", "X-Tree-Version": str(version)}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    media_type = COLUMNAR_MEDIA_TYPE if columnar else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@router.get("/api/persons", response_model=List[schemas.PersonResponse])
+async def get_all_persons(
+    request: Request,
+    order_by: Literal["id", "name"] = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Async GET /api/persons (NDJSON streaming still reads through a sync server-side cursor)."""
+    columns = parse_fields(fields)
+    if columns is None:
+        raise HTTPException(status_code=400, detail=f"fields must be a subset of: {', '.join(PERSON_FIELDS)}")
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, order_by)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    await _flush_layout_writes(current_user.id)
+    stmt = persons_page_statement(models.Person.owner_id == current_user.id, columns, order_by, after, limit)
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_persons(stmt, columns), media_type=NDJSON_MEDIA_TYPE)
+
+    rows = (await db.execute(stmt)).all()
+    headers = {}
+    if limit is not None and len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][len(columns):])
+    body = encoding.dumps([dict(zip(columns, row)) for row in rows])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/api/persons/{person_id}", response_model=schemas.PersonResponse)
+async def get_person(
+    person_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    await _flush_layout_writes(current_user.id)
+    row = await _require_owner(db, person_id, current_user)
+    return Response(content=encoding.dumps(person_dict(row)), media_type="application/json")
+
+
+@router.get("/api/persons/{person_id}/descendants", response_model=List[schemas.PersonResponse])
+async def get_descendants(
+    person_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    await _flush_layout_writes(current_user.id)
+    person = await _require_owner(db, person_id, current_user)
+    rows = await AsyncFamilyTreeService(db, owner_id=current_user.id).load_descendants(person)
+    return Response(content=encoding.dumps([person_dict(r) for r in rows]), media_type="application/json")
+
+
+@router.get("/api/persons/{person_id}/ancestors", response_model=List[schemas.PersonResponse])
+async def get_ancestors(
+    person_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    await _flush_layout_writes(current_user.id)
+    person = await _require_owner(db, person_id, current_user)
+    rows = await AsyncFamilyTreeService(db, owner_id=current_user.id).load_ancestors(person)
+    return Response(content=encoding.dumps([person_dict(r) for r in rows]), media_type="application/json")
+
+
+def install(app: FastAPI) -> None:
+    """Replace the sync handlers for the routes defined here with their async versions."""
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute) and any((route.path, m) in replaced for m in route.methods))
+    ]
+    app.include_router(router)
@@ -0,0 +1,145 @@
+"""Per-owner change stream: minimal tree diffs pushed to clients over Server-Sent Events.
+
+Mutation handlers publish a list of changes under the tree version their commit created
+(users.tree_version), so clients that loaded /api/tree at version N (X-Tree-Version)
+can subscribe with Last-Event-ID: N and receive exactly what happened since. Changes:
+
+    {"op": "add", "person": {...}}                 new person (PersonResponse fields)
+    {"op": "update", "id": 5, "fields": {...}}     changed fields only; parent_id moves the subtree
+    {"op": "remove", "id": 5}                      the person and all their descendants
+    {"op": "reload"}                               too much changed (import); refetch /api/tree
+
+Applying a change twice has no further effect, so replays that overlap what a client
+already has are harmless. The feed is in-process: with several workers, clients only see
+changes made through the worker they are connected to.
+"""
+import asyncio
+import bisect
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from app import encoding
+
+CHANGE_LOG_SIZE = int(os.getenv("CHANGE_LOG_SIZE", "1000"))  # events kept per owner for replay
+SUBSCRIBER_BUFFER = 1000  # undelivered events per connection before it is told to reload
+KEEPALIVE_SECONDS = 15.0
+
+RESET = object()  # queued when a subscriber fell too far behind
+
+
+class Subscription:
+    """One SSE connection: an asyncio queue fed from the threads that publish."""
+
+    def __init__(self, owner_id: int):
+        self.owner_id = owner_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.backlog: List[Tuple[int, bytes]] = []  # replayed events, sent before anything queued
+        self.reset = False  # the requested version can't be replayed; the client must reload
+
+    def push(self, item) -> None:
+        """Thread-safe: hand an event to the connection's event loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:  # loop closed; the connection is going away
+            pass
+
+    def _put(self, item) -> None:
+        if self.queue.qsize() >= SUBSCRIBER_BUFFER:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            item = RESET
+        self.queue.put_nowait(item)
+
+
+class ChangeFeed:
+    """Change log and live subscribers per owner.
+
+    Event ids are the versions from models.bump_tree_version, which the users row lock
+    hands out in commit order. Two commits may still publish out of order, so the log is
+    kept sorted; versions written by another process never reach this log, which shows up
+    as a gap and makes resuming clients reload.
+    """
+
+    def __init__(self, log_size: int = CHANGE_LOG_SIZE):
+        self.log_size = log_size
+        self._lock = threading.Lock()
+        self._logs: Dict[int, deque] = {}  # owner -> (version, event data), oldest first
+        self._latest: Dict[int, int] = {}  # owner -> last published version
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    def publish(self, owner_id: int, version: int, changes: list) -> None:
+        """Push the changes committed under `version` (from models.bump_tree_version)."""
+        data = encoding.dumps({"version": version, "changes": changes})
+        with self._lock:
+            log = self._logs.get(owner_id)
+            if log is None:
+                log = self._logs[owner_id] = deque(maxlen=self.log_size)
+            if log and log[-1][0] > version:  # an earlier commit published late
+                if len(log) == log.maxlen:
+                    log.popleft()
+                bisect.insort(log, (version, data), key=lambda event: event[0])
+            else:
+                log.append((version, data))
+            self._latest[owner_id] = max(version, self._latest.get(owner_id, 0))
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        for subscription in subscribers:
+            subscription.push((version, data))
+
+    def subscribe(self, owner_id: int, since: Optional[int], current: int = 0) -> Subscription:
+        """Register a connection; with `since`, queue the events published after that version.
+
+        current is the owner's tree version in the database; if this log can't account
+        for every version between since and current, the subscription starts with a reset.
+        """
+        subscription = Subscription(owner_id)
+        with self._lock:
+            self._subscribers.setdefault(owner_id, set()).add(subscription)
+            if since is not None:
+                latest = max(self._latest.get(owner_id, 0), current)
+                missed = [event for event in self._logs.get(owner_id, ()) if event[0] > since]
+                # Newer than the database, older than the log reaches, or written elsewhere
+                if since > latest or [event[0] for event in missed] != list(range(since + 1, latest + 1)):
+                    subscription.reset = True
+                else:
+                    subscription.backlog = missed
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.owner_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.owner_id]
+
+
+def sse_event(version: int, data: bytes) -> bytes:
+    return b"id: %d\nevent: change\ndata: %s\n\n" % (version, data)
+
+
+SSE_RESET = b"event: reset\ndata: {}\n\n"
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+async def event_stream(feed: ChangeFeed, subscription: Subscription, is_disconnected):
+    """Yield SSE frames for a subscription until the client goes away."""
+    try:
+        if subscription.reset:
+            yield SSE_RESET
+        for version, data in subscription.backlog:
+            yield sse_event(version, data)
+        while not await is_disconnected():
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield SSE_KEEPALIVE
+                continue
+            yield SSE_RESET if item is RESET else sse_event(*item)
+    finally:
+        feed.unsubscribe(subscription)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,44 @@
+"""Columnar wire format for trees: parallel arrays instead of nested PersonTree objects."""
+from typing import Optional
+
+from app.layout import radial_layout
+from app.services import FlatTree
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.famtree.columnar+json"
+COLUMNAR_FORMAT = "famtree.columnar/1"
+
+# Plain columns are sent as-is; dictionary columns as {"values": [...], "codes": [...]}
+PLAIN_COLUMNS = ("first_name", "last_name", "label_offset_x", "label_offset_y")
+DICTIONARY_COLUMNS = ("gender", "color", "font_size", "font_family", "font_color")
+
+
+def dictionary_encode(values: list) -> dict:
+    """Encode a low-cardinality column as distinct values plus one small int per row."""
+    lookup = {}
+    codes = [lookup.setdefault(v, len(lookup)) for v in values]
+    return {"values": list(lookup), "codes": codes}
+
+
+def tree_columns(flat: FlatTree, layout: Optional[str] = None) -> dict:
+    """Build the columnar payload for a tree.
+
+    Rows are in breadth-first order; "parent" holds the row index of each person's
+    parent (-1 for the root), so clients rebuild the hierarchy without id lookups.
+    """
+    persons = flat.persons
+    payload = {
+        "format": COLUMNAR_FORMAT,
+        "count": len(persons),
+        "id": [p.id for p in persons],
+        "parent": flat.parent_index,
+        "generation": flat.generation,
+        "birth_date": [p.birth_date.isoformat() for p in persons],
+    }
+    for name in PLAIN_COLUMNS:
+        payload[name] = [getattr(p, name) for p in persons]
+    for name in DICTIONARY_COLUMNS:
+        payload[name] = dictionary_encode([getattr(p, name) for p in persons])
+    if layout == "radial":
+        for name, column in radial_layout(flat.parent_index, flat.generation).items():
+            payload[name] = column.tolist()
+    return payload
@@ -1,21 +1,178 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
+import threading
+import time
+
+from app import metrics
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "postgresql://famtree_user:famtree_pass@db:5432/famtree_db"
 )
 
-engine = create_engine(DATABASE_URL)
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, "1" if default else "").lower() in ("1", "true", "yes")
+
+
+# Pool settings; with DB_PGBOUNCER=1 pooling is left to PgBouncer (transaction mode)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds before a connection is replaced
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", default=True)
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+DB_PGBOUNCER = _env_flag("DB_PGBOUNCER")
+_QUEUEPOOL_MAX_OVERFLOW = 10  # what QueuePool uses when create_engine gets no max_overflow
+
+
+class PoolMetrics:
+    """Counters for connection checkouts, shared by every engine built by create_db_engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_timeouts = 0
+        self.connects = 0
+        self.invalidations = 0  # connections dropped as stale/broken (e.g. after a Postgres restart)
+        self.pools = []  # (pool, max_overflow) for every tracked engine; QueuePools are reported
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts += 1
+                return
+            self.checkouts += 1
+            self.checkout_wait_seconds += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+
+    def adjust(self, name: str, delta: int) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self) -> dict:
+        pools = [(p, overflow) for p, overflow in self.pools if isinstance(p, QueuePool)]
+        with self._lock:
+            return {
+                "in_use": sum(p.checkedout() for p, _ in pools),
+                "idle": sum(p.checkedin() for p, _ in pools),
+                "capacity": sum(p.size() + max(overflow, 0) for p, overflow in pools),
+                "checkouts": self.checkouts,
+                "checkout_wait_seconds": self.checkout_wait_seconds,
+                "checkout_wait_max_seconds": self.checkout_wait_max,
+                "checkout_timeouts": self.checkout_timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine keyword arguments for url from the DB_* settings."""
+    if url.startswith("sqlite"):
+        return {"pool_pre_ping": DB_POOL_PRE_PING}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_PGBOUNCER:
+        # PgBouncer owns the pool; asyncpg's prepared statement cache breaks under transaction pooling
+        options["poolclass"] = NullPool
+        if is_async:
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        else:
+            options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if is_async:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool
+        options["connect_args"] = {"timeout": DB_CONNECT_TIMEOUT}
+    else:
+        options["poolclass"] = TimedQueuePool
+        options["connect_args"] = {"connect_timeout": DB_CONNECT_TIMEOUT}
+    return options
+
+
+def _track_pool(engine, options: dict) -> None:
+    """Instrument engine, built with the create_engine keyword arguments options."""
+    metrics.instrument_engine(engine)
+    # QueuePool keeps max_overflow private, so remember what the pool was built with
+    pool_metrics.pools.append((engine.pool, options.get("max_overflow", _QUEUEPOOL_MAX_OVERFLOW)))
+    event.listen(engine, "connect", lambda *args: pool_metrics.adjust("connects", 1))
+    event.listen(engine, "invalidate", lambda *args: pool_metrics.adjust("invalidations", 1))
+
+
+def create_db_engine(url: str = DATABASE_URL, **overrides):
+    """The engine every entry point (API, scripts, benchmarks) should use."""
+    options = {**engine_options(url), **overrides}
+    engine = create_engine(url, **options)
+    _track_pool(engine, options)
+    return engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# DATABASE_ASYNC=1 serves the read endpoints from async handlers on an asyncpg engine
+ASYNC_DATABASE = _env_flag("DATABASE_ASYNC")
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://... (sqlite -> aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + sep + rest
+
+
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url = os.getenv("ASYNC_DATABASE_URL") or async_url(DATABASE_URL)
+    _async_options = engine_options(_async_url, is_async=True)
+    async_engine = create_async_engine(_async_url, **_async_options)
+    _track_pool(async_engine.sync_engine, _async_options)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,89 @@
+"""Fast JSON encoding for API responses built from trusted database rows."""
+import json
+import time
+from typing import Any
+
+import orjson
+
+from app.metrics import add_serialize_time
+
+ORJSON_MAX_DEPTH = 254  # orjson.dumps raises beyond this many levels of nesting
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode dicts/lists of plain values (dates included) to JSON bytes.
+
+    orjson stops at 254 levels of nesting, and the standard library encoder recurses
+    too, so very deep trees (long chains of generations) go through _dumps_deep.
+    """
+    start = time.perf_counter()
+    try:
+        return orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        return _dumps_deep(obj)
+    finally:
+        add_serialize_time(time.perf_counter() - start)
+
+
+def _dumps_scalar(value: Any) -> bytes:
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        return json.dumps(value, default=str).encode("utf-8")
+
+
+def _containers(item: Any) -> list:
+    values = item.values() if isinstance(item, dict) else item
+    return [value for value in values if isinstance(value, (dict, list, tuple))]
+
+
+def _heights(obj: Any) -> dict:
+    """Nesting height of every container in obj, by id(); 1 for one without containers."""
+    heights = {}
+    stack = [(obj, False)]
+    while stack:
+        item, visited = stack.pop()
+        if visited:
+            heights[id(item)] = 1 + max((heights[id(child)] for child in _containers(item)), default=0)
+        elif isinstance(item, (dict, list, tuple)):
+            stack.append((item, True))
+            stack.extend((child, False) for child in _containers(item))
+    return heights
+
+
+def _dumps_deep(obj: Any) -> bytes:
+    """Same bytes as orjson.dumps, at any depth: an explicit stack instead of recursion.
+
+    Containers shallow enough for orjson are handed to it whole, so only the deep
+    spine is walked in Python.
+    """
+    heights = _heights(obj)
+    out = bytearray()
+    stack = [(False, obj)]  # (is raw output, item); popped last-in first-out
+    while stack:
+        raw, item = stack.pop()
+        if raw:
+            out += item
+            continue
+        if not isinstance(item, (dict, list, tuple)):
+            out += _dumps_scalar(item)
+            continue
+        if heights[id(item)] < ORJSON_MAX_DEPTH:
+            try:
+                out += orjson.dumps(item)
+                continue
+            except orjson.JSONEncodeError:
+                pass  # a value orjson doesn't support; encoded by _dumps_scalar below
+        if isinstance(item, dict):
+            entries = [(orjson.dumps(str(key)) + b":", value) for key, value in item.items()]
+            opening, closing = b"{", b"}"
+        else:
+            entries = [(b"", value) for value in item]
+            opening, closing = b"[", b"]"
+        stack.append((True, closing))
+        for i in range(len(entries) - 1, -1, -1):
+            prefix, value = entries[i]
+            stack.append((False, value))
+            stack.append((True, (b"," if i else b"") + prefix))
+        stack.append((True, opening))
+    return bytes(out)
@@ -0,0 +1,130 @@
+"""Streaming export of a user's persons as GEDCOM, JSON or CSV.
+
+Every generator reads rows through a server-side cursor in its own session and yields
+encoded chunks batch by batch, so memory use does not grow with the tree size. The
+column set is PERSON_FIELDS and the formats are the ones app/importer.py reads back.
+"""
+import csv
+import io
+import zlib
+from itertools import groupby
+from typing import Iterable, Iterator
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import aliased
+
+from app import database, encoding, models
+from app.importer import GEDCOM_MONTHS, GEDCOM_STYLE_TAGS
+from app.services import PERSON_COLUMNS, PERSON_FIELDS
+
+STREAM_BATCH_SIZE = 1000  # rows fetched per server-side cursor round trip
+EXPORT_MEDIA_TYPES = {"json": "application/json", "csv": "text/csv", "gedcom": "text/plain"}
+EXPORT_EXTENSIONS = {"json": "json", "csv": "csv", "gedcom": "ged"}
+_MONTH_NAMES = {number: name for name, number in GEDCOM_MONTHS.items()}
+
+
+def stream_rows(stmt, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[list]:
+    """Yield batches of rows from a server-side cursor.
+
+    Uses its own session so the cursor outlives the request's dependency scope.
+    """
+    db = database.SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def _persons_statement(owner_id: int, *extra_columns):
+    return (
+        select(*PERSON_COLUMNS, *extra_columns)
+        .where(models.Person.owner_id == owner_id)
+        .order_by(models.Person.id)
+    )
+
+
+def export_json(owner_id: int) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for batch in stream_rows(_persons_statement(owner_id)):
+        chunk = b",".join(encoding.dumps(dict(zip(PERSON_FIELDS, row))) for row in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]\n"
+
+
+def export_csv(owner_id: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PERSON_FIELDS)
+    for batch in stream_rows(_persons_statement(owner_id)):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gedcom_value(value) -> str:
+    return " ".join(str(value).split())  # GEDCOM values are single-line
+
+
+def _gedcom_person(row, has_children: bool) -> str:
+    person = dict(zip(PERSON_FIELDS, row))
+    born = person["birth_date"]
+    lines = [
+        f"0 @I{person['id']}@ INDI",
+        f"1 NAME {_gedcom_value(person['first_name'])} /{_gedcom_value(person['last_name'] or '')}/",
+        f"1 SEX {'M' if person['gender'] == 'male' else 'F' if person['gender'] == 'female' else 'U'}",
+        "1 BIRT",
+        f"2 DATE {born.day} {_MONTH_NAMES[born.month]} {born.year}",
+    ]
+    if person["parent_id"] is not None:
+        lines.append(f"1 FAMC @F{person['parent_id']}@")
+    if has_children:
+        lines.append(f"1 FAMS @F{person['id']}@")
+    for tag, field in GEDCOM_STYLE_TAGS.items():
+        if person[field] is not None:
+            lines.append(f"1 {tag} {_gedcom_value(person[field])}")
+    return "\n".join(lines) + "\n"
+
+
+def export_gedcom(owner_id: int) -> Iterator[bytes]:
+    """One INDI per person and one FAM per parent (the tree has a single parent per person)."""
+    yield b"0 HEAD\n1 SOUR FamTree\n1 GEDC\n2 VERS 5.5.1\n1 CHAR UTF-8\n"
+    Child = aliased(models.Person)
+    has_children = exists().where(Child.parent_id == models.Person.id, Child.owner_id == owner_id)
+    for batch in stream_rows(_persons_statement(owner_id, has_children)):
+        yield "".join(_gedcom_person(row[:-1], row[-1]) for row in batch).encode("utf-8")
+
+    # Families, grouped by parent so each FAM record is written in one piece
+    Parent = aliased(models.Person)
+    families = (
+        select(Parent.id, Parent.gender, models.Person.id)
+        .join(Parent, models.Person.parent_id == Parent.id)
+        .where(models.Person.owner_id == owner_id, Parent.owner_id == owner_id)
+        .order_by(Parent.id, models.Person.birth_date, models.Person.id)
+    )
+    rows = (row for batch in stream_rows(families) for row in batch)
+    for (parent_id, gender), children in groupby(rows, key=lambda row: (row[0], row[1])):
+        role = "WIFE" if gender == "female" else "HUSB"
+        lines = [f"0 @F{parent_id}@ FAM", f"1 {role} @I{parent_id}@"]
+        lines.extend(f"1 CHIL @I{row[2]}@" for row in children)
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+    yield b"0 TRLR\n"
+
+
+EXPORTERS = {"json": export_json, "csv": export_csv, "gedcom": export_gedcom}
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,359 @@
+"""Bulk import of persons from GEDCOM, JSON or CSV files.
+
+Records are parsed in one pass, parent references are resolved in memory, ids are
+reserved up front, and rows are written in large batches (COPY on Postgres) in the
+caller's transaction, so an import of any size is one commit.
+"""
+import csv
+import io
+import json
+import re
+from collections import deque
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+
+IMPORT_BATCH_SIZE = 10000
+PERSON_IMPORT_COLUMNS = ("id", "owner_id", "lineage_path") + tuple(schemas.PersonCreate.model_fields)
+
+# GEDCOM custom tags carrying the style columns, so they survive a round trip
+GEDCOM_STYLE_TAGS = {
+    "_COLOR": "color",
+    "_FONT_SIZE": "font_size",
+    "_FONT_FAMILY": "font_family",
+    "_FONT_COLOR": "font_color",
+    "_LABEL_X": "label_offset_x",
+    "_LABEL_Y": "label_offset_y",
+}
+GEDCOM_MONTHS = {m: i + 1 for i, m in enumerate(
+    ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+)}
+_GEDCOM_LINE = re.compile(r"^\s*(\d+)\s+(@[^@]+@\s+)?(\S+)\s?(.*)$")
+_JSON_GAP = re.compile(r"\s*")
+_JSON_ARRAY_GAP = re.compile(r"[\s,]*")
+
+
+class ImportRecord:
+    """One person from a file; ref/parent_ref are the file's own identifiers."""
+    __slots__ = ("ref", "parent_ref", "fields")
+
+    def __init__(self, ref, parent_ref, fields: dict):
+        self.ref = ref
+        self.parent_ref = parent_ref
+        self.fields = fields
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.version = 0  # the owner's tree version the import created
+        self.errors: List[str] = []  # first few problems, for the report
+
+    def skip(self, message: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < 20:
+            self.errors.append(message)
+
+    def as_dict(self) -> dict:
+        return {"imported": self.imported, "skipped": self.skipped, "errors": self.errors}
+
+
+# ----- Parsing -----
+def _validated(ref, parent_ref, raw: dict, result: ImportResult) -> Optional[ImportRecord]:
+    try:
+        person = schemas.PersonCreate.model_validate(raw)
+    except ValidationError as e:
+        error = e.errors()[0]
+        result.skip(f"{ref}: {'.'.join(str(part) for part in error['loc'])}: {error['msg']}")
+        return None
+    fields = person.model_dump()
+    return ImportRecord(ref, parent_ref, fields)
+
+
+def _iter_json_values(stream: TextIO, chunk_size: int = 1 << 16) -> Iterator:
+    """Yield the elements of a top-level JSON array, or the objects of an NDJSON file,
+    without reading the whole file into memory."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    in_array = None
+    while True:
+        pos = (_JSON_ARRAY_GAP if in_array else _JSON_GAP).match(buffer, pos).end()
+        if pos < len(buffer):
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                pos += in_array
+                continue
+            if in_array and buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+            else:
+                # A bare number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof or isinstance(value, (dict, list, str)):
+                    yield value
+                    pos = end
+                    continue
+        elif eof:
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def _is_ref(value) -> bool:
+    """File references must be strings or integers (not bools, lists, objects, ...)."""
+    return isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool))
+
+
+def parse_json(stream: TextIO, result: ImportResult) -> Iterator[ImportRecord]:
+    """Persons as exported by /api/persons or /api/export?format=json: `id` and
+    `parent_id` are treated as references within the file."""
+    for index, raw in enumerate(_iter_json_values(stream)):
+        if not isinstance(raw, dict):
+            result.skip(f"item {index}: not an object")
+            continue
+        ref = raw.get("id")
+        if ref is None:
+            ref = f"#{index}"
+        parent_ref = raw.get("parent_id")
+        if not _is_ref(ref) or not (parent_ref is None or _is_ref(parent_ref)):
+            result.skip(f"item {index}: id and parent_id must be strings or integers")
+            continue
+        # References may be any JSON value, so keep them out of PersonCreate validation
+        fields = {k: v for k, v in raw.items() if k not in ("id", "parent_id")}
+        record = _validated(ref, parent_ref, fields, result)
+        if record is not None:
+            yield record
+
+
+def parse_csv(stream: TextIO, result: ImportResult) -> Iterator[ImportRecord]:
+    """CSV with a header row of person fields (as /api/export?format=csv writes it);
+    empty cells are null, `id` and `parent_id` are references within the file."""
+    reader = csv.DictReader(stream)
+    try:
+        for index, raw in enumerate(reader):
+            record = _csv_record(index, raw, result)
+            if record is not None:
+                yield record
+    except csv.Error as e:
+        raise ValueError(f"line {reader.line_num}: {e}") from e
+
+
+def _csv_record(index: int, raw: dict, result: ImportResult) -> Optional[ImportRecord]:
+    fields = {k: (v if v != "" else None) for k, v in raw.items() if k}
+    ref = fields.pop("id", None) or f"#{index}"
+    parent_ref = fields.pop("parent_id", None)
+    fields["first_name"] = fields.get("first_name") or ""
+    return _validated(ref, parent_ref, fields, result)
+
+
+def _gedcom_date(value: str) -> Optional[str]:
+    """'15 JAN 1920', 'JAN 1920', 'ABT 1920' -> ISO date; missing parts default to 1."""
+    parts = [p for p in value.upper().split() if p not in ("ABT", "EST", "CAL", "BEF", "AFT", "INT")]
+    day, month, year = 1, 1, None
+    for part in parts:
+        if part in GEDCOM_MONTHS:
+            month = GEDCOM_MONTHS[part]
+        elif part.isdigit():
+            if len(part) <= 2 and year is None:
+                day = int(part)
+            else:
+                year = int(part)
+                break
+    if year is None:
+        return None
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _gedcom_lines(stream: TextIO) -> Iterator[tuple]:
+    for line in stream:
+        match = _GEDCOM_LINE.match(line.rstrip("\r\n").lstrip("\ufeff"))
+        if match:
+            level, xref, tag, value = match.groups()
+            yield int(level), (xref or "").strip() or None, tag.upper(), value
+
+
+def parse_gedcom(stream: TextIO, result: ImportResult) -> Iterator[ImportRecord]:
+    """INDI records become persons. The single parent is the FAMC family's husband,
+    or its wife if there is none; style columns come from the _COLOR/_FONT_* tags."""
+    individuals: Dict[str, dict] = {}
+    families: Dict[str, dict] = {}
+    record = None
+    event = None
+    for level, xref, tag, value in _gedcom_lines(stream):
+        if level == 0:
+            event = None
+            if tag == "INDI":
+                record = individuals[xref] = {"gender": "other"}
+            elif tag == "FAM":
+                record = families[xref] = {}
+            else:
+                record = None
+            continue
+        if record is None:
+            continue
+        if level == 1:
+            event = tag
+            if tag == "NAME" and "first_name" not in record:
+                given, _, rest = value.partition("/")
+                record["first_name"] = given.strip()
+                record["last_name"] = rest.partition("/")[0].strip()
+            elif tag == "SEX":
+                record["gender"] = {"M": "male", "F": "female"}.get(value.strip().upper(), "other")
+            elif tag == "FAMC":
+                record.setdefault("famc", value.strip())
+            elif tag in ("HUSB", "WIFE"):
+                record[tag] = value.strip()
+            elif tag in GEDCOM_STYLE_TAGS:
+                record[GEDCOM_STYLE_TAGS[tag]] = value.strip()
+        elif level == 2 and event == "BIRT" and tag == "DATE":
+            record["birth_date"] = _gedcom_date(value)
+
+    for xref, raw in individuals.items():
+        family = families.get(raw.pop("famc", None), {})
+        parent_ref = family.get("HUSB") or family.get("WIFE")
+        raw.setdefault("first_name", "")
+        if not raw.get("birth_date"):
+            result.skip(f"{xref}: missing or unreadable birth date")
+            continue
+        record = _validated(xref, parent_ref, raw, result)
+        if record is not None:
+            yield record
+
+
+PARSERS = {"json": parse_json, "csv": parse_csv, "gedcom": parse_gedcom}
+
+
+def detect_format(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith((".ged", ".gedcom")):
+        return "gedcom"
+    return "csv" if name.endswith(".csv") else "json"
+
+
+# ----- Writing -----
+def reserve_ids(db: Session, count: int) -> List[int]:
+    """Allocate `count` person ids in one round trip.
+
+    On Postgres they come from the persons id sequence. SQLite has no sequence, so ids
+    start at MAX(id) + 1; that is only safe once the transaction holds SQLite's write
+    lock, which is why callers must bump the tree version (a write) first. Other
+    databases are refused rather than risk two transactions taking the same ids.
+    """
+    if count == 0:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        rows = db.execute(
+            text("SELECT nextval('persons_id_seq') FROM generate_series(1, :n)"), {"n": count}
+        )
+        return [row[0] for row in rows]
+    if dialect != "sqlite":
+        raise NotImplementedError(f"reserve_ids needs a sequence or a single-writer database, not {dialect}")
+    # pysqlite only opens a transaction for a write statement, which takes the write lock
+    if not db.connection().connection.dbapi_connection.in_transaction:
+        raise RuntimeError("reserve_ids on SQLite must follow a write in the same transaction")
+    start = (db.execute(select(func.max(models.Person.id))).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _write_batch(db: Session, rows: List[dict]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(row[c]) for c in PERSON_IMPORT_COLUMNS) + "\n")
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY persons ({', '.join(PERSON_IMPORT_COLUMNS)}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(models.Person.__table__), rows)
+
+
+def import_records(
+    db: Session,
+    owner_id: int,
+    records: Iterable[ImportRecord],
+    result: Optional[ImportResult] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> ImportResult:
+    """Insert records for owner_id, parents before children. Does not commit.
+
+    Bumps the owner's tree version (result.version) in the same transaction. A parent
+    reference that is missing from the file (or part of a cycle) leaves the person as a
+    root. progress(done, total) is called after every batch.
+    """
+    result = result or ImportResult()
+    result.version = models.bump_tree_version(db, owner_id)
+    records = list(records)
+    by_ref = {}
+    for record in records:
+        if record.ref in by_ref:
+            result.skip(f"{record.ref}: duplicate id")
+            continue
+        by_ref[record.ref] = record
+
+    children: Dict[object, List[ImportRecord]] = {}
+    roots = deque()
+    for record in by_ref.values():
+        if record.parent_ref is not None and record.parent_ref in by_ref:
+            children.setdefault(record.parent_ref, []).append(record)
+        else:
+            roots.append(record)
+
+    ids = iter(reserve_ids(db, len(by_ref)))
+    total = len(by_ref)
+    batch: List[dict] = []
+
+    def flush():
+        _write_batch(db, batch)
+        result.imported += len(batch)
+        batch.clear()
+        if progress:
+            progress(result.imported, total)
+
+    # Breadth-first from the roots so every parent row is written before its children
+    queue = deque((record, None, "/") for record in roots)
+    while queue:
+        record, parent_id, path = queue.popleft()
+        person_id = next(ids)
+        batch.append(dict(record.fields, id=person_id, owner_id=owner_id, parent_id=parent_id, lineage_path=path))
+        for child in children.pop(record.ref, ()):
+            queue.append((child, person_id, models.subtree_prefix(path, person_id)))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    for group in children.values():  # only parent_id cycles are left unreached
+        for record in group:
+            result.skip(f"{record.ref}: parent reference cycle")
+    return result
+
+
+def import_file(db: Session, owner_id: int, stream: TextIO, fmt: str, **kwargs) -> ImportResult:
+    """Parse a GEDCOM, JSON or CSV stream and import it for owner_id. Does not commit."""
+    result = ImportResult()
+    return import_records(db, owner_id, PARSERS[fmt](stream, result), result=result, **kwargs)
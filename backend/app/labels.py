@@ -0,0 +1,184 @@
+"""Label collision resolution for the fan chart (GET /api/tree/label-offsets).
+
+Anchors and rotations come from layout.sunburst_layout, the geometry FamilyTreeChart.js
+draws. Each label is the first name, plus the birth year on a second, smaller line at
+the chart's fixed line positions; its size is estimated from average glyph widths for
+the font, so it approximates the rendered text rather than measuring it. The rotated
+label is covered by an axis-aligned box, and labels are placed greedily, shallowest
+generation first. Each tries a few offsets around its anchor, then steps outward along
+its radius, and takes the first that overlaps nothing already placed; labels with a
+user-set offset are placed first and never moved. Placed boxes go into a spatial hash (a
+grid of cells as large as the largest label), so each check only looks at the 3x3
+neighbouring cells. Placed boxes never overlap, which keeps cells small and the whole pass
+near-linear.
+
+Rings are 80 px wide whatever the tree's size, so a large tree has far more label area
+than the chart: on the synthetic trees of benchmarks/bench_labels.py every label of 1,000
+finds a place, about half of 10,000 and fewer than one in ten of 100,000. The rest are
+returned as unresolved.
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.layout import SUNBURST_RING_WIDTH
+
+DEFAULT_FONT_SIZE = 12.0  # px, as in FamilyTreeChart.js
+# Text baselines relative to the anchor, in px (the chart's dy attributes)
+NAME_BASELINE, ROOT_NAME_BASELINE, YEAR_BASELINE = -2.0, 0.0, 12.0
+ASCENT = 0.8  # of the font size above the baseline; the rest is below
+# Average glyph width as a fraction of the font size
+CHAR_WIDTH = {"arial": 0.55, "helvetica": 0.55, "verdana": 0.62, "georgia": 0.57, "serif": 0.5,
+              "times new roman": 0.5, "courier new": 0.6, "monospace": 0.6}
+DEFAULT_CHAR_WIDTH = 0.55
+# Candidate offsets in label widths / heights, tried in order
+CANDIDATES = ((0, 0), (0, -1), (0, 1), (1, 0), (-1, 0), (1, -1), (-1, -1), (1, 1), (-1, 1), (0, -2), (0, 2))
+# Then outward along the label's radius, in px: from a quarter ring, growing by 2^(1/4)
+RADIAL_STEPS = tuple(SUNBURST_RING_WIDTH / 4 * 2 ** (k / 4) for k in range(32))
+# A label starts its outward search RADIAL_BACKTRACK steps inside where the previous label
+# in its sector (of RADIAL_SECTORS around the centre) was placed, or gave up
+RADIAL_SECTORS, RADIAL_BACKTRACK = 256, 2
+
+
+def font_size_px(font_size: Optional[str]) -> float:
+    try:
+        return float(font_size) if font_size else DEFAULT_FONT_SIZE
+    except ValueError:
+        return DEFAULT_FONT_SIZE
+
+
+def label_box(first_name: str, birth_date, font_size: Optional[str], font_family: Optional[str],
+              root: bool = False) -> tuple:
+    """Estimated (width, top, bottom) of a person's unrotated label in px, relative to its anchor.
+
+    Text is centred horizontally on the anchor; y grows downwards, as in SVG.
+    """
+    size = font_size_px(font_size)
+    char_width = CHAR_WIDTH.get((font_family or "arial").lower(), DEFAULT_CHAR_WIDTH)
+    baseline = ROOT_NAME_BASELINE if root else NAME_BASELINE
+    width = len(first_name or "") * size * char_width
+    top, bottom = baseline - ASCENT * size, baseline + (1 - ASCENT) * size
+    if birth_date is not None:
+        year_size = max(8.0, size - 2)
+        width = max(width, 4 * year_size * char_width)
+        bottom = YEAR_BASELINE + (1 - ASCENT) * year_size
+    return max(width, 1.0), top, bottom
+
+
+def rotated_bounds(x, y, rotation, boxes: Sequence[tuple]) -> tuple:
+    """Axis-aligned (centre x, centre y, width, height) of labels drawn as
+    translate(x, y) rotate(rotation) around the label_box boxes."""
+    width, top, bottom = np.asarray(boxes, dtype=np.float64).reshape(-1, 3).T
+    angle = np.asarray(rotation, dtype=np.float64)
+    cos, sin = np.cos(angle), np.sin(angle)
+    local_y, half_w, half_h = (top + bottom) / 2, width / 2, (bottom - top) / 2
+    return (
+        np.asarray(x, dtype=np.float64) - local_y * sin,
+        np.asarray(y, dtype=np.float64) + local_y * cos,
+        2 * (half_w * np.abs(cos) + half_h * np.abs(sin)),
+        2 * (half_w * np.abs(sin) + half_h * np.abs(cos)),
+    )
+
+
+def resolve_collisions(
+    x: Sequence[float],
+    y: Sequence[float],
+    width: Sequence[float],
+    height: Sequence[float],
+    fixed: Dict[int, tuple],
+    angle: Optional[Sequence[float]] = None,
+) -> tuple:
+    """Suggest offsets so that label boxes centred at (x + dx, y + dy) don't overlap.
+
+    Labels are taken in the given order (put shallow generations first). fixed maps an
+    index to a user-set (dx, dy) that is kept as is. angle, if given, is each label's
+    direction from the chart centre (clockwise from 12 o'clock); labels that fit at none
+    of the CANDIDATES then try the RADIAL_STEPS outward along it. Returns (dx, dy,
+    unresolved), where unresolved lists the indices for which no offset was free; those
+    keep a zero offset and are not treated as obstacles.
+    """
+    n = len(x)
+    xs, ys = np.asarray(x, dtype=np.float64).tolist(), np.asarray(y, dtype=np.float64).tolist()
+    ws, hs = np.asarray(width, dtype=np.float64).tolist(), np.asarray(height, dtype=np.float64).tolist()
+    dx, dy = [0.0] * n, [0.0] * n
+    unresolved: List[int] = []
+    angles = [] if angle is None else np.asarray(angle, dtype=np.float64).tolist()
+    sector_steps: Dict[int, int] = {}  # sector -> RADIAL_STEPS index its last label ended at
+    cell = max(max(ws, default=1.0), max(hs, default=1.0))
+    grid: Dict[tuple, list] = {}  # (col, row) -> placed boxes (left, top, right, bottom)
+
+    def free(left, top, right, bottom):
+        col, row = int((left + right) / 2 // cell), int((top + bottom) / 2 // cell)
+        for c in (col - 1, col, col + 1):
+            for r in (row - 1, row, row + 1):
+                for box in grid.get((c, r), ()):
+                    if left < box[2] and box[0] < right and top < box[3] and box[1] < bottom:
+                        return False
+        return True
+
+    def place(left, top, right, bottom):
+        key = (int((left + right) / 2 // cell), int((top + bottom) / 2 // cell))
+        grid.setdefault(key, []).append((left, top, right, bottom))
+
+    for i, (ox, oy) in fixed.items():
+        dx[i], dy[i] = ox, oy
+        half_w, half_h = ws[i] / 2, hs[i] / 2
+        cx, cy = xs[i] + ox, ys[i] + oy
+        place(cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+
+    def try_offset(i, ox, oy):
+        cx, cy = xs[i] + ox, ys[i] + oy
+        box = (cx - ws[i] / 2, cy - hs[i] / 2, cx + ws[i] / 2, cy + hs[i] / 2)
+        if not free(*box):
+            return False
+        place(*box)
+        dx[i], dy[i] = ox, oy
+        return True
+
+    for i in range(n):
+        if i in fixed:
+            continue
+        if any(try_offset(i, fx * ws[i], fy * hs[i]) for fx, fy in CANDIDATES):
+            continue
+        if angles:
+            ux, uy = math.sin(angles[i]), -math.cos(angles[i])
+            sector = int(angles[i] % (2 * math.pi) / (2 * math.pi) * RADIAL_SECTORS) % RADIAL_SECTORS
+            first = max(sector_steps.get(sector, 0) - RADIAL_BACKTRACK, 0)
+            step = next((k for k in range(first, len(RADIAL_STEPS))
+                         if try_offset(i, ux * RADIAL_STEPS[k], uy * RADIAL_STEPS[k])), len(RADIAL_STEPS))
+            sector_steps[sector] = step
+            if step < len(RADIAL_STEPS):
+                continue
+        unresolved.append(i)
+    return dx, dy, unresolved
+
+
+def suggest_label_offsets(
+    persons: list, x: Sequence[float], y: Sequence[float], rotation: Sequence[float]
+) -> dict:
+    """Suggested label offsets for persons laid out by sunburst_layout (breadth-first, as from FlatTree).
+
+    x, y and rotation are the label anchors and rotations; labels that don't fit near their
+    anchor are pushed outward from the chart centre. Offsets translate the rotated label,
+    as the chart applies them. Persons with label_offset_x or label_offset_y set
+    keep their offsets and are left out of the result. Returns {"offsets": [{id,
+    label_offset_x, label_offset_y}, ...] for labels that should move, "unresolved":
+    [ids], "kept": number of user offsets}.
+    """
+    boxes = [label_box(p.first_name, p.birth_date, p.font_size, p.font_family, root=i == 0)
+             for i, p in enumerate(persons)]
+    cx, cy, widths, heights = rotated_bounds(x, y, rotation, boxes)
+    fixed = {
+        i: (p.label_offset_x or 0.0, p.label_offset_y or 0.0)
+        for i, p in enumerate(persons)
+        if p.label_offset_x is not None or p.label_offset_y is not None
+    }
+    angle = np.arctan2(np.asarray(x, dtype=np.float64), -np.asarray(y, dtype=np.float64))
+    dx, dy, unresolved = resolve_collisions(cx, cy, widths, heights, fixed, angle)
+    offsets = [
+        {"id": p.id, "label_offset_x": round(dx[i], 1), "label_offset_y": round(dy[i], 1)}
+        for i, p in enumerate(persons)
+        if i not in fixed and (dx[i] or dy[i])
+    ]
+    return {"offsets": offsets, "unresolved": [persons[i].id for i in unresolved], "kept": len(fixed)}
@@ -0,0 +1,106 @@
+"""Vectorized fan chart layout over flat tree arrays."""
+import math
+from typing import Sequence
+
+import numpy as np
+
+BASE_RADIUS = 50  # Center node radius
+RADIUS_INCREMENT = 100  # Distance between generations
+
+
+def sibling_ranks(parent_index: np.ndarray) -> tuple:
+    """Return (rank among siblings, number of siblings) for every node.
+
+    Expects breadth-first order, where each parent's children are contiguous and
+    parents appear in increasing index order. The root gets rank 0 of 1.
+    """
+    n = len(parent_index)
+    rank = np.zeros(n, dtype=np.int64)
+    count = np.ones(n, dtype=np.int64)
+    if n > 1:
+        parents = parent_index[1:]
+        first_child = np.searchsorted(parents, parents, side="left")
+        rank[1:] = np.arange(n - 1) - first_child
+        count[1:] = np.bincount(parents, minlength=n)[parents]
+    return rank, count
+
+
+def radial_layout(
+    parent_index: Sequence[int],
+    generation: Sequence[int],
+    center_x: float = 0,
+    center_y: float = 0,
+    root_angle: float = 0.0,
+) -> dict:
+    """Compute angle, radius, x and y for every node of a breadth-first tree.
+
+    Same rules as the original recursive fan chart: an only child sits at its parent's
+    angle, otherwise siblings share a full turn centred on the parent's angle, and a
+    node's ring is BASE_RADIUS + generation * RADIUS_INCREMENT. The only Python loop is
+    over generations, never over nodes.
+    """
+    parent = np.asarray(parent_index, dtype=np.int64)
+    gen = np.asarray(generation, dtype=np.int64)
+    n = len(parent)
+    rank, count = sibling_ranks(parent)
+
+    span = 2 * math.pi
+    offset = np.where(count > 1, -span / 2 + (rank + 0.5) * span / np.maximum(count, 1), 0.0)
+
+    angle = np.empty(n, dtype=np.float64)
+    if n:
+        angle[0] = root_angle
+        # Breadth-first order keeps each generation contiguous, so one slice per ring
+        level_starts = np.flatnonzero(np.diff(gen)) + 1
+        bounds = level_starts.tolist() + [n]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            angle[lo:hi] = angle[parent[lo:hi]] + offset[lo:hi]
+
+    radius = (BASE_RADIUS + gen * RADIUS_INCREMENT).astype(np.float64)
+    x = center_x + radius * np.cos(angle)
+    y = center_y + radius * np.sin(angle)
+    if n:
+        radius[0], x[0], y[0] = 0.0, center_x, center_y
+    return {"angle": angle, "radius": radius, "x": x, "y": y}
+
+
+# The sunburst FamilyTreeChart.js draws; keep in sync with its constants
+SUNBURST_CENTER_RADIUS = 40  # CENTER_RADIUS: radius of the root's disc
+SUNBURST_RING_WIDTH = 80  # RING_WIDTH
+
+
+def sunburst_layout(parent_index: Sequence[int], generation: Sequence[int]) -> dict:
+    """Label anchors of the d3 sunburst in FamilyTreeChart.js, for a breadth-first tree.
+
+    The root is a disc of radius SUNBURST_CENTER_RADIUS; generation g is the ring from
+    CENTER + (g - 1) * RING_WIDTH outwards, and every node's arc is split equally among
+    its children. A label is anchored at the middle of its arc (angles clockwise from
+    12 o'clock, as in d3) and rotated by that angle, flipped by half a turn when it
+    would be upside down. Returns start/end/mid angles, anchor radius and x/y, and the
+    label rotation in radians.
+    """
+    parent = np.asarray(parent_index, dtype=np.int64)
+    gen = np.asarray(generation, dtype=np.int64)
+    n = len(parent)
+    rank, count = sibling_ranks(parent)
+
+    start = np.zeros(n, dtype=np.float64)
+    width = np.full(n, 2 * math.pi)
+    if n:
+        level_starts = np.flatnonzero(np.diff(gen)) + 1
+        bounds = level_starts.tolist() + [n]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if lo == 0:
+                continue  # the root owns the full turn
+            width[lo:hi] = width[parent[lo:hi]] / count[lo:hi]
+            start[lo:hi] = start[parent[lo:hi]] + rank[lo:hi] * width[lo:hi]
+    mid = start + width / 2
+    inner = SUNBURST_CENTER_RADIUS + (gen - 1) * SUNBURST_RING_WIDTH
+    radius = (inner + SUNBURST_RING_WIDTH / 2).astype(np.float64)
+    if n:
+        mid[0], radius[0] = 0.0, SUNBURST_CENTER_RADIUS / 2
+    rotation = np.where((mid > math.pi / 2) & (mid < 3 * math.pi / 2), mid - math.pi, mid)
+    return {
+        "start_angle": start, "end_angle": start + width, "mid_angle": mid, "radius": radius,
+        "x": radius * np.sin(mid), "y": -radius * np.cos(mid), "rotation": rotation,
+    }
@@ -0,0 +1,151 @@
+"""Debounced, coalescing writes for high-frequency layout edits (label drags, colors)."""
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, select, update
+
+from app import database, models
+
+LAYOUT_WRITE_DELAY = float(os.getenv("LAYOUT_WRITE_DELAY", "0.25"))  # seconds to wait for more edits
+LAYOUT_FIELDS = ("label_offset_x", "label_offset_y", "color")
+
+logger = logging.getLogger(__name__)
+
+
+class LayoutWriteBuffer:
+    """Pending layout edits per owner, merged per person and field (last write wins).
+
+    The first edit for an owner starts a timer; edits arriving before it fires are merged
+    into the same pending set, and the timer writes them all in one executemany UPDATE
+    per group of touched fields. Only persons the owner has are written; on_flush(owner_id,
+    version, edits) runs after each commit, with the tree version the write created and
+    the written {person_id: fields}.
+
+    flush() returns only once the owner's edits are committed, also when another thread
+    (the timer) is already writing them, so readers that flush first see their writes.
+    A failed write is logged and its edits are queued again (newer edits win) for retry.
+    """
+
+    def __init__(
+        self, delay: float = LAYOUT_WRITE_DELAY, on_flush: Optional[Callable[[int, int, Dict[int, dict]], None]] = None
+    ):
+        self.delay = delay
+        self.on_flush = on_flush
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Dict[int, dict]] = {}  # owner -> person id -> fields
+        self._timers: Dict[int, threading.Timer] = {}
+        self._writing: Dict[int, threading.Event] = {}  # owner -> set when its in-flight write ends
+
+    def add(self, owner_id: int, edits: Iterable[Tuple[int, dict]]) -> int:
+        """Queue (person_id, fields) edits for owner_id; returns how many were queued."""
+        count = 0
+        with self._lock:
+            pending = self._pending.setdefault(owner_id, {})
+            for person_id, fields in edits:
+                if not fields:
+                    continue
+                pending.setdefault(person_id, {}).update(fields)
+                count += 1
+            if not pending:
+                del self._pending[owner_id]
+            else:
+                self._schedule(owner_id)
+        return count
+
+    def _schedule(self, owner_id: int) -> None:
+        """Start the owner's timer if it has none. Call with the lock held."""
+        if owner_id not in self._timers:
+            timer = threading.Timer(self.delay, self._flush_in_background, args=(owner_id,))
+            timer.daemon = True
+            self._timers[owner_id] = timer
+            timer.start()
+
+    def pending(self, owner_id: int) -> bool:
+        """True if the owner has edits that are queued or being written."""
+        with self._lock:
+            return owner_id in self._pending or owner_id in self._writing
+
+    def flush(self, owner_id: int) -> int:
+        """Write the owner's pending edits now; returns the number of persons updated.
+
+        Waits for a write already in flight for the owner. Raises if the write fails; the
+        edits are then queued again.
+        """
+        while True:
+            with self._lock:
+                writing = self._writing.get(owner_id)
+                if writing is None:
+                    pending = self._pending.pop(owner_id, None)
+                    timer = self._timers.pop(owner_id, None)
+                    if pending:
+                        self._writing[owner_id] = threading.Event()
+                    break
+            writing.wait()
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return 0
+
+        try:
+            version, written = self._write(owner_id, pending)
+        except Exception:
+            with self._lock:
+                newer = self._pending.get(owner_id, {})
+                for person_id, fields in newer.items():
+                    pending.setdefault(person_id, {}).update(fields)
+                self._pending[owner_id] = pending
+                self._schedule(owner_id)
+            raise
+        finally:
+            with self._lock:
+                self._writing.pop(owner_id).set()
+        if written and self.on_flush is not None:
+            self.on_flush(owner_id, version, written)
+        return len(written)
+
+    def _write(self, owner_id: int, pending: Dict[int, dict]) -> Tuple[int, Dict[int, dict]]:
+        """One transaction: bump the tree version and update the owner's persons among pending."""
+        table = models.Person.__table__
+        db = database.SessionLocal()
+        try:
+            version = models.bump_tree_version(db, owner_id)
+            # Deletes bump the version first too, so these rows stay put until commit
+            owned = db.execute(
+                select(table.c.id).where(table.c.owner_id == owner_id, table.c.id.in_(list(pending)))
+            ).scalars()
+            written = {person_id: pending[person_id] for person_id in owned}
+            if not written:
+                db.rollback()
+                return version, written
+
+            groups: Dict[tuple, list] = {}
+            for person_id, fields in written.items():
+                groups.setdefault(tuple(sorted(fields)), []).append(dict(fields, _id=person_id))
+            for names, rows in groups.items():
+                stmt = (
+                    update(table)
+                    .where(and_(table.c.id == bindparam("_id"), table.c.owner_id == owner_id))
+                    .values({name: bindparam(name) for name in names})
+                )
+                db.execute(stmt, rows)
+            db.commit()
+            return version, written
+        finally:
+            db.close()
+
+    def _flush_in_background(self, owner_id: int) -> None:
+        try:
+            self.flush(owner_id)
+        except Exception:
+            logger.exception("Layout edits for owner %s failed to save; retrying in %.2fs", owner_id, self.delay)
+
+    def flush_all(self) -> None:
+        with self._lock:
+            owners = list(self._pending)
+        for owner_id in owners:
+            try:
+                self.flush(owner_id)
+            except Exception:
+                logger.exception("Layout edits for owner %s failed to save", owner_id)
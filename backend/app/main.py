@@ -1,16 +1,52 @@
+import hashlib
+import io
 import os
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app import models, schemas, database
-from app.services import FamilyTreeService
-from app.auth import hash_password, verify_password, create_access_token, decode_token
+from typing import Dict, List, Literal, Optional, Tuple, Union
+from app import models, schemas, database, encoding, exporter, importer, metrics
+from app.changes import change_feed, event_stream
+from app.columnar import COLUMNAR_MEDIA_TYPE, tree_columns
+from app.metrics import MetricsMiddleware
+from app.labels import suggest_label_offsets
+from app.layout import sunburst_layout
+from app.layout_writes import LAYOUT_FIELDS, LayoutWriteBuffer
+from app.pagination import decode_cursor, encode_cursor, parse_fields, persons_page_statement
+from app.principal_cache import Principal, principal_cache
+from app.relationship import kinship_term, lca_indexes
+from app.search import MAX_SEARCH_LIMIT, search_persons
+from app.services import (
+    FamilyTreeService, MAX_SUBTREE_DEPTH, PERSON_COLUMNS, PERSON_FIELDS, flat_tree, person_dict, tree_data,
+)
+from app.tree_cache import tree_cache
+from app.viewport import MAX_VIEWPORT_PIXELS, ViewportIndex, parse_bbox
+from app.auth import (
+    HashingBusy, create_access_token, decode_token, needs_rehash, password_pool,
+)
 
 app = FastAPI(title="Family Tree API")
 security = HTTPBearer(auto_error=False)
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 5000  # operations per /api/persons/batch or /api/persons/layout request
+REQUIRED_PERSON_FIELDS = ("first_name", "birth_date", "gender")
+
+
+def _publish_layout(owner_id: int, version: int, edits: dict) -> None:
+    changes = [{"op": "update", "id": person_id, "fields": fields} for person_id, fields in edits.items()]
+    change_feed.publish(owner_id, version, changes)
+
+
+# Label drags and color changes are merged per person and written after a short delay;
+# handlers that read or rewrite persons flush the owner's pending edits first.
+layout_writes = LayoutWriteBuffer(on_flush=_publish_layout)
+
 # CORS: set ALLOWED_ORIGINS in production (e.g. https://yourdomain.com)
 _allowed_origins = os.getenv("ALLOWED_ORIGINS", "*")
 app.add_middleware(
@@ -19,155 +55,615 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing", "X-Tree-Version"],
 )
+# Outermost, so latency includes CORS handling; see app/metrics.py
+app.add_middleware(MetricsMiddleware)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # if set, /metrics requires "Authorization: Bearer <token>"
 
 
-def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(database.get_db),
-) -> models.User:
+def bearer_token(credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     if not credentials or not credentials.credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    payload = decode_token(credentials.credentials)
+    return credentials.credentials
+
+
+def token_payload(token: str) -> dict:
+    """Verified JWT claims; 401 if the token is invalid or expired."""
+    payload = decode_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    username = payload["sub"]
-    user = db.query(models.User).filter(models.User.username == username).first()
+    return payload
+
+
+def remember_principal(token: str, payload: dict, user: Optional[models.User]) -> Principal:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
+
+
+def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: Session = Depends(database.get_db),
+) -> Principal:
+    """The caller, from principal_cache when possible (no JWT decode, no query)."""
+    token = bearer_token(credentials)
+    principal = principal_cache.get(token)
+    if principal is None:
+        payload = token_payload(token)
+        user = db.query(models.User).filter(models.User.username == payload["sub"]).first()
+        principal = remember_principal(token, payload, user)
+    return principal
 
 
 def get_current_admin(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not getattr(current_user, "is_admin", False):
         raise HTTPException(status_code=403, detail="Admin only")
     return current_user
 
 
+@app.on_event("shutdown")
+def flush_layout_writes():
+    layout_writes.flush_all()
+
+
 @app.get("/")
 def read_root():
     return {"message": "Family Tree API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Prometheus metrics: per-route latency, SQL count/time, serialization time, response size, pool."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    body = metrics.registry.render() + metrics.gauge_lines(
+        "famtree_db_pool", "Database connection pool", database.pool_metrics.snapshot()
+    )
+    return Response(content=body, media_type="text/plain; version=0.0.4")
+
+
 # ----- Auth -----
+# Handlers that hash are async: bcrypt runs on auth.password_pool and short DB calls on the
+# threadpool, so waiting on a hash never holds a request worker thread.
+async def _hash_password(password: str) -> str:
+    """Hash on the bounded pool; 503 right away if it is saturated."""
+    try:
+        return await password_pool.hash(password)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+async def _verify_password(plain: str, hashed: str) -> bool:
+    """Check a password on the bounded pool; 503 right away if it is saturated."""
+    try:
+        return await password_pool.verify(plain, hashed)
+    except HashingBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+def _user_by_name(db: Session, username: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.username == username).first()
+
+
+def _add_user(db: Session, user: models.User) -> models.User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 @app.post("/api/auth/register", response_model=schemas.Token)
-def register(data: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register(data: schemas.UserCreate, db: Session = Depends(database.get_db)):
     """Create a new user account."""
-    if db.query(models.User).filter(models.User.username == data.username).first():
+    if await run_in_threadpool(_user_by_name, db, data.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     user = models.User(
         username=data.username,
-        password_hash=hash_password(data.password),
+        password_hash=await _hash_password(data.password),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = await run_in_threadpool(_add_user, db, user)
     token = create_access_token(data={"sub": user.username})
     return {"access_token": token, "token_type": "bearer", "username": user.username}
 
 
 @app.post("/api/auth/login", response_model=schemas.Token)
-def login(data: schemas.UserLogin, db: Session = Depends(database.get_db)):
-    """Log in and get an access token."""
-    user = db.query(models.User).filter(models.User.username == data.username).first()
-    if not user or not verify_password(data.password, user.password_hash):
+async def login(data: schemas.UserLogin, db: Session = Depends(database.get_db)):
+    """Log in and get an access token. Hashes made with an old BCRYPT_ROUNDS are upgraded."""
+    user = await run_in_threadpool(_user_by_name, db, data.username)
+    if not user or not await _verify_password(data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = await password_pool.hash(data.password)
+            await run_in_threadpool(db.commit)
+        except HashingBusy:
+            pass  # not required for this login; retried on the next one
     token = create_access_token(data={"sub": user.username})
     return {"access_token": token, "token_type": "bearer", "username": user.username}
 
 
 @app.post("/api/auth/change-password")
-def change_password(
+async def change_password(
     data: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(database.get_db),
 ):
     """Change password for the current user."""
-    if not verify_password(data.current_password, current_user.password_hash):
+    user = await run_in_threadpool(db.get, models.User, current_user.id)
+    if not await _verify_password(data.current_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
-    current_user.password_hash = hash_password(data.new_password)
-    db.commit()
+    user.password_hash = await _hash_password(data.new_password)
+    await run_in_threadpool(db.commit)
+    principal_cache.invalidate(user.username)
     return {"message": "Password updated successfully"}
 
 
 @app.get("/api/auth/me", response_model=schemas.MeResponse)
-def get_me(current_user: models.User = Depends(get_current_user)):
+def get_me(current_user: Principal = Depends(get_current_user)):
     """Return current user info (username, is_admin)."""
     return {"username": current_user.username, "is_admin": getattr(current_user, "is_admin", False)}
 
 
 # ----- Admin only -----
 @app.post("/api/admin/users", response_model=schemas.UserResponse)
-def admin_create_user(
+async def admin_create_user(
     data: schemas.UserCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
 ):
     """Create a new user account (admin only)."""
-    if db.query(models.User).filter(models.User.username == data.username).first():
+    if await run_in_threadpool(_user_by_name, db, data.username):
         raise HTTPException(status_code=400, detail="Username already registered")
     user = models.User(
         username=data.username,
-        password_hash=hash_password(data.password),
+        password_hash=await _hash_password(data.password),
         is_admin=False,
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await run_in_threadpool(_add_user, db, user)
 
 
 @app.get("/api/admin/users", response_model=List[schemas.UserResponse])
 def admin_list_users(
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_admin),
+    current_user: Principal = Depends(get_current_admin),
 ):
     """List all users (admin only)."""
     return db.query(models.User).all()
 
 
+
+@app.get("/api/admin/db-pool")
+def admin_db_pool(current_user: Principal = Depends(get_current_admin)):
+    """Connection pool metrics: in-use/idle connections, checkout waits and timeouts (admin only)."""
+    return database.pool_metrics.snapshot()
+
 # ----- Protected API (require login, scoped to owner) -----
-@app.get("/api/tree", response_model=schemas.PersonTree)
+def _tree_json(persons: list, layout: Optional[str] = None, columnar: bool = False):
+    """Build and serialize a tree from load_persons rows; (body, strong ETag) or None if empty.
+
+    Pure CPU work, no database access, so async handlers can run it on the threadpool.
+    """
+    flat = flat_tree(persons)
+    if flat is None:
+        return None
+    body = encoding.dumps(tree_columns(flat, layout) if columnar else tree_data(flat, layout=layout))
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def _build_tree_json(db: Session, owner_id: int, layout: Optional[str] = None, columnar: bool = False):
+    """Serialize the owner's tree once; returns (body, strong ETag) or None if there is no tree."""
+    return _tree_json(FamilyTreeService(db, owner_id=owner_id).load_persons(), layout, columnar)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _get_subtree(request: Request, db: Session, owner_id: int, root_id: Optional[int], depth: Optional[int]):
+    service = FamilyTreeService(db, owner_id=owner_id)
+    if root_id is None:
+        root = service.find_root()
+        if not root:
+            raise HTTPException(status_code=404, detail="No family tree data found")
+        root_id = root.id
+    tree = service.build_subtree_data(root_id, depth)
+    if not tree:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return _subtree_response(request, encoding.dumps(tree))
+
+
+def _subtree_response(request: Request, body: bytes) -> Response:
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/tree", response_model=Union[schemas.PersonTree, schemas.PersonSubtree])
 def get_family_tree(
+    request: Request,
+    layout: Optional[Literal["radial"]] = None,
+    root_id: Optional[int] = None,
+    depth: Optional[int] = Query(None, ge=0, le=MAX_SUBTREE_DEPTH),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """Get the current user's family tree."""
-    service = FamilyTreeService(db, owner_id=current_user.id)
-    tree = service.build_tree()
-    if not tree:
+    """Get the current user's family tree. Cached per tree version; honours If-None-Match.
+
+    layout=radial also returns x/y/angle/radius for every node (server-side fan chart layout).
+    Send Accept: application/vnd.famtree.columnar+json for parallel arrays instead of nesting.
+    root_id and/or depth return only that part of the tree (see schemas.PersonSubtree), so
+    the chart can load a few generations first and expand branches with has_more later.
+    X-Tree-Version is the version to resume /api/changes from.
+    """
+    layout_writes.flush(current_user.id)
+    if root_id is not None or depth is not None:
+        if layout is not None:
+            raise HTTPException(status_code=400, detail="layout is not supported with root_id/depth")
+        return _get_subtree(request, db, current_user.id, root_id, depth)
+
+    columnar = COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+    version = models.tree_version(db, current_user.id)  # read first: the body is at least this recent
+    cached = tree_cache.get(
+        current_user.id,
+        version,
+        f"tree:{layout}:{'columnar' if columnar else 'nested'}",
+        lambda: _build_tree_json(db, current_user.id, layout, columnar),
+    )
+    if not cached:
+        raise HTTPException(status_code=404, detail="No family tree data found")
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept", "X-Tree-Version": str(version)}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    media_type = COLUMNAR_MEDIA_TYPE if columnar else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@app.get("/api/relationship", response_model=schemas.RelationshipResponse)
+def get_relationship(
+    a: int,
+    b: int,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """How person a is related to person b (e.g. "second cousin twice removed").
+
+    Answered from the owner's lowest-common-ancestor index (app/relationship.py), cached
+    per tree version and rebuilt only when parent links change.
+    """
+    owner_id = current_user.id
+    index = tree_cache.get(
+        owner_id,
+        models.tree_version(db, owner_id),
+        "lca",
+        lambda: lca_indexes.get(owner_id, FamilyTreeService(db, owner_id=owner_id).load_parent_links()),
+    )
+    u, v = index.index_of(a), index.index_of(b)
+    if u < 0 or v < 0:
+        raise HTTPException(status_code=404, detail="Person not found")
+    related = index.relate(u, v)
+    ids = {a, b, related[0]} if related else {a, b}
+    rows = {
+        row.id: person_dict(row)
+        for row in db.query(*PERSON_COLUMNS).filter(models.Person.id.in_(ids), models.Person.owner_id == owner_id)
+    }
+    if len(rows) < len(ids):  # deleted since the index was built
+        raise HTTPException(status_code=404, detail="Person not found")
+    result = {"a": rows[a], "b": rows[b], "relationship": "unrelated"}
+    if related:
+        ancestor_id, generations_a, generations_b = related
+        result.update(
+            relationship=kinship_term(generations_a, generations_b, rows[a]["gender"]),
+            common_ancestor=rows[ancestor_id], generations_a=generations_a, generations_b=generations_b,
+        )
+    return Response(content=encoding.dumps(result), media_type="application/json")
+
+
+def _viewport_index(db: Session, owner_id: int) -> Optional[ViewportIndex]:
+    flat = FamilyTreeService(db, owner_id=owner_id).build_flat_tree()
+    return ViewportIndex(flat) if flat is not None else None
+
+
+@app.get("/api/tree/viewport", response_model=schemas.TreeViewport)
+def get_tree_viewport(
+    bbox: str,
+    zoom: float = Query(1.0, gt=0),
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Nodes of the radial layout inside bbox ("min_x,min_y,max_x,max_y", layout units).
+
+    zoom is screen pixels per layout unit; nodes that would overlap on screen are
+    aggregated into clusters (see app/viewport.py). The spatial index is cached per tree version.
+    """
+    box = parse_bbox(bbox)
+    if box is None:
+        raise HTTPException(status_code=400, detail="bbox must be min_x,min_y,max_x,max_y")
+    if max(box[2] - box[0], box[3] - box[1]) * zoom > MAX_VIEWPORT_PIXELS:
+        raise HTTPException(status_code=400, detail=f"Viewport larger than {MAX_VIEWPORT_PIXELS} pixels; zoom out")
+    layout_writes.flush(current_user.id)
+    owner_id = current_user.id
+    index = tree_cache.get(owner_id, models.tree_version(db, owner_id), "viewport", lambda: _viewport_index(db, owner_id))
+    if index is None:
         raise HTTPException(status_code=404, detail="No family tree data found")
-    return tree
+    return Response(content=encoding.dumps(index.viewport(box, zoom)), media_type="application/json")
+
+
+def _label_offsets_json(db: Session, owner_id: int) -> Optional[bytes]:
+    flat = FamilyTreeService(db, owner_id=owner_id).build_flat_tree()
+    if flat is None:
+        return None
+    anchors = sunburst_layout(flat.parent_index, flat.generation)
+    return encoding.dumps(suggest_label_offsets(flat.persons, anchors["x"], anchors["y"], anchors["rotation"]))
+
+
+@app.get("/api/tree/label-offsets", response_model=schemas.LabelOffsets)
+def get_label_offsets(
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Suggested label offsets that remove label overlaps in the fan chart (see app/labels.py).
+
+    Labels with user-set offsets are kept. Cached per tree version; apply the suggestions
+    client-side, or save them with POST /api/persons/layout.
+    """
+    layout_writes.flush(current_user.id)
+    owner_id = current_user.id
+    body = tree_cache.get(owner_id, models.tree_version(db, owner_id), "labels", lambda: _label_offsets_json(db, owner_id))
+    if body is None:
+        raise HTTPException(status_code=404, detail="No family tree data found")
+    return Response(content=body, media_type="application/json")
+
+
+def _stream_principal(token: Optional[str]) -> Tuple[Principal, int]:
+    """get_current_user for the change stream, plus the user's tree version.
+
+    Uses a short-lived session, so no connection is held open while streaming.
+    """
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    principal = principal_cache.get(token)
+    with database.SessionLocal() as db:
+        if principal is None:
+            payload = token_payload(token)
+            principal = remember_principal(token, payload, _user_by_name(db, payload["sub"]))
+        return principal, models.tree_version(db, principal.id)
+
+
+@app.get("/api/changes")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = None,
+    access_token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+):
+    """Server-Sent Events with the current user's tree changes (see app/changes.py).
+
+    Resumes after `since` (or the Last-Event-ID header that EventSource sends on reconnect);
+    a `reset` event means the gap can't be replayed and /api/tree must be refetched.
+    EventSource cannot set headers, so the token may be passed as access_token=.
+    """
+    token = credentials.credentials if credentials else access_token
+    principal, version = await run_in_threadpool(_stream_principal, token)
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    subscription = change_feed.subscribe(principal.id, since, version)
+    return StreamingResponse(
+        event_stream(change_feed, subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # no proxy buffering (nginx)
+    )
+
+
+def _stream_persons(stmt, fields: List[str]):
+    """Yield NDJSON from a server-side cursor, one batch of rows at a time."""
+    for batch in exporter.stream_rows(stmt):
+        yield b"".join(encoding.dumps(dict(zip(fields, row))) + b"\n" for row in batch)
 
 
 @app.get("/api/persons", response_model=List[schemas.PersonResponse])
 def get_all_persons(
+    request: Request,
+    order_by: Literal["id", "name"] = "id",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Get persons owned by the current user, ordered by id or by name.
+
+    With limit, one page is returned and the X-Next-Cursor header (if present) is passed
+    back as cursor= for the next page. fields= is a comma-separated projection (id is
+    always included). Send Accept: application/x-ndjson to stream one JSON row per line.
+    """
+    columns = parse_fields(fields)
+    if columns is None:
+        raise HTTPException(status_code=400, detail=f"fields must be a subset of: {', '.join(PERSON_FIELDS)}")
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, order_by)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    layout_writes.flush(current_user.id)
+    stmt = persons_page_statement(models.Person.owner_id == current_user.id, columns, order_by, after, limit)
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_persons(stmt, columns), media_type=NDJSON_MEDIA_TYPE)
+
+    rows = db.execute(stmt).all()
+    headers = {}
+    if limit is not None and len(rows) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1][len(columns):])
+    body = encoding.dumps([dict(zip(columns, row)) for row in rows])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/persons/search", response_model=List[schemas.PersonSearchResult])
+def search_by_name(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_SEARCH_LIMIT),
+    fuzzy: bool = True,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    """Get all persons owned by the current user."""
-    persons = db.query(models.Person).filter(models.Person.owner_id == current_user.id).all()
-    return persons
+    """Typeahead over the current user's persons: name prefix, last-name prefix, then fuzzy matches."""
+    layout_writes.flush(current_user.id)
+    results = search_persons(db, current_user.id, q, limit, fuzzy)
+    return Response(content=encoding.dumps(results), media_type="application/json")
+
 
 @app.post("/api/persons", response_model=schemas.PersonResponse)
 def create_person(
     person: schemas.PersonCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Create a new person (owned by current user). Root or child uses normal auto-increment."""
-    person_dict = person.dict()
-    person_dict["owner_id"] = current_user.id
-    db_person = models.Person(**person_dict)
+    _require_parent(db, person.parent_id, current_user)
+    data = person.dict()
+    data["owner_id"] = current_user.id
+    version = models.bump_tree_version(db, current_user.id)
+    db_person = models.Person(**data)
     db.add(db_person)
     db.commit()
     db.refresh(db_person)
+    change_feed.publish(current_user.id, version, [{"op": "add", "person": person_dict(db_person)}])
     return db_person
 
 
-def _require_owner(db: Session, person_id: int, current_user: models.User) -> models.Person:
+def _batch_cycle(persons: Dict[int, models.Person], moves: Dict[int, Optional[int]]) -> bool:
+    """True if re-parenting persons as in moves ({id: new parent_id}) would close a cycle.
+
+    Walks up from each moved person's new parent using the batch's final parent links: a
+    stored lineage_path stands for the links of persons that don't move, up to the
+    nearest ancestor that does. persons must hold the moved persons and their new parents.
+    """
+    for person_id, parent_id in moves.items():
+        node, seen = parent_id, set()
+        while node is not None:
+            if node == person_id or node in seen:
+                return True
+            seen.add(node)
+            if node in moves:
+                node = moves[node]
+                continue
+            for ancestor in reversed(models.ancestor_ids(persons[node].lineage_path)):
+                if ancestor == person_id:
+                    return True
+                if ancestor in moves:
+                    node = ancestor
+                    break
+            else:
+                node = None
+    return False
+
+
+@app.post("/api/persons/batch", response_model=schemas.PersonBatchResponse)
+def batch_persons(
+    batch: schemas.PersonBatch,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Apply creates, updates (by id) and deletes in one transaction and return the resulting rows.
+
+    Every existing person the batch refers to is loaded in one query, new ids are reserved
+    in one round trip, and inserts, updates and the subtree delete are each sent in bulk.
+    Moves are checked against the batch's final parent links (400 on a cycle) and applied
+    before the creates, whose lineage paths are read after the moves.
+    """
+    if len(batch.create) + len(batch.update) + len(batch.delete) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} operations per batch")
+    layout_writes.flush(current_user.id)
+    P = models.Person
+    referenced = set(batch.delete) | {u.id for u in batch.update}
+    referenced |= {item.parent_id for item in (*batch.create, *batch.update) if item.parent_id is not None}
+    persons = {
+        p.id: p for p in db.query(P).filter(P.owner_id == current_user.id, P.id.in_(referenced))
+    } if referenced else {}
+    missing = sorted({*batch.delete, *(u.id for u in batch.update)} - persons.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Person not found: {missing}")
+
+    moves = {}
+    for item in batch.update:
+        if item.parent_id != persons[item.id].parent_id:
+            if item.parent_id is not None and item.parent_id not in persons:
+                raise HTTPException(status_code=400, detail=f"Parent not found: {item.parent_id}")
+            moves[item.id] = item.parent_id
+    if _batch_cycle(persons, moves):
+        raise HTTPException(status_code=400, detail="A person cannot be moved under themselves or a descendant")
+
+    version = models.bump_tree_version(db, current_user.id)
+    # Updates first. The lineage_path hook re-roots a moved subtree with a bulk UPDATE, and
+    # the ORM writes the mover's own path later in the same flush, so moves that touch each
+    # other's subtrees must each be flushed on their own.
+    updated = []
+    for item in batch.update:
+        db_person = persons[item.id]
+        for key, value in item.model_dump(exclude={"id"}).items():
+            setattr(db_person, key, value)
+        updated.append(db_person)
+        if item.id in moves:
+            db.flush()
+    db.flush()
+
+    # Creates: parents' paths as they are after the moves, so ids and paths are known up front
+    parent_ids = {item.parent_id for item in batch.create if item.parent_ref is None and item.parent_id is not None}
+    parent_paths = dict(db.query(P.id, P.lineage_path).filter(
+        P.owner_id == current_user.id, P.id.in_(parent_ids)
+    )) if parent_ids else {}
+    created = []
+    by_ref = {}
+    for item, person_id in zip(batch.create, importer.reserve_ids(db, len(batch.create))):
+        data = item.model_dump(exclude={"ref", "parent_ref"})
+        if item.parent_ref is not None:
+            if item.parent_ref not in by_ref:
+                raise HTTPException(status_code=400, detail=f"Unknown parent_ref: {item.parent_ref}")
+            parent = by_ref[item.parent_ref]
+            data["parent_id"] = parent.id
+            path = models.subtree_prefix(parent.lineage_path, parent.id)
+        elif data["parent_id"] is not None:
+            if data["parent_id"] not in parent_paths:
+                raise HTTPException(status_code=400, detail=f"Parent not found: {data['parent_id']}")
+            path = models.subtree_prefix(parent_paths[data["parent_id"]], data["parent_id"])
+        else:
+            path = "/"
+        db_person = P(**data, id=person_id, owner_id=current_user.id, lineage_path=path)
+        created.append(db_person)
+        if item.ref is not None:
+            by_ref[item.ref] = db_person
+    db.add_all(created)
+    db.flush()
+
+    service = FamilyTreeService(db, owner_id=current_user.id)
+    deleted = set(service.delete_subtrees([persons[i] for i in batch.delete]))
+    response = {
+        "created": [person_dict(p) for p in created if p.id not in deleted],
+        "updated": [person_dict(p) for p in updated if p.id not in deleted],
+        "deleted": sorted(deleted),
+    }
+    db.commit()
+    change_feed.publish(current_user.id, version, [
+        *({"op": "add", "person": person} for person in response["created"]),
+        *({"op": "update", "id": person["id"], "fields": person} for person in response["updated"]),
+        *({"op": "remove", "id": person_id} for person_id in batch.delete),
+    ])
+    return Response(content=encoding.dumps(response), media_type="application/json")
+
+
+def _require_owner(db: Session, person_id: int, current_user: Principal) -> models.Person:
     """Return person if owned by current user; else 404."""
     db_person = db.query(models.Person).filter(
         models.Person.id == person_id,
@@ -178,64 +674,211 @@ def _require_owner(db: Session, person_id: int, current_user: models.User) -> mo
     return db_person
 
 
+def _require_parent(
+    db: Session, parent_id: Optional[int], current_user: Principal, moving: Optional[models.Person] = None
+) -> None:
+    """400 unless parent_id is empty or one of the user's persons outside `moving`'s subtree."""
+    if parent_id is None:
+        return
+    parent = db.query(models.Person).filter(
+        models.Person.id == parent_id,
+        models.Person.owner_id == current_user.id,
+    ).first()
+    if not parent:
+        raise HTTPException(status_code=400, detail="Parent not found")
+    if moving is not None:
+        moving_prefix = models.subtree_prefix(moving.lineage_path, moving.id)
+        if models.subtree_prefix(parent.lineage_path, parent.id).startswith(moving_prefix):
+            raise HTTPException(status_code=400, detail="A person cannot be moved under themselves or a descendant")
+
+
+@app.get("/api/export")
+def export_persons(
+    fmt: Literal["gedcom", "json", "csv"] = Query("json", alias="format"),
+    gzip: bool = False,
+    current_user: Principal = Depends(get_current_user),
+):
+    """Stream all of the current user's persons as GEDCOM, JSON or CSV (optionally gzipped).
+
+    Rows are read through a server-side cursor and written as they arrive; the output
+    can be fed back to /api/import.
+    """
+    layout_writes.flush(current_user.id)
+    chunks = exporter.EXPORTERS[fmt](current_user.id)
+    filename = f"famtree.{exporter.EXPORT_EXTENSIONS[fmt]}"
+    media_type = exporter.EXPORT_MEDIA_TYPES[fmt]
+    if gzip:
+        chunks, filename, media_type = exporter.gzip_chunks(chunks), filename + ".gz", "application/gzip"
+    return StreamingResponse(
+        chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.post("/api/import", response_model=schemas.ImportResponse)
+def import_persons(
+    file: UploadFile = File(...),
+    fmt: Optional[Literal["gedcom", "json", "csv"]] = Query(None, alias="format"),
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Bulk-import persons from a GEDCOM, JSON or CSV file in one transaction (format from extension if omitted)."""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace")
+    try:
+        result = importer.import_file(db, current_user.id, stream, fmt or importer.detect_format(file.filename or ""))
+        db.commit()
+    except ValueError as e:  # unreadable file: bad JSON/CSV syntax or encoding
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Could not parse file: {e}")
+    change_feed.publish(current_user.id, result.version, [{"op": "reload"}])
+    return result.as_dict()
+
+
 @app.get("/api/persons/{person_id}", response_model=schemas.PersonResponse)
 def get_person(
     person_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Get a specific person by ID (must be owned by current user)."""
+    layout_writes.flush(current_user.id)
     return _require_owner(db, person_id, current_user)
 
 
+@app.get("/api/persons/{person_id}/descendants", response_model=List[schemas.PersonResponse])
+def get_descendants(
+    person_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """All descendants of a person (oldest first), from one lineage_path prefix query."""
+    layout_writes.flush(current_user.id)
+    db_person = _require_owner(db, person_id, current_user)
+    rows = FamilyTreeService(db, owner_id=current_user.id).load_descendants(db_person)
+    return Response(content=encoding.dumps([person_dict(r) for r in rows]), media_type="application/json")
+
+
+@app.get("/api/persons/{person_id}/ancestors", response_model=List[schemas.PersonResponse])
+def get_ancestors(
+    person_id: int,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Ancestors of a person, root first, from one query on the ids in its lineage_path."""
+    layout_writes.flush(current_user.id)
+    db_person = _require_owner(db, person_id, current_user)
+    rows = FamilyTreeService(db, owner_id=current_user.id).load_ancestors(db_person)
+    return Response(content=encoding.dumps([person_dict(r) for r in rows]), media_type="application/json")
+
+
 @app.put("/api/persons/{person_id}", response_model=schemas.PersonResponse)
 def update_person(
     person_id: int,
     person: schemas.PersonCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Update a person (must be owned by current user)."""
+    layout_writes.flush(current_user.id)
     db_person = _require_owner(db, person_id, current_user)
+    if person.parent_id != db_person.parent_id:
+        _require_parent(db, person.parent_id, current_user, moving=db_person)
+    version = models.bump_tree_version(db, current_user.id)
     for key, value in person.dict().items():
         if key != "owner_id":
             setattr(db_person, key, value)
     db.commit()
     db.refresh(db_person)
+    change_feed.publish(current_user.id, version, [{"op": "update", "id": person_id, "fields": person_dict(db_person)}])
     return db_person
 
 
+@app.patch("/api/persons/{person_id}", response_model=schemas.PersonResponse)
+def patch_person(
+    person_id: int,
+    person: schemas.PersonPatch,
+    db: Session = Depends(database.get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Update only the fields present in the body (must be owned by current user).
+
+    Without parent_id this is a single UPDATE ... RETURNING of the changed columns;
+    a parent change goes through the ORM so lineage paths are maintained.
+    """
+    changes = person.model_dump(exclude_unset=True)
+    for field in REQUIRED_PERSON_FIELDS:
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be null")
+    layout_writes.flush(current_user.id)
+
+    if "parent_id" in changes:
+        db_person = _require_owner(db, person_id, current_user)
+        if changes["parent_id"] != db_person.parent_id:
+            _require_parent(db, changes["parent_id"], current_user, moving=db_person)
+        version = models.bump_tree_version(db, current_user.id)
+        for key, value in changes.items():
+            setattr(db_person, key, value)
+        db.flush()
+        body = encoding.dumps(person_dict(db_person))
+        db.commit()
+        change_feed.publish(current_user.id, version, [{"op": "update", "id": person_id, "fields": changes}])
+        return Response(content=body, media_type="application/json")
+
+    P = models.Person
+    owned = (P.id == person_id, P.owner_id == current_user.id)
+    if changes:
+        version = models.bump_tree_version(db, current_user.id)  # not committed if the person is not found
+        stmt = update(P).where(*owned).values(**changes).returning(*PERSON_COLUMNS)
+    else:
+        stmt = select(*PERSON_COLUMNS).where(*owned)
+    row = db.execute(stmt).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    if changes:
+        db.commit()
+        change_feed.publish(current_user.id, version, [{"op": "update", "id": person_id, "fields": changes}])
+    return Response(content=encoding.dumps(dict(zip(PERSON_FIELDS, row))), media_type="application/json")
+
+
+@app.post("/api/persons/layout", response_model=schemas.LayoutEditResponse, status_code=202)
+def edit_layout(
+    edits: List[schemas.LayoutEdit],
+    current_user: Principal = Depends(get_current_user),
+):
+    """Queue label offset / color edits; bursts are merged and written in one go.
+
+    Edits for the same person are coalesced (last value per field wins) and written
+    LAYOUT_WRITE_DELAY seconds after the first one. Ids the user does not own are ignored.
+    """
+    if len(edits) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} edits per request")
+    accepted = layout_writes.add(
+        current_user.id,
+        ((edit.id, edit.model_dump(include=set(LAYOUT_FIELDS), exclude_unset=True)) for edit in edits),
+    )
+    return {"accepted": accepted}
+
+
 @app.delete("/api/persons/{person_id}")
 def delete_person(
     person_id: int,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Delete a person and all their descendants (must be owned by current user)."""
-    from sqlalchemy import text
-
+    layout_writes.flush(current_user.id)
     db_person = _require_owner(db, person_id, current_user)
-    
     try:
-        # Delete the person - CASCADE DELETE will automatically delete all descendants
-        db.delete(db_person)
-        db.flush()  # Flush to ensure deletion happens before we check max_id
-        
-        # Reset the ID sequence to start from the next available ID
-        # This ensures IDs are sequential after deletions
-        # Get the maximum ID after deletion (but before commit)
-        max_id_result = db.execute(text("SELECT COALESCE(MAX(id), -1) FROM persons"))
-        max_id = max_id_result.scalar()
-        
-        if max_id == -1:
-            db.execute(text("SELECT setval('persons_id_seq', 1, false)"))
-        else:
-            db.execute(text("SELECT setval('persons_id_seq', :max_id, true)"), {"max_id": max_id})
-        
-        # Commit everything together (deletion + sequence reset)
+        version = models.bump_tree_version(db, current_user.id)
+        FamilyTreeService(db, owner_id=current_user.id).delete_subtree(db_person)
         db.commit()
-        
+        change_feed.publish(current_user.id, version, [{"op": "remove", "id": person_id}])
         return {"message": "Person and all descendants deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete person: {str(e)}")
+
+
+if database.ASYNC_DATABASE:
+    from app import async_api  # imported last: it reuses the helpers above
+
+    async_api.install(app)
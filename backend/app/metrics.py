@@ -0,0 +1,183 @@
+"""Per-route request metrics: latency, SQL statement count and time, serialization time, response size.
+
+MetricsMiddleware keeps a RequestStats for each request in a context variable. The engine
+hooks from instrument_engine() and encoding.dumps add to it, including from the threadpool
+and run_sync, which copy the context. The totals go to a Server-Timing header and to the
+process-wide registry, which /metrics renders in the Prometheus text format.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)  # bytes
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def add_serialize_time(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+def instrument_engine(engine) -> None:
+    """Count statements and their time against the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        start = getattr(context, "_metrics_start", None)
+        if stats is not None and start is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - start
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, buckets: Sequence[float], value: float) -> None:
+        self.counts[bisect_left(buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str, str], _Histogram] = {}  # (method, route, status)
+        self._size: Dict[Tuple[str, str], _Histogram] = {}  # (method, route)
+        self._queries: Dict[Tuple[str, str], int] = {}
+        self._db_seconds: Dict[Tuple[str, str], float] = {}
+        self._serialize_seconds: Dict[Tuple[str, str], float] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self._latency.setdefault((method, route, str(status)), _Histogram(LATENCY_BUCKETS)).observe(
+                LATENCY_BUCKETS, seconds
+            )
+            self._size.setdefault(key, _Histogram(SIZE_BUCKETS)).observe(SIZE_BUCKETS, size)
+            self._queries[key] = self._queries.get(key, 0) + stats.queries
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + stats.db_seconds
+            self._serialize_seconds[key] = self._serialize_seconds.get(key, 0.0) + stats.serialize_seconds
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            _histogram_lines(lines, "famtree_http_request_duration_seconds", "Request latency by route",
+                             ("method", "route", "status"), self._latency, LATENCY_BUCKETS)
+            _histogram_lines(lines, "famtree_http_response_size_bytes", "Response body size by route",
+                             ("method", "route"), self._size, SIZE_BUCKETS)
+            for name, help_text, values in (
+                ("famtree_http_db_queries_total", "SQL statements executed by route", self._queries),
+                ("famtree_http_db_seconds_total", "Time spent in SQL statements by route", self._db_seconds),
+                ("famtree_http_serialize_seconds_total", "Time spent encoding responses by route",
+                 self._serialize_seconds),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [f"{name}{_labels(('method', 'route'), key)} {value}" for key, value in values.items()]
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            for values in (self._latency, self._size, self._queries, self._db_seconds, self._serialize_seconds):
+                values.clear()
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+def _histogram_lines(lines: list, name: str, help_text: str, label_names, histograms: dict, buckets) -> None:
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in histograms.items():
+        cumulative = 0
+        for bound, count in zip((*buckets, "+Inf"), histogram.counts):
+            cumulative += count
+            le = 'le="%s"' % (bound if bound == "+Inf" else f"{bound:g}")
+            lines.append(f"{name}_bucket{_labels(label_names, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label_names, key)} {histogram.total}")
+        lines.append(f"{name}_count{_labels(label_names, key)} {histogram.count}")
+
+
+def gauge_lines(prefix: str, help_text: str, values: dict) -> str:
+    """Prometheus gauges `{prefix}_{key}` for a dict of numbers (e.g. the pool snapshot)."""
+    lines = []
+    for key, value in values.items():
+        lines += [f"# HELP {prefix}_{key} {help_text}: {key}", f"# TYPE {prefix}_{key} gauge", f"{prefix}_{key} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware: time each HTTP request, add Server-Timing, record into `registry`.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streaming responses pass through untouched;
+    for those, Server-Timing covers the work done before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_with_timing(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                    f"serialize;dur={stats.serialize_seconds * 1000:.1f}, "
+                    f"total;dur={(time.perf_counter() - start) * 1000:.1f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode("latin-1"))]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            registry.record(
+                scope["method"], getattr(route, "path", "unmatched"), status,
+                time.perf_counter() - start, size, stats,
+            )
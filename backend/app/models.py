@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Enum, Index, event, func, inspect, literal, literal_column, select, update
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -8,26 +8,57 @@ class Gender(enum.Enum):
     FEMALE = "female"
     OTHER = "other"
 
+def last_name_key(column):
+    """Sort key for last names (NULL sorts as ''). Inlined, so it matches ix_persons_owner_name."""
+    return func.coalesce(column, literal_column("''"))
+
+
+def search_name_key(first_name, last_name):
+    """Lower-cased "first last" that name search prefix- and trigram-matches (ix_persons_owner_search_name)."""
+    return func.lower(first_name.concat(literal_column("' '")).concat(last_name_key(last_name)))
+
+
+def search_last_name_key(last_name):
+    """Lower-cased last name for last-name prefix search (ix_persons_owner_search_last_name)."""
+    return func.lower(last_name_key(last_name))
+
+
 class Person(Base):
     __tablename__ = "persons"
 
     id = Column(Integer, primary_key=True, index=True)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # User who owns this family tree
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # User who owns this family tree (indexed below)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=True)  # Optional, can be empty
     birth_date = Column(Date, nullable=False)
     gender = Column(String, nullable=False)  # Using String instead of Enum for simplicity
-    parent_id = Column(Integer, ForeignKey("persons.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("persons.id"), nullable=True, index=True)
     color = Column(String, nullable=True)  # Custom color for visualization (hex color code)
     font_size = Column(String, nullable=True)  # e.g. "12", "14" (px)
     font_family = Column(String, nullable=True)  # e.g. "Arial", "Georgia", "serif"
     font_color = Column(String, nullable=True)  # Text/label color (hex, e.g. "#ffffff")
     label_offset_x = Column(Float, nullable=True)  # Label position offset in px: negative=left, positive=right
     label_offset_y = Column(Float, nullable=True)  # Label position offset in px: negative=up, positive=down
+    lineage_path = Column(String, nullable=True)  # Ancestor ids root-first, e.g. "/1/5/" ("/" for a root); maintained below
 
     # Self-referential relationship
     parent = relationship("Person", remote_side=[id], backref="children")
 
+    __table_args__ = (
+        # Descendant lookups are prefix matches: lineage_path LIKE '/1/5/23/%'
+        Index("ix_persons_owner_lineage_path", "owner_id", "lineage_path",
+              postgresql_ops={"lineage_path": "text_pattern_ops"}),
+        # Children of a person in birth order, and the owner's roots (parent_id IS NULL)
+        Index("ix_persons_owner_parent_birth", "owner_id", "parent_id", "birth_date", "id"),
+        # Whole-tree loads: all of the owner's persons, oldest first
+        Index("ix_persons_owner_birth", "owner_id", "birth_date", "id"),
+        # Keyset pages of /api/persons?order_by=name
+        Index("ix_persons_owner_name", "owner_id", last_name_key(last_name), "first_name", "id"),
+        # Name search (app/search.py) also uses Postgres-only indexes created by migration 014:
+        # "C"-collated b-trees on search_name_key / search_last_name_key and a btree_gin +
+        # pg_trgm GIN index on (owner_id, search_name_key).
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -36,3 +67,69 @@ class User(Base):
     username = Column(String, unique=True, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
     is_admin = Column(Boolean, nullable=False, default=False)  # Admin can create users and manage accounts
+    tree_version = Column(Integer, nullable=False, default=0, server_default="0")  # see bump_tree_version
+
+
+def bump_tree_version(db, owner_id: int) -> int:
+    """Start a new version of owner_id's tree in the caller's transaction; returns it.
+
+    Anything that writes an owner's persons must call this before committing, so every
+    process serving cached trees (tree_cache) sees the change. Call it before touching
+    persons: the users row lock then serializes one owner's writes in a fixed order.
+    """
+    users = User.__table__
+    return db.execute(
+        update(users).where(users.c.id == owner_id).values(tree_version=users.c.tree_version + 1)
+        .returning(users.c.tree_version)
+    ).scalar() or 0
+
+
+def tree_version(db, owner_id: int) -> int:
+    """owner_id's current tree version (one primary key lookup)."""
+    return db.execute(select(User.tree_version).where(User.id == owner_id)).scalar() or 0
+
+
+def subtree_prefix(lineage_path: str, person_id: int) -> str:
+    """lineage_path prefix shared by every descendant of the given person."""
+    return f"{lineage_path or '/'}{person_id}/"
+
+
+def ancestor_ids(lineage_path: str) -> list:
+    """Ancestor ids from a lineage_path, root first."""
+    return [int(part) for part in (lineage_path or "").split("/") if part]
+
+
+def _path_below(connection, parent_id) -> str:
+    if parent_id is None:
+        return "/"
+    parent_path = connection.scalar(select(Person.lineage_path).where(Person.id == parent_id))
+    return subtree_prefix(parent_path, parent_id)
+
+
+@event.listens_for(Person, "before_insert")
+def _set_lineage_path(mapper, connection, target):
+    # Bulk loaders may compute paths themselves; only look the parent up when they didn't
+    if target.lineage_path is None:
+        target.lineage_path = _path_below(connection, target.parent_id)
+
+
+@event.listens_for(Person, "before_update")
+def _move_lineage_path(mapper, connection, target):
+    """When parent_id changes, re-root the person's path and every descendant's path.
+
+    The ORM writes target.lineage_path after every before_update hook of the flush has
+    run, so a flush may carry one move per subtree only: flush moves that can touch each
+    other's subtrees one at a time.
+    """
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    # Read the stored path: a move flushed earlier in the transaction may have changed it
+    stored_path = connection.scalar(select(Person.lineage_path).where(Person.id == target.id))
+    old_prefix = subtree_prefix(stored_path, target.id)
+    target.lineage_path = _path_below(connection, target.parent_id)
+    new_prefix = subtree_prefix(target.lineage_path, target.id)
+    connection.execute(
+        update(Person.__table__)
+        .where(Person.owner_id == target.owner_id, Person.lineage_path.like(old_prefix + "%"))
+        .values(lineage_path=literal(new_prefix).concat(func.substr(Person.lineage_path, len(old_prefix) + 1)))
+    )
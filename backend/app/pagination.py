@@ -0,0 +1,78 @@
+"""Keyset (cursor) pagination and column projection for person listings."""
+import base64
+import json
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select, tuple_
+
+from app import models
+from app.services import PERSON_FIELDS
+
+# Sort keys for each ordering; id last so every key is unique
+PERSON_ORDERINGS = {
+    "id": (models.Person.id,),
+    "name": (models.last_name_key(models.Person.last_name), models.Person.first_name, models.Person.id),
+}
+# Python type of each sort key, checked before a cursor value is bound to it
+CURSOR_TYPES = {"id": (int,), "name": (str, str, int)}
+MAX_ID = 2 ** 31 - 1  # persons.id is a 32-bit integer
+
+
+def _valid_cursor_value(value, expected: type) -> bool:
+    if expected is int:
+        return type(value) is int and -MAX_ID - 1 <= value <= MAX_ID  # bool is not an id
+    return isinstance(value, str) and "\x00" not in value  # Postgres text can't hold NUL
+
+
+def encode_cursor(values: Sequence) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: str) -> Optional[list]:
+    """Decode a cursor from encode_cursor; None if it is malformed or for another ordering.
+
+    Values are type-checked against the ordering's sort keys, so a forged cursor is a 400
+    rather than a database error.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        return None
+    types = CURSOR_TYPES[order_by]
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    if not all(_valid_cursor_value(value, expected) for value, expected in zip(values, types)):
+        return None
+    return values
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= projection; None if it names an unknown field."""
+    if not fields:
+        return list(PERSON_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if any(name not in PERSON_FIELDS for name in names):
+        return None
+    if "id" not in names:
+        names.append("id")  # always sent so rows can be addressed
+    return [name for name in PERSON_FIELDS if name in names]
+
+
+def persons_page_statement(owner_filter, fields: List[str], order_by: str = "id",
+                           after: Optional[list] = None, limit: Optional[int] = None):
+    """SELECT of the projected columns plus the sort keys, starting after a cursor.
+
+    Sort keys are appended as extra trailing columns; callers read the first
+    len(fields) columns of each row and build the next cursor from the rest.
+    """
+    keys = PERSON_ORDERINGS[order_by]
+    stmt = (
+        select(*(getattr(models.Person, name) for name in fields), *keys)
+        .where(owner_filter)
+        .order_by(*keys)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(*keys) > tuple_(*after))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
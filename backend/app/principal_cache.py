@@ -0,0 +1,74 @@
+"""TTL/LRU cache of authenticated principals, keyed by bearer token."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))  # tokens kept in memory
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))  # seconds before the user row is re-read
+
+
+class Principal:
+    """The authenticated user as handlers see it: a detached snapshot of the users row."""
+    __slots__ = ("id", "username", "is_admin")
+
+    def __init__(self, id: int, username: str, is_admin: bool):
+        self.id = id
+        self.username = username
+        self.is_admin = is_admin
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.username, bool(user.is_admin))
+
+
+class PrincipalCache:
+    """Maps a verified token to its Principal, so a request costs no JWT decode and no query.
+
+    An entry lives until the token expires or for `ttl` seconds, whichever is first.
+    invalidate(username) drops every token of that user (password or admin change in this
+    process); changes made elsewhere (other workers, ensure_admin.py) show up within `ttl`.
+    """
+
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # token -> (principal, expires_at, generation)
+        self._generations: Dict[str, int] = {}  # username -> invalidation count
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at, generation = entry
+            if expires_at <= time.time() or generation != self._generations.get(principal.username, 0):
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            generation = self._generations.get(principal.username, 0)
+            self._entries[token] = (principal, expires_at, generation)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        """Forget all cached tokens of username. Call after changing its password or admin flag."""
+        with self._lock:
+            self._generations[username] = self._generations.get(username, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,174 @@
+"""Lowest-common-ancestor index and kinship terms for /api/relationship."""
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.tree_cache import TREE_CACHE_SIZE
+
+ORDINALS = ("first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth")
+TIMES = ("once", "twice", "three times")
+
+
+class LcaIndex:
+    """O(1) lowest common ancestor queries over one owner's persons (a forest).
+
+    Persons are laid out in depth-first (Euler tour entry) order, so every subtree is a
+    contiguous range. For u entered before v, lca(u, v) is the parent of the shallowest
+    node in (tin[u], tin[v]]; a sparse table answers that range minimum with two lookups.
+    If the shallowest node is a root, u and v are in different trees. Persons caught in a
+    parent_id cycle are not reachable from any root and are left out.
+    """
+
+    def __init__(self, ids: np.ndarray, parent_ids: np.ndarray):
+        """ids and parent_ids as returned by load_structure: sorted by id, -1 for no parent."""
+        self.ids, self.parent_ids = ids, parent_ids
+        n = len(ids)
+
+        # Parent as a row index; -1 for roots and for parents owned by someone else
+        parent = np.searchsorted(ids, parent_ids).clip(0, max(n - 1, 0))
+        self.parent = np.where((parent_ids >= 0) & (ids[parent] == parent_ids), parent, -1) if n else parent
+
+        # Children grouped by parent (CSR), then an iterative depth-first walk from every root
+        child_order = np.argsort(self.parent, kind="stable")
+        first_child = np.searchsorted(self.parent[child_order], np.arange(-1, n + 1))
+        children, starts = child_order.tolist(), first_child.tolist()  # starts[i + 1]: children of i
+        order, depth = [], [0] * n
+        stack = children[starts[0]:starts[1]]  # roots
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            kids = children[starts[node + 1]:starts[node + 2]]
+            for child in kids:
+                depth[child] = depth[node] + 1
+            stack.extend(kids)
+
+        self.order = np.asarray(order, dtype=np.int32)
+        self.depth = np.asarray(depth, dtype=np.int32)
+        self.tin = np.full(n, -1, dtype=np.int32)
+        self.tin[self.order] = np.arange(len(order), dtype=np.int32)
+
+        # table[k][i]: position of the shallowest node in order[i : i + 2**k]
+        order_depth = self.depth[self.order]
+        self.table = [np.arange(len(order), dtype=np.int32)]
+        span = 1
+        while 2 * span <= len(order):
+            prev = self.table[-1]
+            left, right = prev[:-span], prev[span:]
+            self.table.append(np.where(order_depth[left] <= order_depth[right], left, right))
+            span *= 2
+        self._order_depth = order_depth
+
+    def same_structure(self, ids: np.ndarray, parent_ids: np.ndarray) -> bool:
+        """True if (ids, parent_ids) sorted by id describe the tree this index was built from."""
+        return np.array_equal(ids, self.ids) and np.array_equal(parent_ids, self.parent_ids)
+
+    def index_of(self, person_id: int) -> int:
+        """Row of person_id, or -1 if it is not indexed (not owned, or in a parent_id cycle)."""
+        i = int(np.searchsorted(self.ids, person_id))
+        if i == len(self.ids) or self.ids[i] != person_id or self.tin[i] < 0:
+            return -1
+        return i
+
+    def lca(self, u: int, v: int) -> int:
+        """Row of the lowest common ancestor of rows u and v, or -1 if they are unrelated."""
+        if u == v:
+            return u
+        lo, hi = sorted((int(self.tin[u]), int(self.tin[v])))
+        lo += 1
+        k = (hi - lo + 1).bit_length() - 1
+        a, b = self.table[k][lo], self.table[k][hi - (1 << k) + 1]
+        shallowest = a if self._order_depth[a] <= self._order_depth[b] else b
+        return int(self.parent[self.order[shallowest]])
+
+    def relate(self, u: int, v: int) -> Optional[Tuple[int, int, int]]:
+        """(common ancestor id, generations from u up to it, from v up to it) for rows u and v.
+
+        None if they have no common ancestor.
+        """
+        ancestor = self.lca(u, v)
+        if ancestor < 0:
+            return None
+        depth = int(self.depth[ancestor])
+        return int(self.ids[ancestor]), int(self.depth[u]) - depth, int(self.depth[v]) - depth
+
+
+def load_structure(rows) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids, parent_ids) sorted by id from (id, parent_id) rows; parent_id None becomes -1."""
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    parents = np.fromiter((-1 if row[1] is None else row[1] for row in rows), dtype=np.int64, count=len(rows))
+    by_id = np.argsort(ids, kind="stable")
+    return ids[by_id], parents[by_id]
+
+
+class LcaIndexStore:
+    """Last index built per owner, so a new tree version with the same parent links reuses it.
+
+    Renames, style and layout edits bump the tree version but leave the structure alone;
+    only edits to parent links (create, delete, re-parent, import) need a rebuild. An
+    index takes about 100 bytes per person (mostly the sparse table), so like tree_cache
+    this keeps only the max_owners most recently used owners.
+    """
+
+    def __init__(self, max_owners: int = TREE_CACHE_SIZE):
+        self.max_owners = max_owners
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Optional[int], LcaIndex]" = OrderedDict()
+
+    def get(self, owner_id: Optional[int], rows) -> LcaIndex:
+        ids, parent_ids = load_structure(rows)
+        with self._lock:
+            index = self._indexes.get(owner_id)
+        if index is None or not index.same_structure(ids, parent_ids):
+            index = LcaIndex(ids, parent_ids)
+        with self._lock:
+            self._indexes[owner_id] = index
+            self._indexes.move_to_end(owner_id)
+            while len(self._indexes) > self.max_owners:
+                self._indexes.popitem(last=False)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+lca_indexes = LcaIndexStore()
+
+
+def _greats(n: int) -> str:
+    """Prefix for n generations beyond "grand": "", "great-", "great-great-", "3x great-", ..."""
+    if n <= 2:
+        return "great-" * n
+    return f"{n}x great-"
+
+
+def _gendered(gender: Optional[str], male: str, female: str, neutral: str) -> str:
+    return male if gender == "male" else female if gender == "female" else neutral
+
+
+def kinship_term(up_a: int, up_b: int, gender: Optional[str] = None) -> str:
+    """What a is to b, given how many generations each is below their common ancestor.
+
+    gender is a's ("male", "female" or anything else for a neutral term).
+    """
+    if up_a == 0 and up_b == 0:
+        return "self"
+    if up_a == 0:  # a is b's ancestor
+        base = _gendered(gender, "father", "mother", "parent")
+        return base if up_b == 1 else _greats(up_b - 2) + "grand" + base
+    if up_b == 0:  # a is b's descendant
+        base = _gendered(gender, "son", "daughter", "child")
+        return base if up_a == 1 else _greats(up_a - 2) + "grand" + base
+    if up_a == 1 and up_b == 1:
+        return _gendered(gender, "brother", "sister", "sibling")
+    if up_a == 1:  # a is a sibling of b's ancestor
+        return _greats(up_b - 2) + _gendered(gender, "uncle", "aunt", "aunt/uncle")
+    if up_b == 1:  # a descends from b's sibling
+        return _greats(up_a - 2) + _gendered(gender, "nephew", "niece", "niece/nephew")
+    degree, removal = min(up_a, up_b) - 1, abs(up_a - up_b)
+    term = (ORDINALS[degree - 1] if degree <= len(ORDINALS) else f"{degree}th") + " cousin"
+    if removal:
+        term += " " + (TIMES[removal - 1] if removal <= len(TIMES) else f"{removal} times") + " removed"
+    return term
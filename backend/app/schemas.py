@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 class PersonBase(BaseModel):
     first_name: str
@@ -24,6 +24,11 @@ class PersonResponse(PersonBase):
     class Config:
         from_attributes = True
 
+class PersonSearchResult(PersonResponse):
+    """Hit of /api/persons/search, best first."""
+    match: Literal["prefix", "last_name", "fuzzy"]  # full name starts with q, last name does, or trigram match
+    score: float  # 1.0 for prefix matches, word similarity for fuzzy ones
+
 class PersonTree(PersonResponse):
     children: List['PersonTree'] = []
     generation: int = 0
@@ -38,6 +43,118 @@ class PersonTree(PersonResponse):
 PersonTree.model_rebuild()
 
 
+class ViewportNode(PersonResponse):
+    generation: int = 0
+    x: float = 0.0
+    y: float = 0.0
+
+
+class ViewportCluster(BaseModel):
+    """Nodes folded together at this zoom (all deeper than the anchor node of their cell)."""
+    x: float  # Centroid
+    y: float
+    count: int
+    generation_min: int
+    generation_max: int
+    anchor_id: int  # The node shown for the same screen cell
+
+
+class TreeViewport(BaseModel):
+    """Part of the radial layout inside a bounding box (/api/tree/viewport)."""
+    bbox: List[float]
+    zoom: float
+    total: int  # Nodes inside the box, before aggregation
+    nodes: List[ViewportNode]
+    clusters: List[ViewportCluster]
+
+
+class LabelOffset(BaseModel):
+    id: int
+    label_offset_x: float
+    label_offset_y: float
+
+
+class LabelOffsets(BaseModel):
+    """Suggested label offsets for the radial layout (/api/tree/label-offsets)."""
+    offsets: List[LabelOffset]  # Labels that should move; persons with user-set offsets are never listed
+    unresolved: List[int]  # Ids of labels for which no free position was found
+    kept: int  # Number of labels with user-set offsets, left alone
+
+
+class RelationshipResponse(BaseModel):
+    """How person a is related to person b (/api/relationship)."""
+    a: PersonResponse
+    b: PersonResponse
+    relationship: str  # What a is to b, e.g. "first cousin once removed"; "unrelated" if no common ancestor
+    common_ancestor: Optional[PersonResponse] = None  # Lowest common ancestor
+    generations_a: Optional[int] = None  # Generations from a up to the common ancestor
+    generations_b: Optional[int] = None  # Generations from b up to the common ancestor
+
+
+class PersonSubtree(PersonResponse):
+    """Node of a depth-limited subtree (/api/tree?root_id=&depth=)."""
+    children: List['PersonSubtree'] = []
+    generation: int = 0  # Relative to the requested root
+    has_more: bool = False  # True if this node has children beyond the requested depth
+    child_count: int = 0  # Number of children, including ones not sent
+
+PersonSubtree.model_rebuild()
+
+
+class PersonBatchCreate(PersonCreate):
+    ref: Optional[str] = None  # Client-side name, so later creates in the batch can use it
+    parent_ref: Optional[str] = None  # ref of an earlier create in the batch (instead of parent_id)
+
+
+class PersonBatchUpdate(PersonCreate):
+    id: int
+
+
+class PersonBatch(BaseModel):
+    create: List[PersonBatchCreate] = []
+    update: List[PersonBatchUpdate] = []
+    delete: List[int] = []  # Each deletes the person and all descendants
+
+
+class PersonBatchResponse(BaseModel):
+    created: List[PersonResponse] = []  # In request order
+    updated: List[PersonResponse] = []
+    deleted: List[int] = []  # Every removed id, descendants included
+
+
+class PersonPatch(BaseModel):
+    """Partial update: only the fields present in the request body are written."""
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    birth_date: Optional[date] = None
+    gender: Optional[str] = None
+    parent_id: Optional[int] = None
+    color: Optional[str] = None
+    font_size: Optional[str] = None
+    font_family: Optional[str] = None
+    font_color: Optional[str] = None
+    label_offset_x: Optional[float] = None
+    label_offset_y: Optional[float] = None
+
+
+class LayoutEdit(BaseModel):
+    """A label drag or color change; fields left out are not touched."""
+    id: int
+    label_offset_x: Optional[float] = None
+    label_offset_y: Optional[float] = None
+    color: Optional[str] = None
+
+
+class LayoutEditResponse(BaseModel):
+    accepted: int  # Edits queued; they are written within the debounce window
+
+
+class ImportResponse(BaseModel):
+    imported: int
+    skipped: int
+    errors: List[str] = []  # First few skipped records and why
+
+
 # Auth schemas
 class UserCreate(BaseModel):
     username: str
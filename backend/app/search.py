@@ -0,0 +1,193 @@
+"""Name search over one owner's persons (GET /api/persons/search).
+
+Matches are ranked in three tiers: the full name ("first last") starts with the query,
+then the last name does, then fuzzy matches (pg_trgm word similarity) best first. On
+Postgres each tier is one indexed query (migration 014); names compare in "C" (code
+point) order, the same order NameIndex sorts in. Other databases use NameIndex,
+an in-process index per owner kept in tree_cache, so it is rebuilt after mutations.
+"""
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, literal, not_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services import PERSON_COLUMNS, PERSON_FIELDS
+from app.tree_cache import tree_cache
+
+MAX_SEARCH_LIMIT = 50
+MIN_FUZZY_LENGTH = 3  # shorter queries have too few trigrams to match on
+WORD_SIMILARITY_THRESHOLD = 0.6  # pg_trgm.word_similarity_threshold default
+
+_WORD = re.compile(r"\w+")
+_LIKE_SPECIAL = re.compile(r"([\\%_])")
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.lower().split())
+
+
+def search_name(first_name: str, last_name: Optional[str]) -> str:
+    """Python twin of models.search_name_key."""
+    return f"{first_name} {last_name or ''}".lower()
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """Sorted name keys for prefix search plus a trigram inverted index, for one owner.
+
+    The trigram index is built on the first fuzzy search and covers distinct names only,
+    which in a family tree are far fewer than persons.
+    """
+
+    def __init__(self, rows):
+        # rows: (id, first_name, last_name)
+        self._last_names = {}
+        self._by_name = {}
+        self._full: List[Tuple[str, int]] = []
+        self._last: List[Tuple[str, str, int]] = []
+        self._grams = None
+        for person_id, first_name, last_name in rows:
+            name, last = search_name(first_name, last_name), (last_name or "").lower()
+            self._last_names[person_id] = last
+            self._by_name.setdefault(name, []).append(person_id)
+            self._full.append((name, person_id))
+            if last:
+                self._last.append((last, name, person_id))
+        self._full.sort()
+        self._last.sort()
+
+    def search(self, q: str, limit: int, fuzzy: bool = True) -> List[Tuple[int, str, float]]:
+        """(person id, match, score) for a normalized query, best first."""
+        hits = []
+        for person_id, match in self._prefix_matches(q):
+            if len(hits) == limit:
+                return hits
+            hits.append((person_id, match, 1.0))
+        if fuzzy and len(q) >= MIN_FUZZY_LENGTH:
+            hits += self._fuzzy_matches(q, limit - len(hits))
+        return hits
+
+    def _prefix_matches(self, q: str) -> Iterator[Tuple[int, str]]:
+        i = bisect_left(self._full, (q,))
+        while i < len(self._full) and self._full[i][0].startswith(q):
+            yield self._full[i][1], "prefix"
+            i += 1
+        i = bisect_left(self._last, (q,))
+        while i < len(self._last) and self._last[i][0].startswith(q):
+            if not self._last[i][1].startswith(q):  # already yielded as a full-name prefix
+                yield self._last[i][2], "last_name"
+            i += 1
+
+    def _trigram_index(self) -> dict:
+        if self._grams is None:  # concurrent first searches may both build it; either result is fine
+            grams = {}
+            for name in self._by_name:
+                for gram in trigrams(name):
+                    grams.setdefault(gram, []).append(name)
+            self._grams = grams
+        return self._grams
+
+    def _fuzzy_matches(self, q: str, limit: int) -> List[Tuple[int, str, float]]:
+        query_grams = trigrams(q)
+        if not query_grams or limit <= 0:
+            return []
+        index = self._trigram_index()
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(index.get(gram, ()))
+        scored = []
+        for name, count in shared.items():
+            score = count / len(query_grams)
+            if score < WORD_SIMILARITY_THRESHOLD or name.startswith(q):
+                continue
+            scored += [
+                (-score, name, person_id) for person_id in self._by_name[name]
+                if not self._last_names[person_id].startswith(q)
+            ]
+        scored.sort()
+        return [(person_id, "fuzzy", -score) for score, _, person_id in scored[:limit]]
+
+
+def _like_prefix(q: str) -> str:
+    return _LIKE_SPECIAL.sub(r"\\\1", q) + "%"
+
+
+def postgres_tiers(owner_id: int, q: str, fuzzy: bool = True) -> List[tuple]:
+    """(match, SELECT of PERSON_COLUMNS plus score, best first) per tier, without LIMIT.
+
+    The prefix tiers compare and order by the "C"-collated keys of the b-trees from
+    migration 014, so each is an index range scan in ORDER BY order that stops at LIMIT.
+    """
+    P = models.Person
+    name = models.search_name_key(P.first_name, P.last_name).collate("C")
+    last_name = models.search_last_name_key(P.last_name).collate("C")
+    pattern = _like_prefix(q)
+    owned = P.owner_id == owner_id
+    name_prefix, last_prefix = name.like(pattern), last_name.like(pattern)
+    tiers = [
+        ("prefix", and_(owned, name_prefix), literal(1.0), (name, P.id)),
+        ("last_name", and_(owned, last_prefix, not_(name_prefix)), literal(1.0), (last_name, name, P.id)),
+    ]
+    if fuzzy and len(q) >= MIN_FUZZY_LENGTH:
+        trigram_name = models.search_name_key(P.first_name, P.last_name)  # as in the trigram index
+        score = func.word_similarity(q, trigram_name)
+        tiers.append((
+            "fuzzy", and_(owned, literal(q).op("<%")(trigram_name), not_(name_prefix), not_(last_prefix)),
+            score, (score.desc(), name, P.id),
+        ))
+    return [
+        (match, select(*PERSON_COLUMNS, score).where(condition).order_by(*order_by))
+        for match, condition, score, order_by in tiers
+    ]
+
+
+def _postgres_search(db: Session, owner_id: int, q: str, limit: int, fuzzy: bool) -> List[dict]:
+    results = []
+    for match, stmt in postgres_tiers(owner_id, q, fuzzy):
+        if len(results) == limit:
+            break
+        rows = db.execute(stmt.limit(limit - len(results))).all()
+        results += [dict(zip(PERSON_FIELDS, row[:-1]), match=match, score=float(row[-1])) for row in rows]
+    return results
+
+
+def _owner_index(db: Session, owner_id: int) -> NameIndex:
+    P = models.Person
+
+    def build():
+        return NameIndex(db.query(P.id, P.first_name, P.last_name).filter(P.owner_id == owner_id).all())
+
+    return tree_cache.get(owner_id, models.tree_version(db, owner_id), "search:index", build)
+
+
+def search_persons(db: Session, owner_id: int, q: str, limit: int = 10, fuzzy: bool = True) -> List[dict]:
+    """PersonResponse dicts plus `match` (prefix, last_name or fuzzy) and `score`, best first."""
+    q = normalize_query(q)
+    if not q:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _postgres_search(db, owner_id, q, limit, fuzzy)
+
+    hits = _owner_index(db, owner_id).search(q, limit, fuzzy)
+    if not hits:
+        return []
+    rows = db.query(*PERSON_COLUMNS).filter(
+        models.Person.id.in_([person_id for person_id, _, _ in hits]), models.Person.owner_id == owner_id
+    ).all()
+    by_id = {row.id: row for row in rows}
+    return [
+        dict(zip(PERSON_FIELDS, by_id[person_id]), match=match, score=score)
+        for person_id, match, score in hits if person_id in by_id
+    ]
@@ -1,24 +1,153 @@
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, case, delete, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from typing import Optional, List
 from app import models, schemas
+from app.layout import radial_layout
 from datetime import datetime
-import math
+
+MAX_SUBTREE_DEPTH = 1000  # largest depth accepted for depth-limited subtree queries
+
+# Columns of a person as returned by the API (schemas.PersonResponse field order)
+PERSON_FIELDS = tuple(schemas.PersonResponse.model_fields)
+PERSON_COLUMNS = tuple(getattr(models.Person, name) for name in PERSON_FIELDS)
+
+
+def person_dict(person) -> dict:
+    """PersonResponse-shaped dict from a Person (or column row) without pydantic validation."""
+    return {name: getattr(person, name) for name in PERSON_FIELDS}
+
+
+class FlatTree:
+    """A tree of persons in breadth-first order, with parent links stored as list indices.
+
+    Index 0 is the root; every parent appears before its children, and siblings keep
+    the order of the input rows (birth_date ascending when loaded by the service).
+    """
+
+    def __init__(self, persons: list, parent_index: List[int], generation: List[int]):
+        self.persons = persons
+        self.parent_index = parent_index  # -1 for the root
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self.persons)
+
+    @classmethod
+    def from_persons(cls, persons: list, root: models.Person) -> "FlatTree":
+        """Walk the parent -> children adjacency of already-loaded rows, starting at root."""
+        children = {}
+        for p in persons:
+            if p.parent_id is not None:
+                children.setdefault(p.parent_id, []).append(p)
+
+        ordered = [root]
+        parent_index = [-1]
+        generation = [0]
+        seen = {root.id}
+        i = 0
+        while i < len(ordered):
+            for child in children.get(ordered[i].id, ()):
+                if child.id in seen:  # guard against parent_id cycles
+                    continue
+                seen.add(child.id)
+                ordered.append(child)
+                parent_index.append(i)
+                generation.append(generation[i] + 1)
+            i += 1
+        return cls(ordered, parent_index, generation)
+
+
+def flat_tree(persons: list, root=None) -> Optional[FlatTree]:
+    """FlatTree of rows as load_persons returns them, from root.
+
+    Without root, the same rule as find_root: the oldest person without a parent, else
+    the oldest person. None if there are no persons.
+    """
+    if root is None:
+        root = next((p for p in persons if p.parent_id is None), persons[0] if persons else None)
+        if root is None:
+            return None
+    return FlatTree.from_persons(persons, root)
+
+
+def tree_nodes(flat: FlatTree, generation: int = 0, layout: Optional[str] = None) -> List[dict]:
+    """One PersonTree-shaped dict per person of a flat tree, in breadth-first order."""
+    nodes = [
+        dict(person_dict(p), children=[], generation=generation + g, angle=0.0, radius=0.0, x=0.0, y=0.0)
+        for p, g in zip(flat.persons, flat.generation)
+    ]
+    if layout == "radial":
+        positions = radial_layout(flat.parent_index, [node["generation"] for node in nodes])
+        for name, column in positions.items():
+            for node, value in zip(nodes, column.tolist()):
+                node[name] = value
+    return nodes
+
+
+def tree_data(flat: FlatTree, generation: int = 0, layout: Optional[str] = None) -> dict:
+    """The nested PersonTree dicts of a flat tree (what FamilyTreeService.build_tree_data returns)."""
+    nodes = tree_nodes(flat, generation, layout)
+    # Breadth-first order keeps each parent's children in birth_date order
+    for i in range(1, len(nodes)):
+        nodes[flat.parent_index[i]]["children"].append(nodes[i])
+    return nodes[0]
+
+
+def subtree_data(rows: list, depth: int) -> Optional[dict]:
+    """Nested dicts from FamilyTreeService.subtree_query rows (see build_subtree_data)."""
+    if not rows:
+        return None
+    nodes = {}
+    for row in rows:
+        *values, generation, frontier_children = row
+        node = dict(zip(PERSON_FIELDS, values), children=[], generation=generation,
+                    has_more=frontier_children > 0, child_count=frontier_children)
+        nodes[node["id"]] = node
+        parent = nodes.get(node["parent_id"]) if generation else None
+        if parent is not None:
+            parent["children"].append(node)
+    # Interior nodes have all their children included
+    for node in nodes.values():
+        if node["generation"] < depth:
+            node["child_count"] = len(node["children"])
+    return nodes[rows[0].id]
+
+
+def whole_subtree_data(root, descendants: list) -> dict:
+    """Nested dicts for root and all of its descendants (rows as load_descendants returns them)."""
+    flat = FlatTree.from_persons(descendants, root)
+    nodes = [
+        dict(person_dict(p), children=[], generation=g, has_more=False, child_count=0)
+        for p, g in zip(flat.persons, flat.generation)
+    ]
+    for i in range(1, len(nodes)):
+        parent = nodes[flat.parent_index[i]]
+        parent["children"].append(nodes[i])
+        parent["child_count"] += 1
+    return nodes[0]
+
 
 class FamilyTreeService:
     def __init__(self, db: Session, owner_id: Optional[int] = None):
         self.db = db
         self.owner_id = owner_id
 
-    def _owner_filter(self):
-        """Query filter for current owner's persons."""
+    def _owner_filter(self, person=models.Person):
+        """Query filter for current owner's persons (optionally on an aliased Person)."""
         if self.owner_id is None:
-            return models.Person.owner_id.is_(None)  # Legacy: no owner
-        return models.Person.owner_id == self.owner_id
+            return person.owner_id.is_(None)  # Legacy: no owner
+        return person.owner_id == self.owner_id
 
     def find_root(self) -> Optional[models.Person]:
         """Find the oldest person (root of the tree) for the current owner."""
         base = self.db.query(models.Person).filter(self._owner_filter())
-        root = base.filter(models.Person.parent_id == None).first()
+        root = (
+            base.filter(models.Person.parent_id == None)
+            .order_by(models.Person.birth_date.asc(), models.Person.id.asc())
+            .first()
+        )
         if not root:
             root = base.order_by(models.Person.birth_date.asc()).first()
         return root
@@ -32,91 +161,244 @@ class FamilyTreeService:
             .all()
         )
 
-    def build_tree(self, person: Optional[models.Person] = None, generation: int = 0) -> Optional[schemas.PersonTree]:
-        """Build the family tree structure with positioning data for fan chart."""
-        if person is None:
-            person = self.find_root()
-            if not person:
-                return None
-        
-        # Get children
-        children = self.get_children(person.id)
-        
-        # Build tree node
-        tree_node = schemas.PersonTree(
-            id=person.id,
-            first_name=person.first_name,
-            last_name=person.last_name,
-            birth_date=person.birth_date,
-            gender=person.gender,
-            parent_id=person.parent_id,
-            color=person.color,
-            font_size=getattr(person, 'font_size', None),
-            font_family=getattr(person, 'font_family', None),
-            font_color=getattr(person, 'font_color', None),
-            label_offset_x=getattr(person, 'label_offset_x', None),
-            label_offset_y=getattr(person, 'label_offset_y', None),
-            generation=generation,
-            children=[]
+    def root_id_query(self):
+        """SELECT of find_root's person id: the oldest parentless person, else the oldest."""
+        P = models.Person
+        return (
+            select(P.id).where(self._owner_filter())
+            .order_by(P.parent_id.is_not(None), P.birth_date.asc(), P.id.asc()).limit(1)
+        )
+
+    def persons_query(self):
+        """SELECT of the current owner's persons (PERSON_COLUMNS), oldest first."""
+        return (
+            select(*PERSON_COLUMNS)
+            .where(self._owner_filter())
+            .order_by(models.Person.birth_date.asc(), models.Person.id.asc())
+        )
+
+    def load_persons(self) -> list:
+        """Load all of the current owner's persons in one query, oldest first.
+
+        Returns lightweight column rows (attribute access like models.Person) rather than
+        ORM instances, since tree building only reads them.
+        """
+        return self.db.execute(self.persons_query()).all()
+
+    def load_parent_links(self) -> list:
+        """(id, parent_id) of all of the current owner's persons, in no particular order."""
+        return self.db.query(models.Person.id, models.Person.parent_id).filter(self._owner_filter()).all()
+
+    def build_flat_tree(self, person: Optional[models.Person] = None) -> Optional["FlatTree"]:
+        """Load the owner's persons once and lay the tree out breadth-first in memory."""
+        return flat_tree(self.load_persons(), person)
+
+    def build_tree_data(
+        self, person: Optional[models.Person] = None, generation: int = 0, layout: Optional[str] = None
+    ) -> Optional[dict]:
+        """Same tree as build_tree, as plain dicts: no pydantic models, no validation.
+
+        Rows come straight from the database, so this is the path the API serializes.
+        """
+        flat = self.build_flat_tree(person)
+        return tree_data(flat, generation, layout) if flat is not None else None
+
+    def build_tree(
+        self, person: Optional[models.Person] = None, generation: int = 0, layout: Optional[str] = None
+    ) -> Optional[schemas.PersonTree]:
+        """Build the family tree structure with positioning data for fan chart.
+
+        With layout="radial" the x/y/angle/radius of every node are filled in as well.
+        """
+        flat = self.build_flat_tree(person)
+        if flat is None:
+            return None
+        trees = [schemas.PersonTree.model_construct(**node) for node in tree_nodes(flat, generation, layout)]
+        for i in range(1, len(trees)):
+            trees[flat.parent_index[i]].children.append(trees[i])
+        return trees[0]
+
+    def build_subtree_data(self, root_id: int, depth: Optional[int] = None) -> Optional[dict]:
+        """Nested dicts for root_id and at most `depth` generations below it (all if None).
+
+        generation is relative to root_id. Nodes on the last level carry has_more and
+        child_count, so a client can expand them later.
+        """
+        if depth is None:
+            root = self.db.execute(self.subtree_root_query(root_id)).first()
+            return whole_subtree_data(root, self.load_descendants(root)) if root is not None else None
+        return subtree_data(self.db.execute(self.subtree_query(root_id, depth)).all(), depth)
+
+    def subtree_query(self, root_id: int, depth: int):
+        """SELECT of root_id and `depth` generations below it: PERSON_COLUMNS, depth, child count.
+
+        A recursive CTE walks parent_id down from root_id, so only the requested levels
+        are read; children are counted (correlated subquery) only for the last level.
+        """
+        P = models.Person
+        level = (
+            select(P.id, literal(0).label("depth"))
+            .where(P.id == root_id, self._owner_filter())
+            .cte("subtree", recursive=True)
+        )
+        level = level.union_all(
+            select(P.id, (level.c.depth + 1).label("depth"))
+            .join(level, P.parent_id == level.c.id)
+            .where(self._owner_filter(), level.c.depth < depth)
+        )
+        Child = aliased(models.Person)
+        child_count = (
+            select(func.count(Child.id))
+            .where(Child.parent_id == P.id, self._owner_filter(Child))
+            .scalar_subquery()
+        )
+        return (
+            select(*PERSON_COLUMNS, level.c.depth, case((level.c.depth == depth, child_count), else_=0))
+            .join(level, P.id == level.c.id)
+            .order_by(level.c.depth, P.birth_date, P.id)
+        )
+
+    def subtree_root_query(self, root_id: int):
+        """SELECT of root_id's PERSON_COLUMNS and lineage_path, if the owner has it."""
+        return select(*PERSON_COLUMNS, models.Person.lineage_path).where(
+            models.Person.id == root_id, self._owner_filter()
+        )
+
+    def descendants_query(self, person):
+        """SELECT of a person's descendants (needs id and lineage_path), oldest first."""
+        prefix = models.subtree_prefix(person.lineage_path, person.id)
+        return (
+            select(*PERSON_COLUMNS)
+            .where(self._owner_filter(), models.Person.lineage_path.like(prefix + "%"))
+            .order_by(models.Person.birth_date.asc(), models.Person.id.asc())
+        )
+
+    def load_descendants(self, person) -> list:
+        """All descendants of a person (needs id and lineage_path), oldest first, in one query."""
+        return self.db.execute(self.descendants_query(person)).all()
+
+    def ancestors_query(self, person):
+        """SELECT of a person's ancestors (needs lineage_path), in no particular order; None for a root."""
+        ids = models.ancestor_ids(person.lineage_path)
+        if not ids:
+            return None
+        return select(*PERSON_COLUMNS).where(self._owner_filter(), models.Person.id.in_(ids))
+
+    def load_ancestors(self, person) -> list:
+        """Ancestors of a person (needs lineage_path), root first, in one query."""
+        query = self.ancestors_query(person)
+        return root_first(self.db.execute(query).all(), person) if query is not None else []
+
+    def _subtrees_filter(self, persons):
+        prefixes = [models.subtree_prefix(p.lineage_path, p.id) for p in persons]
+        return and_(
+            self._owner_filter(),
+            or_(
+                models.Person.id.in_([p.id for p in persons]),
+                *(models.Person.lineage_path.like(prefix + "%") for prefix in prefixes),
+            ),
         )
-        
-        # Recursively build children
-        for child in children:
-            child_tree = self.build_tree(child, generation + 1)
-            if child_tree:
-                tree_node.children.append(child_tree)
-        
-        return tree_node
+
+    def delete_subtree(self, person) -> int:
+        """Delete a person and all their descendants in one owner-scoped statement.
+
+        Uses the lineage_path prefix, so no per-level walking and no table-wide work;
+        ids are never recompacted. Returns the number of rows deleted. Does not commit.
+        """
+        result = self.db.execute(
+            delete(models.Person)
+            .where(self._subtrees_filter([person]))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def delete_subtrees(self, persons: list) -> List[int]:
+        """Like delete_subtree for several persons at once; returns every deleted id."""
+        if not persons:
+            return []
+        result = self.db.execute(
+            delete(models.Person)
+            .where(self._subtrees_filter(persons))
+            .returning(models.Person.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars())
 
     def calculate_positions(self, tree: schemas.PersonTree, center_x: float = 0, center_y: float = 0) -> schemas.PersonTree:
         """Calculate radial positions for fan chart visualization"""
-        # Constants for visualization
-        BASE_RADIUS = 50  # Center node radius
-        RADIUS_INCREMENT = 100  # Distance between generations
-        BASE_ANGLE = 0  # Starting angle
-        
-        # Set center position for root
-        if tree.generation == 0:
-            tree.radius = 0
-            tree.angle = 0
-            tree.x = center_x
-            tree.y = center_y
-        else:
-            # This will be calculated by parent's positioning logic
-            pass
-        
-        if not tree.children:
-            return tree
-        
-        # Calculate positions for children
-        num_children = len(tree.children)
-        if num_children == 0:
-            return tree
-        
-        # Calculate angle span for children
-        # Each child gets equal angular space
-        total_angle_span = 2 * math.pi if num_children > 1 else 0
-        angle_per_child = total_angle_span / num_children if num_children > 1 else 0
-        
-        # Calculate radius for this generation
-        child_radius = BASE_RADIUS + (tree.generation + 1) * RADIUS_INCREMENT
-        
-        for i, child in enumerate(tree.children):
-            # Calculate angle for this child
-            if num_children == 1:
-                child_angle = tree.angle  # Place directly above parent
-            else:
-                # Distribute children evenly in a fan
-                start_angle = tree.angle - (total_angle_span / 2)
-                child_angle = start_angle + (i + 0.5) * angle_per_child
-            
-            # Calculate position
-            child.radius = child_radius
-            child.angle = child_angle
-            child.x = center_x + child_radius * math.cos(child_angle)
-            child.y = center_y + child_radius * math.sin(child_angle)
-            
-            # Recursively calculate positions for grandchildren
-            self.calculate_positions(child, center_x, center_y)
-        
+        # Flatten breadth-first so the layout runs over arrays instead of recursing per node
+        nodes = [tree]
+        parent_index = [-1]
+        i = 0
+        while i < len(nodes):
+            for child in nodes[i].children:
+                nodes.append(child)
+                parent_index.append(i)
+            i += 1
+
+        root_angle = tree.angle if tree.generation != 0 else 0.0
+        positions = radial_layout(parent_index, [n.generation for n in nodes], center_x, center_y, root_angle)
+        # Only the real root is placed at the center; a subtree root keeps its position
+        start = 0 if tree.generation == 0 else 1
+        _apply_positions(nodes, positions, start)
         return tree
+
+
+class AsyncFamilyTreeService:
+    """FamilyTreeService for an AsyncSession.
+
+    Queries are the sync service's statements, awaited on the async driver. Turning rows
+    into trees is CPU work that would stall every other request on the event loop, so it
+    runs on the threadpool. Returns plain rows/dicts, never lazy-loading ORM objects.
+    """
+
+    def __init__(self, db: AsyncSession, owner_id: Optional[int] = None):
+        self.db = db
+        self.queries = FamilyTreeService(None, owner_id)  # statement builders only; never touches a session
+
+    async def _rows(self, query) -> list:
+        return (await self.db.execute(query)).all()
+
+    async def find_root_id(self) -> Optional[int]:
+        return (await self.db.execute(self.queries.root_id_query())).scalar()
+
+    async def load_persons(self) -> list:
+        return await self._rows(self.queries.persons_query())
+
+    async def build_flat_tree(self) -> Optional[FlatTree]:
+        return await run_in_threadpool(flat_tree, await self.load_persons())
+
+    async def build_tree_data(self, layout: Optional[str] = None) -> Optional[dict]:
+        flat = await self.build_flat_tree()
+        return await run_in_threadpool(tree_data, flat, 0, layout) if flat is not None else None
+
+    async def build_subtree_data(self, root_id: int, depth: Optional[int] = None) -> Optional[dict]:
+        if depth is not None:
+            rows = await self._rows(self.queries.subtree_query(root_id, depth))
+            return await run_in_threadpool(subtree_data, rows, depth)
+        root = (await self.db.execute(self.queries.subtree_root_query(root_id))).first()
+        if root is None:
+            return None
+        return await run_in_threadpool(whole_subtree_data, root, await self.load_descendants(root))
+
+    async def load_descendants(self, person) -> list:
+        return await self._rows(self.queries.descendants_query(person))
+
+    async def load_ancestors(self, person) -> list:
+        query = self.queries.ancestors_query(person)
+        return root_first(await self._rows(query), person) if query is not None else []
+
+
+def root_first(rows: list, person) -> list:
+    """Ancestor rows in lineage_path order (root first)."""
+    position = {person_id: i for i, person_id in enumerate(models.ancestor_ids(person.lineage_path))}
+    return sorted(rows, key=lambda row: position[row.id])
+
+
+def _apply_positions(nodes: List[schemas.PersonTree], positions: dict, start: int = 0) -> None:
+    columns = [positions[k].tolist() for k in ("angle", "radius", "x", "y")]
+    for node, angle, radius, x, y in zip(nodes[start:], *(c[start:] for c in columns)):
+        node.angle = angle
+        node.radius = radius
+        node.x = x
+        node.y = y
@@ -0,0 +1,69 @@
+"""Per-owner cache of built trees, keyed by the owner's tree version (users.tree_version)."""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+TREE_CACHE_SIZE = int(os.getenv("TREE_CACHE_SIZE", "256"))  # max owners kept in memory
+
+
+class TreeCache:
+    """LRU of per-owner artifacts (serialized tree, layouts, ...) for one tree version.
+
+    The version lives in the database (models.bump_tree_version runs in every write
+    transaction), so writes from other workers and scripts invalidate this process's
+    entries too: callers read the current version and pass it in, and artifacts built
+    for any other version are dropped. Builds run outside the lock.
+    """
+
+    def __init__(self, max_owners: int = TREE_CACHE_SIZE):
+        self.max_owners = max_owners
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Optional[int], tuple]" = OrderedDict()  # owner -> (version, artifacts)
+
+    def get(self, owner_id: Optional[int], version: int, key: str, build: Callable[[], Any]) -> Any:
+        """Return the artifact `key` for the owner's tree at `version`, building it if missing.
+
+        Read the version before building: the build then sees that version or a newer one,
+        so the cached artifact is never older than the version it is stored under.
+        """
+        found, value = self._lookup(owner_id, version, key)
+        if found:
+            return value
+        return self._store(owner_id, version, key, build())
+
+    async def get_async(self, owner_id: Optional[int], version: int, key: str, build: Callable[[], Awaitable]) -> Any:
+        """get() for async handlers: `build` is a coroutine function, awaited on a miss."""
+        found, value = self._lookup(owner_id, version, key)
+        if found:
+            return value
+        return self._store(owner_id, version, key, await build())
+
+    def _lookup(self, owner_id: Optional[int], version: int, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is not None and entry[0] == version and key in entry[1]:
+                self._entries.move_to_end(owner_id)
+                return True, entry[1][key]
+        return False, None
+
+    def _store(self, owner_id: Optional[int], version: int, key: str, value: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is not None and entry[0] > version:
+                return value  # a newer version is cached already; don't replace it
+            if entry is None or entry[0] != version:
+                entry = (version, {})
+                self._entries[owner_id] = entry
+            entry[1][key] = value
+            self._entries.move_to_end(owner_id)
+            while len(self._entries) > self.max_owners:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+tree_cache = TreeCache()
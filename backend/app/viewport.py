@@ -0,0 +1,104 @@
+"""Viewport queries over a laid-out fan chart (GET /api/tree/viewport).
+
+The radial layout of an owner's tree is kept in a uniform grid (points sorted by cell), so
+a bounding box is answered by one sorted-range lookup per grid row. Nodes that would be
+drawn closer than CLUSTER_PIXELS apart at the requested zoom are folded together: in each
+screen cell the shallowest node is returned as is and deeper generations are aggregated
+into one cluster, so the response size follows the screen, not the tree.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from app.layout import radial_layout
+from app.services import FlatTree, person_dict
+
+POINTS_PER_CELL = 16  # target average occupancy of the spatial grid
+CLUSTER_PIXELS = 24  # nodes closer than this on screen are aggregated
+MAX_VIEWPORT_PIXELS = 8192  # largest bbox side accepted, in screen pixels (bbox side * zoom)
+
+
+class ViewportIndex:
+    """Positions of one owner's tree in breadth-first order, bucketed into a uniform grid."""
+
+    def __init__(self, flat: FlatTree):
+        self.persons = flat.persons
+        self.generation = np.asarray(flat.generation, dtype=np.int64)
+        positions = radial_layout(flat.parent_index, flat.generation)
+        self.x, self.y = positions["x"], positions["y"]
+        n = len(self.persons)
+
+        self.min_x, self.min_y = float(self.x.min()), float(self.y.min())
+        extent = max(float(self.x.max()) - self.min_x, float(self.y.max()) - self.min_y, 1.0)
+        self.columns = max(1, int(math.sqrt(n / POINTS_PER_CELL)))
+        self.cell_size = extent / self.columns * (1 + 1e-9)  # keep the max coordinate inside the last cell
+        cells = self._cell(self.x, self.min_x) + self._cell(self.y, self.min_y) * self.columns
+        self.by_cell = np.argsort(cells, kind="stable")
+        self.sorted_cells = cells[self.by_cell]
+
+    def _cell(self, values, origin: float) -> np.ndarray:
+        return np.clip(((values - origin) / self.cell_size).astype(np.int64), 0, self.columns - 1)
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """Breadth-first indices of the nodes inside the box, in ascending order."""
+        lo_x, hi_x = self._cell(np.array([min_x, max_x]), self.min_x).tolist()
+        lo_y, hi_y = self._cell(np.array([min_y, max_y]), self.min_y).tolist()
+        rows = np.arange(lo_y, hi_y + 1) * self.columns
+        starts = np.searchsorted(self.sorted_cells, rows + lo_x, side="left")
+        ends = np.searchsorted(self.sorted_cells, rows + hi_x, side="right")
+        if not len(starts):
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate([self.by_cell[s:e] for s, e in zip(starts.tolist(), ends.tolist())])
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+        return np.sort(candidates[inside])
+
+    def viewport(self, bbox: tuple, zoom: float) -> dict:
+        """Visible nodes and clusters for bbox (min_x, min_y, max_x, max_y) at zoom pixels per unit."""
+        visible = self.query(*bbox)
+        cluster_size = CLUSTER_PIXELS / zoom
+        cx = np.floor((self.x[visible] - bbox[0]) / cluster_size).astype(np.int64)
+        cy = np.floor((self.y[visible] - bbox[1]) / cluster_size).astype(np.int64)
+        keys = cx * (int((bbox[3] - bbox[1]) / cluster_size) + 2) + cy
+        # Breadth-first order is generation order, so the first node of a cell is its shallowest
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        shown = visible[first]
+        nodes = [
+            dict(person_dict(self.persons[i]), generation=generation, x=x, y=y)
+            for i, generation, x, y in zip(
+                shown.tolist(), self.generation[shown].tolist(), self.x[shown].tolist(), self.y[shown].tolist()
+            )
+        ]
+
+        folded = np.ones(len(visible), dtype=bool)
+        folded[first] = False
+        clusters = []
+        if folded.any():
+            groups = inverse[folded]
+            count = np.bincount(groups, minlength=len(first))
+            sum_x = np.bincount(groups, self.x[visible][folded], minlength=len(first))
+            sum_y = np.bincount(groups, self.y[visible][folded], minlength=len(first))
+            generation = self.generation[visible][folded]
+            gen_min = np.full(len(first), np.iinfo(np.int64).max)
+            gen_max = np.full(len(first), -1)
+            np.minimum.at(gen_min, groups, generation)
+            np.maximum.at(gen_max, groups, generation)
+            for g in np.flatnonzero(count).tolist():
+                clusters.append({
+                    "x": float(sum_x[g] / count[g]), "y": float(sum_y[g] / count[g]), "count": int(count[g]),
+                    "generation_min": int(gen_min[g]), "generation_max": int(gen_max[g]),
+                    "anchor_id": int(self.persons[shown[g]].id),
+                })
+        return {"bbox": list(bbox), "zoom": zoom, "total": int(len(visible)), "nodes": nodes, "clusters": clusters}
+
+
+def parse_bbox(value: str) -> Optional[tuple]:
+    """(min_x, min_y, max_x, max_y) from "min_x,min_y,max_x,max_y", or None if malformed."""
+    try:
+        parts = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        return None
+    if len(parts) != 4 or not all(math.isfinite(p) for p in parts) or parts[0] > parts[2] or parts[1] > parts[3]:
+        return None
+    return parts
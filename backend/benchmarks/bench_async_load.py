@@ -0,0 +1,100 @@
+"""
+Load test the sync and async database stacks: requests/sec and latency percentiles with
+many concurrent clients. Starts uvicorn once per mode (DATABASE_ASYNC=0, then 1) against
+the same DATABASE_URL and drives it with httpx.
+Usage (from backend/, DATABASE_URL pointing at a migrated Postgres with a user whose tree
+is not empty; BENCH_USERNAME/BENCH_PASSWORD default to admin/admin):
+    python -m benchmarks.bench_async_load [clients] [seconds] [path]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+DEFAULT_PATH = "/api/persons?limit=50"  # one indexed query per request
+
+
+def _start_server(async_db: bool) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_ASYNC="1" if async_db else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(BASE_URL + "/", timeout=0.5)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start")
+
+
+def _token() -> str:
+    credentials = {
+        "username": os.getenv("BENCH_USERNAME", "admin"),
+        "password": os.getenv("BENCH_PASSWORD", "admin"),
+    }
+    response = httpx.post(BASE_URL + "/api/auth/login", json=credentials)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _load(path: str, clients: int, seconds: float) -> dict:
+    headers = {"Authorization": f"Bearer {_token()}"}
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=BASE_URL, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    return {"rps": len(latencies) / elapsed, "p50_ms": pick(0.50), "p99_ms": pick(0.99), "errors": errors}
+
+
+def main(clients: int, seconds: float, path: str) -> None:
+    print(f"{clients} clients for {seconds:g}s on GET {path}")
+    for async_db in (False, True):
+        server = _start_server(async_db)
+        try:
+            asyncio.run(_load(path, min(clients, 50), 2))  # warm up pools and caches
+            result = asyncio.run(_load(path, clients, seconds))
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"  {'async' if async_db else 'sync '}: {result['rps']:8.1f} req/s"
+            f"  p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 500,
+        float(args[1]) if len(args) > 1 else 20,
+        args[2] if len(args) > 2 else DEFAULT_PATH,
+    )
@@ -0,0 +1,37 @@
+"""
+Time the label collision pass (app/labels.py) on synthetic fan chart (sunburst) layouts.
+Rings have a fixed width, so past a few thousand labels most cannot be placed without
+overlapping; "resolved" is the fraction that could.
+Usage (from backend/): python -m benchmarks.bench_labels [sizes...]
+"""
+import sys
+
+from app.labels import suggest_label_offsets
+from app.layout import sunburst_layout
+from app.services import FlatTree
+from benchmarks.common import as_rows, best_of, synthetic_persons
+
+
+def run(size: int, repeat: int = 3) -> dict:
+    rows = as_rows(synthetic_persons(size))
+    flat = FlatTree.from_persons(rows, rows[0])
+    anchors = sunburst_layout(flat.parent_index, flat.generation)
+    x, y, rotation = anchors["x"], anchors["y"], anchors["rotation"]
+    result = suggest_label_offsets(flat.persons, x, y, rotation)
+    return {
+        "size": size,
+        "moved": len(result["offsets"]),
+        "unresolved": len(result["unresolved"]),
+        "ms": round(best_of(lambda: suggest_label_offsets(flat.persons, x, y, rotation), repeat), 2),
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'labels':>8} {'moved':>8} {'unresolved':>11} {'resolved':>9} {'ms':>10} {'us/label':>9}")
+    for size in sizes:
+        r = run(size)
+        resolved = 1 - r["unresolved"] / size
+        print(f"{r['size']:>8} {r['moved']:>8} {r['unresolved']:>11} {resolved:>9.1%} {r['ms']:>10.1f} "
+              f"{r['ms'] * 1000 / size:>9.2f}")
+    print("Unresolved labels overlap others wherever they go: the fixed-width rings have too little room for them.")
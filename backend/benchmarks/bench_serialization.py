@@ -0,0 +1,59 @@
+"""
+Compare the old validated /api/tree and /api/persons response path with the fast path.
+Old: a validated schemas model per person, then FastAPI's response_model validation and
+JSON encoding. Fast: plain dicts from the rows, encoded once with orjson.
+Usage (from backend/): python -m benchmarks.bench_serialization [sizes...]
+"""
+import asyncio
+import sys
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from typing import List
+
+from app import encoding, schemas
+from app.services import person_dict, tree_nodes
+from benchmarks.bench_wire_format import _InMemoryService
+from benchmarks.common import as_rows, best_of, synthetic_persons
+
+TREE_FIELD = create_response_field(name="tree", type_=schemas.PersonTree)
+PERSONS_FIELD = create_response_field(name="persons", type_=List[schemas.PersonResponse])
+
+
+def _fastapi_response(field, content) -> bytes:
+    """What FastAPI does with a response_model: validate, serialize, json.dumps."""
+    jsonable = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(jsonable).body
+
+
+def _validated_tree(service):
+    """The tree as build_tree used to assemble it: one validated PersonTree per person."""
+    flat = service.build_flat_tree()
+    trees = [schemas.PersonTree(**node) for node in tree_nodes(flat)]
+    for i in range(1, len(trees)):
+        trees[flat.parent_index[i]].children.append(trees[i])
+    return trees[0]
+
+
+def run(size: int) -> dict:
+    # The old endpoints loaded ORM instances; the fast path reads column rows
+    persons = synthetic_persons(size)
+    rows = as_rows(persons)
+    old_service, fast_service = _InMemoryService(persons), _InMemoryService(rows)
+    return {
+        "size": size,
+        "tree_old_ms": round(best_of(lambda: _fastapi_response(TREE_FIELD, _validated_tree(old_service))), 2),
+        "tree_fast_ms": round(best_of(lambda: encoding.dumps(fast_service.build_tree_data())), 2),
+        "persons_old_ms": round(best_of(lambda: _fastapi_response(PERSONS_FIELD, persons)), 2),
+        "persons_fast_ms": round(best_of(lambda: encoding.dumps([person_dict(r) for r in rows])), 2),
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"{'persons':>8} {'tree old ms':>12} {'tree fast ms':>13} {'persons old ms':>15} {'persons fast ms':>16}")
+    for size in sizes:
+        r = run(size)
+        print(f"{r['size']:>8} {r['tree_old_ms']:>12.2f} {r['tree_fast_ms']:>13.2f} "
+              f"{r['persons_old_ms']:>15.2f} {r['persons_fast_ms']:>16.2f}")
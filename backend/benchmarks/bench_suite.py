@@ -0,0 +1,174 @@
+"""
+End-to-end benchmark suite on generated trees: FamilyTreeService.build_tree and
+calculate_positions, then /api/import, /api/tree, /api/persons and subtree delete through
+the FastAPI TestClient. Results (timings in ms, query counts) are written as JSON so runs
+can be compared across commits. Exits non-zero if /api/tree needs more than
+TREE_QUERY_BUDGET queries, which is what an N+1 regression looks like.
+Usage (from backend/, DATABASE_URL pointing at a migrated Postgres, or at a SQLite file):
+    python -m benchmarks.bench_suite [--sizes 1000 10000 100000] [--branching 3] [--depth N]
+                                     [--repeat 3] [--output bench_results.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+from app import database, encoding, models
+from app.auth import create_access_token
+from app.main import app
+from app.services import FamilyTreeService
+from app.tree_cache import tree_cache
+from benchmarks.common import QueryCounter, best_of, synthetic_fields, tree_parents
+
+OWNER_PREFIX = "bench_suite_owner_"
+TREE_QUERY_BUDGET = 2  # queries per uncached /api/tree, whatever the tree size
+
+
+def _timed(fn) -> tuple:
+    """(result, elapsed ms, queries) of one call."""
+    with QueryCounter() as queries:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, round(elapsed, 2), queries.count
+
+
+def _import_file(size: int, branching: int, max_depth) -> bytes:
+    """The generated tree as an /api/import JSON file (ids and parent_ids are file-local refs)."""
+    rows = (
+        dict(synthetic_fields(i), id=i + 1, parent_id=parent + 1 if parent >= 0 else None)
+        for i, parent in enumerate(tree_parents(size, branching, max_depth))
+    )
+    return b"[" + b",".join(encoding.dumps(row) for row in rows) + b"]"
+
+
+def _cleanup() -> None:
+    db = database.SessionLocal()
+    try:
+        owners = db.query(models.User).filter(models.User.username.like(OWNER_PREFIX + "%"))
+        db.query(models.Person).filter(
+            models.Person.owner_id.in_(owners.with_entities(models.User.id).scalar_subquery())
+        ).delete(synchronize_session=False)
+        owners.delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _create_owner(size: int) -> models.User:
+    db = database.SessionLocal()
+    try:
+        owner = models.User(username=f"{OWNER_PREFIX}{size}", password_hash="-", is_admin=False)
+        db.add(owner)
+        db.commit()
+        db.refresh(owner)
+        db.expunge(owner)
+        return owner
+    finally:
+        db.close()
+
+
+def run(size: int, branching: int, max_depth, repeat: int) -> dict:
+    owner = _create_owner(size)
+    client = TestClient(app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': owner.username})}"
+    client.get("/api/auth/me")  # caches the principal, so counts below are data queries only
+    timings, queries = {}, {}
+
+    body = _import_file(size, branching, max_depth)
+    response, timings["import"], queries["import"] = _timed(
+        lambda: client.post("/api/import?format=json", files={"file": ("tree.json", body)})
+    )
+    assert response.json()["imported"] == size, response.text
+
+    db = database.SessionLocal()
+    try:
+        service = FamilyTreeService(db, owner_id=owner.id)
+        tree = service.build_tree()
+        timings["build_tree"] = round(best_of(service.build_tree, repeat), 2)
+        timings["calculate_positions"] = round(best_of(lambda: service.calculate_positions(tree), repeat), 2)
+        delete_id = tree.children[0].id if tree.children else tree.id
+    finally:
+        db.close()
+
+    def cold(path, **kwargs):
+        tree_cache.clear()
+        return client.get(path, **kwargs)
+
+    response, _, queries["tree"] = _timed(lambda: cold("/api/tree"))
+    etag = response.headers["etag"]
+    timings["tree_cold"] = round(best_of(lambda: cold("/api/tree"), repeat), 2)
+    timings["tree_warm"] = round(best_of(lambda: client.get("/api/tree"), repeat), 2)
+    timings["tree_not_modified"] = round(best_of(lambda: client.get("/api/tree", headers={"If-None-Match": etag}), repeat), 2)
+    timings["tree_radial_cold"] = round(best_of(lambda: cold("/api/tree?layout=radial"), repeat), 2)
+    timings["tree_columnar_cold"] = round(best_of(
+        lambda: cold("/api/tree", headers={"Accept": "application/vnd.famtree.columnar+json"}), repeat
+    ), 2)
+    timings["persons"] = round(best_of(lambda: client.get("/api/persons"), repeat), 2)
+    timings["persons_page"] = round(best_of(lambda: client.get("/api/persons?limit=1000&order_by=name"), repeat), 2)
+    queries["persons"] = _timed(lambda: client.get("/api/persons"))[2]
+
+    response, timings["delete_subtree"], queries["delete_subtree"] = _timed(
+        lambda: client.delete(f"/api/persons/{delete_id}")
+    )
+    assert response.status_code == 200, response.text
+    return {"size": size, "branching": branching, "max_depth": max_depth, "timings_ms": timings, "queries": queries}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--branching", type=int, default=3)
+    parser.add_argument("--depth", type=int, help="maximum generation of the generated trees")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing (best is kept)")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    if database.engine.dialect.name == "sqlite":
+        database.Base.metadata.create_all(bind=database.engine)  # SQLite stand-in: no migrations needed
+    _cleanup()
+    results, failures = [], []
+    try:
+        for size in args.sizes:
+            result = run(size, args.branching, args.depth, args.repeat)
+            results.append(result)
+            t = result["timings_ms"]
+            print(f"{size:>8} persons: import {t['import']:.0f} ms, build_tree {t['build_tree']:.0f} ms, "
+                  f"tree cold {t['tree_cold']:.0f} / warm {t['tree_warm']:.1f} ms, "
+                  f"delete {t['delete_subtree']:.0f} ms, /api/tree queries {result['queries']['tree']}")
+            if result["queries"]["tree"] > TREE_QUERY_BUDGET:
+                failures.append(f"/api/tree issued {result['queries']['tree']} queries for {size} persons "
+                                f"(budget {TREE_QUERY_BUDGET})")
+    finally:
+        _cleanup()
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": database.engine.dialect.name,
+        "python": platform.python_version(),
+        "results": results,
+        "failures": failures,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
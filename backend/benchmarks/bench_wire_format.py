@@ -0,0 +1,45 @@
+"""
+Compare payload size and encode time of the nested PersonTree JSON and the columnar format.
+Usage (from backend/): python -m benchmarks.bench_wire_format [sizes...]
+"""
+import sys
+
+from app import encoding
+from app.columnar import tree_columns
+from app.services import FamilyTreeService
+from benchmarks.common import as_rows, best_of, synthetic_persons
+
+
+class _InMemoryService(FamilyTreeService):
+    """FamilyTreeService that reads pre-built persons instead of querying the database."""
+
+    def __init__(self, persons):
+        super().__init__(db=None, owner_id=1)
+        self.persons = persons
+
+    def load_persons(self):
+        return self.persons
+
+
+def run(size: int) -> dict:
+    service = _InMemoryService(as_rows(synthetic_persons(size)))
+
+    # Both paths start from the loaded rows, as /api/tree does
+    nested = lambda: encoding.dumps(service.build_tree_data())
+    columnar = lambda: encoding.dumps(tree_columns(service.build_flat_tree()))
+    return {
+        "size": size,
+        "nested_bytes": len(nested()),
+        "columnar_bytes": len(columnar()),
+        "nested_ms": round(best_of(nested), 2),
+        "columnar_ms": round(best_of(columnar), 2),
+    }
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000, 50000]
+    print(f"{'persons':>8} {'nested KB':>10} {'columnar KB':>12} {'nested ms':>10} {'columnar ms':>12}")
+    for size in sizes:
+        r = run(size)
+        print(f"{r['size']:>8} {r['nested_bytes'] / 1024:>10.1f} {r['columnar_bytes'] / 1024:>12.1f} "
+              f"{r['nested_ms']:>10.2f} {r['columnar_ms']:>12.2f}")
@@ -0,0 +1,104 @@
+"""Helpers shared by the benchmark scripts."""
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app import database, models
+from app.importer import ImportRecord
+from app.services import PERSON_FIELDS
+
+# Stand-in for the column rows FamilyTreeService.load_persons returns
+PersonRow = namedtuple("PersonRow", PERSON_FIELDS)
+
+
+_FONTS = ["Arial", "Georgia", "serif", None]
+_COLORS = ["#4a90e2", "#e24a90", "#90e24a", None]
+
+
+def tree_parents(count: int, branching: int = 3, max_depth: Optional[int] = None) -> List[int]:
+    """Parent index of each of `count` nodes (-1 for the root), filled breadth-first.
+
+    Each parent takes `branching` children. With max_depth, nodes at that generation get
+    no children; the remaining nodes are spread round-robin over the shallower ones.
+    """
+    parents = [-1] if count else []
+    generation = [0] if count else []
+    eligible = [0] if max_depth != 0 else []  # nodes that may still take children, in BFS order
+    slot = 0
+    for i in range(1, count):
+        if not eligible:
+            raise ValueError("max_depth=0 only allows a single person")
+        parent = eligible[(slot // branching) % len(eligible)]
+        slot += 1
+        parents.append(parent)
+        generation.append(generation[parent] + 1)
+        if max_depth is None or generation[i] < max_depth:
+            eligible.append(i)
+    return parents
+
+
+def synthetic_fields(i: int) -> dict:
+    """PersonCreate fields (without parent_id) of the i-th synthetic person."""
+    return {
+        "first_name": f"Person{i}",
+        "last_name": "Smith",
+        "birth_date": date(1900, 1, 1) + timedelta(days=i),
+        "gender": "male" if i % 2 else "female",
+        "color": _COLORS[i % len(_COLORS)],
+        "font_size": "12",
+        "font_family": _FONTS[i % len(_FONTS)],
+        "font_color": "#ffffff",
+        "label_offset_x": None,
+        "label_offset_y": None,
+    }
+
+
+def synthetic_persons(count: int, branching: int = 3, owner_id: int = 1,
+                      max_depth: Optional[int] = None) -> List[models.Person]:
+    """Build `count` transient persons forming a tree with the given branching factor."""
+    return [
+        models.Person(id=i + 1, owner_id=owner_id, parent_id=parent + 1 if parent >= 0 else None, **synthetic_fields(i))
+        for i, parent in enumerate(tree_parents(count, branching, max_depth))
+    ]
+
+
+def synthetic_records(count: int, branching: int = 3, max_depth: Optional[int] = None) -> Iterator[ImportRecord]:
+    """The same tree as synthetic_persons, as records for importer.import_records
+    (refs are row numbers, so the database assigns the ids). No ORM objects, so 1M is fine."""
+    for i, parent in enumerate(tree_parents(count, branching, max_depth)):
+        yield ImportRecord(i + 1, parent + 1 if parent >= 0 else None, dict(synthetic_fields(i), parent_id=None))
+
+
+def as_rows(persons: List[models.Person]) -> List[PersonRow]:
+    return [PersonRow(*(getattr(p, name) for name in PERSON_FIELDS)) for p in persons]
+
+
+def best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Best wall time of `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+class QueryCounter:
+    """Counts statements sent to an engine (default: the app's) while active."""
+
+    def __init__(self, engine=None):
+        self.engine = engine or database.engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._count)
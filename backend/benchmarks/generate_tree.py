@@ -0,0 +1,64 @@
+"""
+Generate a synthetic family tree for one owner (creating the user if needed).
+Usage (from backend/):
+    python -m benchmarks.generate_tree --owner USERNAME --size 100000 [--branching 3] [--depth N] [--replace]
+"""
+import argparse
+import sys
+import time
+
+from app import importer, models
+from app.auth import hash_password
+from app.database import SessionLocal
+from benchmarks.common import synthetic_records
+
+
+def get_or_create_owner(db, username: str, password: str) -> models.User:
+    owner = db.query(models.User).filter(models.User.username == username).first()
+    if owner is None:
+        owner = models.User(username=username, password_hash=hash_password(password), is_admin=False)
+        db.add(owner)
+        db.flush()
+    return owner
+
+
+def generate(db, owner_id: int, size: int, branching: int = 3, max_depth=None, progress=None) -> int:
+    """Insert a synthetic tree for owner_id; does not commit. Returns the number of persons written."""
+    result = importer.import_records(db, owner_id, synthetic_records(size, branching, max_depth), progress=progress)
+    return result.imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--owner", required=True, help="username; created (password --password) if missing")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--size", type=int, required=True, help="number of persons (1k-1M)")
+    parser.add_argument("--branching", type=int, default=3, help="children per person")
+    parser.add_argument("--depth", type=int, help="maximum generation (default: as deep as branching makes it)")
+    parser.add_argument("--replace", action="store_true", help="delete the owner's existing persons first")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        owner = get_or_create_owner(db, args.owner, args.password)
+        if args.replace:
+            models.bump_tree_version(db, owner.id)
+            db.query(models.Person).filter(models.Person.owner_id == owner.id).delete(synchronize_session=False)
+        start = time.perf_counter()
+
+        def progress(done, total):
+            print(f"  {done}/{total} persons written ({done / (time.perf_counter() - start):.0f}/s)")
+
+        written = generate(db, owner.id, args.size, args.branching, args.depth, progress)
+        db.commit()
+        print(f"Generated {written} persons for '{args.owner}' in {time.perf_counter() - start:.1f}s.")
+        return 0
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,14 @@
 Ensure admin user exists with password 'admin'. Run inside backend container if login fails.
 Usage: docker exec famtree_backend python3 ensure_admin.py
 """
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from app.database import SessionLocal
 from app.models import User
 from app.auth import hash_password
 
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql://famtree_user:famtree_pass@db:5432/famtree_db"
-)
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin"
 
 def main():
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.username == ADMIN_USERNAME).first()
@@ -0,0 +1,52 @@
+"""
+Bulk-import persons from a GEDCOM (.ged) or JSON/NDJSON file for one user, in one transaction.
+Usage: python3 import_data.py FILE --owner USERNAME [--format gedcom|json] [--batch-size N]
+"""
+import argparse
+import sys
+import time
+
+from app import importer
+from app.database import SessionLocal
+from app.models import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("file")
+    parser.add_argument("--owner", required=True, help="username that will own the imported persons")
+    parser.add_argument("--format", choices=sorted(importer.PARSERS), help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=importer.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        owner = db.query(User).filter(User.username == args.owner).first()
+        if not owner:
+            print(f"User '{args.owner}' not found.")
+            return 1
+
+        start = time.perf_counter()
+
+        def progress(done, total):
+            elapsed = time.perf_counter() - start
+            print(f"  {done}/{total} persons written ({done / elapsed:.0f}/s)")
+
+        fmt = args.format or importer.detect_format(args.file)
+        with open(args.file, encoding="utf-8-sig", errors="replace") as stream:
+            result = importer.import_file(db, owner.id, stream, fmt, batch_size=args.batch_size, progress=progress)
+        db.commit()
+        print(f"Imported {result.imported} persons for '{args.owner}' in {time.perf_counter() - start:.1f}s "
+              f"({result.skipped} skipped).")
+        for error in result.errors:
+            print(f"  skipped {error}")
+        return 0
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
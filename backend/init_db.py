@@ -3,17 +3,12 @@ Initialize database: run migrations and seed data
 """
 import os
 import time
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
-
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql://famtree_user:famtree_pass@db:5432/famtree_db"
-)
+from app.database import engine
 
 def wait_for_db(max_retries=60, delay=3):
     """Wait for database to be ready (up to 3 minutes)."""
-    engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 5})
     for i in range(max_retries):
         try:
             with engine.connect() as conn:
@@ -1,26 +1,17 @@
 """
 Seed the database with sample family tree data and default login user.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models import Person, Base, User
+from app.database import SessionLocal, engine
+from app.models import Person, Base, User, bump_tree_version
 from app.auth import hash_password
 from datetime import date
-import os
-
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql://famtree_user:famtree_pass@db:5432/famtree_db"
-)
 
 DEFAULT_USERNAME = "admin"
 DEFAULT_PASSWORD = "admin"
 
 def seed_database():
-    engine = create_engine(DATABASE_URL)
     Base.metadata.create_all(bind=engine)
     
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
     
     try:
@@ -198,6 +189,8 @@ def seed_database():
         db.add(niece)
         db.flush()
         
+        if owner_id:
+            bump_tree_version(db, owner_id)
         db.commit()
         print("Database seeded successfully!")
         
@@ -0,0 +1,96 @@
+"""Shared fixtures. Tests run against a throwaway SQLite file; set before app is imported."""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="famtree-tests-"), "test.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import database, models  # noqa: E402
+from app.auth import create_access_token, hash_password  # noqa: E402
+from app.principal_cache import principal_cache  # noqa: E402
+from app.tree_cache import tree_cache  # noqa: E402
+from benchmarks.common import synthetic_persons  # noqa: E402
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# A Postgres the Postgres-only tests may migrate and write to (they clean up their own rows)
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created schema."""
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    tree_cache.clear()
+    principal_cache.clear()
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def migrate(engine) -> None:
+    """alembic upgrade head on engine."""
+    config = Config()  # no ini file, so alembic leaves pytest's logging alone
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine on TEST_POSTGRES_URL, migrated to head; skips when no Postgres is available."""
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = database.create_db_engine(POSTGRES_URL)
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Postgres at TEST_POSTGRES_URL is not reachable: {e}")
+    migrate(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    user = models.User(username="alice", password_hash=hash_password("secret"), is_admin=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(user):
+    """TestClient authenticated as `user`."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.headers["Authorization"] = "Bearer " + create_access_token({"sub": user.username})
+        yield client
+
+
+def add_tree(db, owner_id: int, count: int, branching: int = 3, first_id: int = 1) -> list:
+    """Insert a synthetic tree of `count` persons with ids from first_id; returns them."""
+    persons = synthetic_persons(count, branching, owner_id=owner_id)
+    paths = {}
+    for person in persons:
+        person.id += first_id - 1
+        if person.parent_id is not None:
+            person.parent_id += first_id - 1
+        # Filled in here so the before_insert hook doesn't look every parent up
+        person.lineage_path = "/" if person.parent_id is None else f"{paths[person.parent_id]}{person.parent_id}/"
+        paths[person.id] = person.lineage_path
+    db.add_all(persons)
+    db.commit()
+    return persons
@@ -0,0 +1,81 @@
+"""The async /api/tree handler (DATABASE_ASYNC) matches the sync one and builds off the event loop."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import async_api, database, main
+from app.auth import create_access_token
+from app.tree_cache import tree_cache
+from tests.conftest import add_tree
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_client(user):
+    """TestClient on an app serving only the async routes, over aiosqlite on the test database."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    engine = create_async_engine(database.async_url(database.DATABASE_URL))
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_api.router)
+    app.dependency_overrides[database.get_async_db] = get_async_db
+    with TestClient(app) as client:
+        client.headers["Authorization"] = "Bearer " + create_access_token({"sub": user.username})
+        yield client
+    asyncio.run(engine.dispose())
+
+
+@pytest.mark.parametrize("params", [{}, {"layout": "radial"}, {"depth": 2}, {"root_id": 2}])
+def test_async_tree_matches_sync(client, async_client, db, user, params):
+    add_tree(db, user.id, 200)
+    expected = client.get("/api/tree", params=params)
+    tree_cache.clear()
+    response = async_client.get("/api/tree", params=params)
+    assert response.status_code == expected.status_code == 200
+    assert response.content == expected.content
+    assert response.headers["ETag"] == expected.headers["ETag"]
+
+
+def test_async_tree_builds_on_the_threadpool(async_client, db, user, monkeypatch):
+    add_tree(db, user.id, 50)
+    loops = []
+
+    def tree_json(*args):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)  # not on the event loop thread
+        return build(*args)
+
+    build = async_api._tree_json
+    monkeypatch.setattr(async_api, "_tree_json", tree_json)
+    assert async_client.get("/api/tree").status_code == 200
+    assert loops == [None]
+    assert async_client.get("/api/tree").status_code == 200
+    assert loops == [None]  # cached
+
+
+def test_async_tree_404s(async_client, db, user):
+    assert async_client.get("/api/tree").status_code == 404
+    assert async_client.get("/api/tree", params={"depth": 1}).status_code == 404
+    add_tree(db, user.id, 5)
+    assert async_client.get("/api/tree", params={"root_id": 999}).status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/api/tree?depth=1", "/api/tree?root_id=1", "/api/persons/1/descendants",
+                                  "/api/persons/5/ancestors"])
+def test_async_reads_see_buffered_layout_edits(async_client, db, user, path):
+    add_tree(db, user.id, 6)  # 1 -> 2, 3, 4; 2 -> 5, 6
+    main.layout_writes.add(user.id, [(2, {"color": "#123456"})])
+    body = async_client.get(path).json()
+    persons = body["children"] if isinstance(body, dict) else body
+    assert {p["id"]: p["color"] for p in persons}[2] == "#123456"
@@ -0,0 +1,48 @@
+"""Every password hash and check goes through the bounded auth.password_pool."""
+import pytest
+
+from app import main
+from app.auth import HashingBusy, PasswordHashPool, needs_rehash
+
+
+class FullPool(PasswordHashPool):
+    """A pool whose workers and queue are always taken."""
+
+    async def run(self, job, *args):
+        raise HashingBusy()
+
+
+class CountingPool(PasswordHashPool):
+    def __init__(self):
+        super().__init__(workers=1, queue_limit=4)
+        self.jobs = []
+
+    async def run(self, job, *args):
+        self.jobs.append(job.__name__)
+        return await super().run(job, *args)
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/api/auth/register", {"username": "bob", "password": "secret1"}),
+    ("/api/auth/login", {"username": "alice", "password": "secret"}),
+    ("/api/auth/change-password", {"current_password": "secret", "new_password": "secret2"}),
+    ("/api/admin/users", {"username": "carol", "password": "secret1"}),
+])
+def test_saturated_pool_returns_503(client, monkeypatch, path, payload):
+    monkeypatch.setattr(main, "password_pool", FullPool())
+    response = client.post(path, json=payload)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_login_hashes_on_the_pool(client, db, user, monkeypatch):
+    pool = CountingPool()
+    monkeypatch.setattr(main, "password_pool", pool)
+    monkeypatch.setattr("app.auth.BCRYPT_ROUNDS", 5)  # alice's hash now needs a rehash
+    assert client.post("/api/auth/login", json={"username": "alice", "password": "secret"}).status_code == 200
+    assert pool.jobs == ["verify_password", "hash_password"]
+    db.refresh(user)
+    assert not needs_rehash(user.password_hash)
+
+    assert client.post("/api/auth/login", json={"username": "alice", "password": "wrong"}).status_code == 401
+    assert pool.jobs[-1] == "verify_password"
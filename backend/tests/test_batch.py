@@ -0,0 +1,97 @@
+"""POST /api/persons/batch: moves, creates and deletes keep lineage paths consistent."""
+import pytest
+
+from app import models
+from tests.conftest import add_tree
+
+
+def _paths(db, owner_id: int) -> dict:
+    db.expire_all()
+    return dict(db.query(models.Person.id, models.Person.lineage_path).filter(models.Person.owner_id == owner_id))
+
+
+def _assert_consistent(db, owner_id: int) -> None:
+    """Every lineage_path is its parent's path plus the parent id."""
+    db.expire_all()
+    persons = {p.id: p for p in db.query(models.Person).filter(models.Person.owner_id == owner_id)}
+    for person in persons.values():
+        expected = "/" if person.parent_id is None else models.subtree_prefix(
+            persons[person.parent_id].lineage_path, person.parent_id
+        )
+        assert person.lineage_path == expected, (person.id, person.lineage_path, expected)
+
+
+def _fields(person, **changes) -> dict:
+    """A PersonBatchUpdate body for person, with changes."""
+    fields = {"id": person.id, "first_name": person.first_name, "last_name": person.last_name,
+              "birth_date": person.birth_date.isoformat(), "gender": person.gender,
+              "parent_id": person.parent_id}
+    return dict(fields, **changes)
+
+
+@pytest.fixture
+def tree(db, user):
+    # 1 -> 2, 3, 4; 2 -> 5, 6, 7; 3 -> 8, 9, 10; 4 -> 11, 12, 13
+    return {p.id: p for p in add_tree(db, user.id, 13, branching=3)}
+
+
+def test_create_under_a_person_moved_in_the_same_batch(client, db, user, tree):
+    response = client.post("/api/persons/batch", json={
+        "update": [_fields(tree[4], parent_id=3)],
+        "create": [{"first_name": "New", "birth_date": "2000-01-01", "gender": "other", "parent_id": 4}],
+    })
+    assert response.status_code == 200, response.text
+    new_id = response.json()["created"][0]["id"]
+    assert _paths(db, user.id)[new_id] == "/1/3/4/"
+    _assert_consistent(db, user.id)
+
+    assert new_id not in {p["id"] for p in client.get("/api/persons/2/descendants").json()}
+    assert client.delete("/api/persons/2").status_code in (200, 204)
+    assert new_id in _paths(db, user.id)
+
+
+def test_create_under_a_descendant_of_a_moved_person(client, db, user, tree):
+    response = client.post("/api/persons/batch", json={
+        "update": [_fields(tree[4], parent_id=5)],
+        "create": [{"first_name": "New", "birth_date": "2000-01-01", "gender": "other", "parent_id": 11}],
+    })
+    assert response.status_code == 200, response.text
+    assert _paths(db, user.id)[response.json()["created"][0]["id"]] == "/1/2/5/4/11/"
+    _assert_consistent(db, user.id)
+
+
+def test_chained_moves_are_applied_consistently(client, db, user, tree):
+    # 4 under 2, then 2 under 10: 4's subtree follows both moves
+    response = client.post("/api/persons/batch", json={
+        "update": [_fields(tree[4], parent_id=2), _fields(tree[2], parent_id=10)],
+    })
+    assert response.status_code == 200, response.text
+    assert _paths(db, user.id)[11] == "/1/3/10/2/4/"
+    _assert_consistent(db, user.id)
+
+
+@pytest.mark.parametrize("moves", [
+    [(2, 3), (3, 4), (4, 2)],  # a cycle made only of batch moves
+    [(2, 8), (3, 5)],  # 2 under 3's child, 3 under 2's child
+    [(3, 11), (4, 9)],
+    [(2, 2)],
+    [(2, 6)],  # under their own child
+])
+def test_cycles_are_rejected(client, db, user, tree, moves):
+    before = _paths(db, user.id)
+    response = client.post("/api/persons/batch", json={
+        "update": [_fields(tree[child], parent_id=parent) for child, parent in moves],
+    })
+    assert response.status_code == 400
+    assert _paths(db, user.id) == before
+    assert models.tree_version(db, user.id) == 0
+
+
+def test_moves_that_only_look_circular_are_allowed(client, db, user, tree):
+    # 3 under 5 (a child of 2) and 2 under 9 (a child of 3) close a cycle, unless 9 leaves 3 first
+    response = client.post("/api/persons/batch", json={
+        "update": [_fields(tree[9], parent_id=None), _fields(tree[3], parent_id=5), _fields(tree[2], parent_id=9)],
+    })
+    assert response.status_code == 200, response.text
+    assert _paths(db, user.id)[10] == "/9/2/5/3/"
+    _assert_consistent(db, user.id)
@@ -0,0 +1,144 @@
+"""Concurrent subtree deletes on Postgres: no cross-owner blocking, no deadlocks, no orphans.
+
+Needs TEST_POSTGRES_URL; skipped otherwise.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from psycopg2 import errors as pg_errors
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app import importer, models
+from app.services import FamilyTreeService
+from benchmarks.common import synthetic_records
+
+OWNER_PREFIX = "test_concurrent_deletes_"
+TREE_SIZE = 400
+MAX_WAIT_SECONDS = 1.0
+
+
+@pytest.fixture
+def sessions(pg_engine):
+    Session = sessionmaker(bind=pg_engine, autoflush=False)
+    _cleanup(Session)
+    yield Session
+    _cleanup(Session)
+
+
+def _cleanup(Session) -> None:
+    with Session() as db:
+        owners = db.query(models.User.id).filter(models.User.username.like(OWNER_PREFIX + "%")).scalar_subquery()
+        db.query(models.Person).filter(models.Person.owner_id.in_(owners)).delete(synchronize_session=False)
+        db.query(models.User).filter(models.User.username.like(OWNER_PREFIX + "%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def _create_owner(Session, index: int) -> int:
+    with Session() as db:
+        user = models.User(username=f"{OWNER_PREFIX}{index}", password_hash="-", is_admin=False)
+        db.add(user)
+        db.flush()
+        importer.import_records(db, user.id, synthetic_records(TREE_SIZE))
+        db.commit()
+        return user.id
+
+
+def _person_ids(Session, owner_id: int) -> list:
+    with Session() as db:
+        return [row[0] for row in db.query(models.Person.id).filter(models.Person.owner_id == owner_id)]
+
+
+def _delete(Session, owner_id: int, person_id: int, lock_timeout: str = "5s", hold: float = 0,
+            deleted: threading.Event = None, commit: bool = True) -> float:
+    """What DELETE /api/persons/{id} does, in its own transaction; returns seconds spent deleting."""
+    with Session() as db:
+        db.execute(text(f"SET LOCAL lock_timeout = '{lock_timeout}'"))
+        person = db.get(models.Person, person_id)
+        if person is None:  # already deleted with an ancestor
+            return 0.0
+        start = time.perf_counter()
+        models.bump_tree_version(db, owner_id)
+        FamilyTreeService(db, owner_id=owner_id).delete_subtree(person)
+        elapsed = time.perf_counter() - start
+        if deleted is not None:
+            deleted.set()
+        time.sleep(hold)
+        if commit:
+            db.commit()
+        return elapsed
+
+
+def _add_child(Session, owner_id: int, parent_id: int) -> None:
+    """What POST /api/persons does for a child of parent_id."""
+    with Session() as db:
+        db.execute(text("SET LOCAL lock_timeout = '5s'"))
+        if db.get(models.Person, parent_id) is None:
+            return
+        models.bump_tree_version(db, owner_id)
+        db.add(models.Person(owner_id=owner_id, parent_id=parent_id, first_name="New",
+                             birth_date=date(2000, 1, 1), gender="other"))
+        db.commit()
+
+
+def test_deletes_of_different_owners_do_not_block(sessions):
+    owner_a, owner_b = _create_owner(sessions, 0), _create_owner(sessions, 1)
+    root_a, root_b = min(_person_ids(sessions, owner_a)), min(_person_ids(sessions, owner_b))
+
+    a_deleted = threading.Event()
+    holder = threading.Thread(target=_delete, args=(sessions, owner_a, root_a),
+                              kwargs={"hold": 2 * MAX_WAIT_SECONDS, "deleted": a_deleted, "commit": False})
+    holder.start()
+    try:
+        assert a_deleted.wait(10)
+        # Fails with LockNotAvailable if B has to wait for A's uncommitted delete
+        waited = _delete(sessions, owner_b, root_b, lock_timeout=f"{int(MAX_WAIT_SECONDS * 1000)}ms", commit=False)
+    finally:
+        holder.join()
+    assert waited < MAX_WAIT_SECONDS
+
+
+def test_concurrent_deletes_and_inserts_leave_no_orphans_or_deadlocks(sessions):
+    owners = [_create_owner(sessions, i) for i in range(3)]
+    rng = random.Random(9)
+    jobs = []
+    for owner_id in owners:
+        ids = sorted(_person_ids(sessions, owner_id))[1:]  # keep the roots, so subtrees overlap
+        for person_id in rng.sample(ids, 40):
+            jobs.append((_delete, owner_id, person_id))
+        for parent_id in rng.sample(ids, 40):
+            jobs.append((_add_child, owner_id, parent_id))
+    rng.shuffle(jobs)
+
+    def run(job):
+        action, owner_id, person_id = job
+        try:
+            action(sessions, owner_id, person_id)
+        except IntegrityError:
+            return None  # child of a parent deleted meanwhile: rejected by the foreign key, as it should be
+        except DBAPIError as e:
+            return e.orig
+        return None
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        failures = [error for error in pool.map(run, jobs) if error is not None]
+    assert not [e for e in failures if isinstance(e, pg_errors.DeadlockDetected)], failures
+    assert not failures, failures
+
+    with sessions() as db:
+        orphans = db.execute(text(
+            "SELECT count(*) FROM persons c LEFT JOIN persons p ON p.id = c.parent_id "
+            "WHERE c.parent_id IS NOT NULL AND p.id IS NULL"
+        )).scalar()
+        # Every lineage_path must still be its parent's path plus the parent id
+        stale_paths = db.execute(text(
+            "SELECT count(*) FROM persons c JOIN persons p ON p.id = c.parent_id "
+            "WHERE c.lineage_path <> p.lineage_path || p.id || '/'"
+        )).scalar()
+    assert orphans == 0
+    assert stale_paths == 0
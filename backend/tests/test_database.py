@@ -0,0 +1,14 @@
+"""Pool metrics report the capacity each engine was built with."""
+from app import database
+
+
+def test_pool_capacity_uses_the_configured_overflow(tmp_path):
+    before = database.pool_metrics.snapshot()["capacity"]
+    engine = database.create_db_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=database.TimedQueuePool, pool_size=2, max_overflow=3
+    )
+    try:
+        assert database.pool_metrics.snapshot()["capacity"] == before + 5
+    finally:
+        database.pool_metrics.pools = [t for t in database.pool_metrics.pools if t[0] is not engine.pool]
+        engine.dispose()
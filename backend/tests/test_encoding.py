@@ -0,0 +1,65 @@
+"""encoding.dumps: orjson's bytes at any nesting depth, so deep family lines still serialize."""
+import json
+import sys
+from datetime import date
+from decimal import Decimal
+
+import orjson
+import pytest
+
+from app.encoding import ORJSON_MAX_DEPTH, _dumps_deep, dumps
+from app.services import MAX_SUBTREE_DEPTH
+from tests.conftest import add_tree
+
+GENERATIONS = 1200  # deeper than orjson's limit and than the old stdlib fallback could go
+
+
+def _loads_deep(body: bytes):
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(10 * GENERATIONS)  # json.loads recurses like the old encoder did
+    try:
+        return json.loads(body)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def _generations(tree: dict) -> int:
+    count = 0
+    while tree is not None:
+        count += 1
+        tree = tree["children"][0] if tree["children"] else None
+    return count
+
+
+def test_deep_encoding_matches_orjson():
+    value = {"a": [1, 2.5, None, True, {"b": date(2020, 1, 2), "c": 'x"y'}], "t": (1, 2), "e": [], "d": {}}
+    assert _dumps_deep(value) == orjson.dumps(value)
+    nested = []
+    for _ in range(ORJSON_MAX_DEPTH - 2):
+        nested = [nested]
+    assert _dumps_deep(nested) == orjson.dumps(nested)
+    assert dumps({"v": [Decimal("1.5")]}) == b'{"v":["1.5"]}'
+
+
+def test_very_deep_nesting():
+    chain = {"id": 0, "children": []}
+    node = chain
+    for i in range(1, 5 * GENERATIONS):
+        child = {"id": i, "children": []}
+        node["children"].append(child)
+        node = child
+    ids = range(5 * GENERATIONS)
+    expected = b"".join(b'{"id":%d,"children":[' % i for i in ids) + b"]}" * len(ids)
+    assert dumps(chain) == expected
+
+
+@pytest.mark.parametrize("params, generations", [
+    ({}, GENERATIONS),
+    ({"depth": MAX_SUBTREE_DEPTH}, MAX_SUBTREE_DEPTH + 1),
+    ({"layout": "radial"}, GENERATIONS),
+])
+def test_deep_family_line_over_the_api(client, db, user, params, generations):
+    add_tree(db, user.id, GENERATIONS, branching=1)
+    response = client.get("/api/tree", params=params)
+    assert response.status_code == 200
+    assert _generations(_loads_deep(response.content)) == generations
@@ -0,0 +1,58 @@
+"""POST /api/import: malformed files are 400s or skipped records, never 500s."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import func
+
+from app import importer, models
+from app.database import SessionLocal
+from benchmarks.common import synthetic_records
+
+PERSON = {"first_name": "Ann", "birth_date": "1900-01-01", "gender": "female"}
+
+
+def _import(client, name: str, content: str):
+    return client.post("/api/import", files={"file": (name, content.encode("utf-8"))})
+
+
+@pytest.mark.parametrize("refs", [{"id": [1]}, {"id": {"a": 1}}, {"id": True}, {"id": 1, "parent_id": [2]},
+                                  {"id": 1, "parent_id": 1.5}])
+def test_json_refs_must_be_strings_or_integers(client, refs):
+    response = _import(client, "tree.json", json.dumps([dict(PERSON, **refs), dict(PERSON, id=7)]))
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
+    assert response.json()["skipped"] == 1
+
+
+def test_unparseable_files_are_400(client):
+    assert _import(client, "tree.json", '[{"first_name": ').status_code == 400
+    too_long = "first_name,birth_date,gender\n" + '"' + "x" * 200_000 + '",1900-01-01,male\n'  # csv.Error
+    response = _import(client, "tree.csv", too_long)
+    assert response.status_code == 400
+    assert "line" in response.json()["detail"]
+
+
+def test_reserve_ids_needs_the_sqlite_write_lock(db):
+    with pytest.raises(RuntimeError):
+        importer.reserve_ids(db, 3)
+
+
+def test_concurrent_sqlite_imports_get_distinct_ids(db):
+    owners = []
+    for i in range(4):
+        owner = models.User(username=f"owner{i}", password_hash="-")
+        db.add(owner)
+        db.flush()
+        owners.append(owner.id)
+    db.commit()
+
+    def run(owner_id):
+        with SessionLocal() as session:
+            importer.import_records(session, owner_id, synthetic_records(500), batch_size=100)
+            session.commit()
+
+    with ThreadPoolExecutor(max_workers=len(owners)) as pool:
+        list(pool.map(run, owners))
+    counts = dict(db.query(models.Person.owner_id, func.count()).group_by(models.Person.owner_id).all())
+    assert counts == {owner_id: 500 for owner_id in owners}
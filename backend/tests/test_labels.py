@@ -0,0 +1,82 @@
+"""Label offsets are computed on the sunburst FamilyTreeChart.js draws."""
+import math
+
+import pytest
+
+from app.labels import CANDIDATES, label_box, resolve_collisions, rotated_bounds
+from app.layout import sunburst_layout
+from app.services import FamilyTreeService, FlatTree
+from benchmarks.common import as_rows, synthetic_persons
+from tests.conftest import add_tree
+
+
+def test_sunburst_layout_matches_the_chart():
+    # root -> a, b; a -> c, d, e (breadth-first)
+    layout = sunburst_layout([-1, 0, 0, 1, 1, 1], [0, 1, 1, 2, 2, 2])
+    assert layout["start_angle"].tolist() == pytest.approx([0, 0, math.pi, 0, math.pi / 3, 2 * math.pi / 3])
+    assert layout["end_angle"].tolist() == pytest.approx([2 * math.pi, math.pi, 2 * math.pi, math.pi / 3,
+                                                          2 * math.pi / 3, math.pi])
+    assert layout["radius"].tolist() == [20, 80, 80, 160, 160, 160]  # ring midpoints of 40 + 80 * (g - 1)
+    # Angles run clockwise from 12 o'clock, so b sits at 9 o'clock
+    assert (layout["x"][0], layout["y"][0]) == pytest.approx((0, -20))
+    assert (layout["x"][1], layout["y"][1]) == pytest.approx((80, 0))
+    assert (layout["x"][2], layout["y"][2]) == pytest.approx((-80, 0))
+    # Labels between 90 and 270 degrees (exclusive) are flipped upright: e at 150 degrees
+    assert layout["rotation"].tolist() == pytest.approx([0, math.pi / 2, 3 * math.pi / 2, math.pi / 6, math.pi / 2,
+                                                         -math.pi / 6])
+
+
+def test_rotated_label_bounds():
+    width, top, bottom = label_box("Abcdefghij", None, "10", "Arial")
+    assert (width, top, bottom) == pytest.approx((55, -10, 0))
+    cx, cy, w, h = rotated_bounds([100, 100], [0, 0], [0, math.pi / 2], [(width, top, bottom)] * 2)
+    assert (cx[0], cy[0], w[0], h[0]) == pytest.approx((100, -5, 55, 10))
+    assert (cx[1], cy[1], w[1], h[1]) == pytest.approx((105, 0, 10, 55))  # reads top to bottom
+
+
+@pytest.mark.parametrize("count", [13, 400])
+def test_suggested_offsets_separate_the_drawn_labels(client, db, user, count):
+    persons = add_tree(db, user.id, count, branching=3)
+    response = client.get("/api/tree/label-offsets")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["kept"] == 0
+
+    # Re-place every label where the chart would draw it, with the suggested offsets
+    flat = FamilyTreeService(db, owner_id=user.id).build_flat_tree()
+    layout = sunburst_layout(flat.parent_index, flat.generation)
+    boxes = [label_box(p.first_name, p.birth_date, p.font_size, p.font_family, root=i == 0)
+             for i, p in enumerate(flat.persons)]
+    cx, cy, w, h = rotated_bounds(layout["x"], layout["y"], layout["rotation"], boxes)
+    offsets = {o["id"]: (o["label_offset_x"], o["label_offset_y"]) for o in body["offsets"]}
+    unresolved = set(body["unresolved"])
+    placed = []
+    for i, p in enumerate(flat.persons):
+        if p.id in unresolved:
+            continue
+        dx, dy = offsets.get(p.id, (0, 0))
+        placed.append((cx[i] + dx - w[i] / 2, cy[i] + dy - h[i] / 2, cx[i] + dx + w[i] / 2, cy[i] + dy + h[i] / 2))
+    assert len(placed) + len(unresolved) == len(persons)
+    for i, a in enumerate(placed):
+        for b in placed[i + 1:]:
+            # Offsets are rounded to 0.1 px
+            assert not (a[0] < b[2] - 0.1 and b[0] < a[2] - 0.1 and a[1] < b[3] - 0.1 and b[1] < a[3] - 0.1)
+
+
+def test_labels_that_do_not_fit_are_pushed_outward():
+    rows = as_rows(synthetic_persons(1000))
+    flat = FlatTree.from_persons(rows, rows[0])
+    layout = sunburst_layout(flat.parent_index, flat.generation)
+    boxes = [label_box(p.first_name, p.birth_date, p.font_size, p.font_family, root=i == 0)
+             for i, p in enumerate(flat.persons)]
+    cx, cy, w, h = rotated_bounds(layout["x"], layout["y"], layout["rotation"], boxes)
+    _, _, nearby_only = resolve_collisions(cx, cy, w, h, {})
+    dx, dy, unresolved = resolve_collisions(cx, cy, w, h, {}, layout["mid_angle"])
+    assert len(nearby_only) > 700
+    assert len(unresolved) < 50
+    # Every offset is a nearby candidate or a step straight out from the centre
+    for i in set(range(len(dx))) - set(unresolved):
+        if (dx[i] / w[i], dy[i] / h[i]) in {(float(fx), float(fy)) for fx, fy in CANDIDATES}:
+            continue
+        assert dx[i] * layout["x"][i] + dy[i] * layout["y"][i] > 0
+        assert math.atan2(dx[i], -dy[i]) == pytest.approx(math.atan2(layout["x"][i], -layout["y"][i]))
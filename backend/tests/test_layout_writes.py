@@ -0,0 +1,126 @@
+"""Coalesced layout edits: read-your-writes, retry on failure, only written ids published."""
+import threading
+
+import pytest
+
+from app import models
+from app.layout_writes import LayoutWriteBuffer
+from tests.conftest import add_tree
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, owner_id, version, edits):
+        self.calls.append((owner_id, version, edits))
+
+
+def _color(db, person_id):
+    db.expire_all()
+    return db.get(models.Person, person_id).color
+
+
+def test_flush_waits_for_a_write_in_flight(db, user):
+    add_tree(db, user.id, 3)
+    started, release = threading.Event(), threading.Event()
+
+    class SlowBuffer(LayoutWriteBuffer):
+        def _write(self, owner_id, pending):
+            started.set()
+            release.wait(5)
+            return super()._write(owner_id, pending)
+
+    buffer = SlowBuffer(delay=60)
+    buffer.add(user.id, [(1, {"color": "#111111"})])
+    writer = threading.Thread(target=buffer.flush, args=(user.id,))
+    writer.start()
+    assert started.wait(5)
+
+    reader = threading.Thread(target=buffer.flush, args=(user.id,))
+    reader.start()
+    reader.join(0.2)
+    assert reader.is_alive()  # still waiting for the uncommitted write
+    assert buffer.pending(user.id)
+    release.set()
+    reader.join(5)
+    writer.join(5)
+    assert not reader.is_alive()
+    assert _color(db, 1) == "#111111"
+
+
+def test_failed_write_is_queued_again(db, user):
+    add_tree(db, user.id, 3)
+    failures = [RuntimeError("database went away")]
+
+    class FlakyBuffer(LayoutWriteBuffer):
+        def _write(self, owner_id, pending):
+            if failures:
+                raise failures.pop()
+            return super()._write(owner_id, pending)
+
+    published = Recorder()
+    buffer = FlakyBuffer(delay=60, on_flush=published)
+    buffer.add(user.id, [(1, {"color": "#111111", "label_offset_x": 4.0})])
+    with pytest.raises(RuntimeError):
+        buffer.flush(user.id)
+    assert buffer.pending(user.id)
+    buffer.add(user.id, [(1, {"color": "#222222"})])  # newer edit wins over the failed one
+    assert buffer.flush(user.id) == 1
+    assert published.calls[0][2] == {1: {"color": "#222222", "label_offset_x": 4.0}}
+    assert _color(db, 1) == "#222222"
+
+
+def test_only_written_ids_are_published(db, user):
+    add_tree(db, user.id, 3)
+    other = models.User(username="bob", password_hash="-")
+    db.add(other)
+    db.flush()
+    add_tree(db, other.id, 2, first_id=100)
+
+    published = Recorder()
+    buffer = LayoutWriteBuffer(delay=60, on_flush=published)
+    buffer.add(user.id, [(2, {"color": "#333333"}), (100, {"color": "#333333"}), (999, {"color": "#333333"})])
+    assert buffer.flush(user.id) == 1
+    assert [edits for _, _, edits in published.calls] == [{2: {"color": "#333333"}}]
+    assert _color(db, 100) != "#333333"
+
+    buffer.add(user.id, [(999, {"color": "#444444"})])
+    assert buffer.flush(user.id) == 0
+    assert len(published.calls) == 1  # nothing written, nothing published
+
+
+def test_background_failure_is_logged_and_retried(db, user, caplog):
+    add_tree(db, user.id, 2)
+    failures = [RuntimeError("boom")]
+    done = threading.Event()
+
+    class FlakyBuffer(LayoutWriteBuffer):
+        def _write(self, owner_id, pending):
+            if failures:
+                raise failures.pop()
+            result = super()._write(owner_id, pending)
+            done.set()
+            return result
+
+    buffer = FlakyBuffer(delay=0.01)
+    buffer.add(user.id, [(1, {"color": "#555555"})])
+    assert done.wait(5)
+    assert "failed to save" in caplog.text
+    assert _color(db, 1) == "#555555"
+
+
+def test_layout_edit_is_visible_to_the_next_read(client, db, user):
+    add_tree(db, user.id, 3)
+    assert client.post("/api/persons/layout", json=[{"id": 2, "label_offset_x": 12.5}]).status_code == 202
+    assert client.get("/api/persons/2").json()["label_offset_x"] == 12.5
+
+
+@pytest.mark.parametrize("path", ["/api/tree?depth=1", "/api/tree?root_id=1", "/api/persons/1/descendants",
+                                  "/api/persons/5/ancestors"])
+def test_layout_edit_is_visible_to_tree_reads(client, db, user, path):
+    add_tree(db, user.id, 6)  # 1 -> 2, 3, 4; 2 -> 5, 6
+    assert client.post("/api/persons/layout", json=[{"id": 2, "color": "#123456"}]).status_code == 202
+    body = client.get(path).json()
+    persons = body["children"] if isinstance(body, dict) else body
+    assert {p["id"]: p["color"] for p in persons}[2] == "#123456"
@@ -0,0 +1,136 @@
+"""Query-plan regression check: no tree, lineage, paging or delete query scans persons sequentially.
+
+Seeds an owner plus noise owners (the checked owner holds 1 / (NOISE_OWNERS + 1) of the
+rows), runs each service query, EXPLAINs every statement it sent and fails on a
+sequential scan of persons. Runs on the SQLite test database (EXPLAIN QUERY PLAN, "SCAN",
+also of a whole index) and, with TEST_POSTGRES_URL, on a migrated Postgres (EXPLAIN, "Seq Scan").
+"""
+import re
+from contextlib import contextmanager
+from typing import List
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app import database, importer, models
+from app.pagination import persons_page_statement
+from app.services import FamilyTreeService
+from benchmarks.common import synthetic_records
+
+OWNER_PREFIX = "test_query_plans_"
+# Postgres picks a Seq Scan on small tables whatever the indexes, so it needs real sizes
+PERSONS_PER_OWNER = {"sqlite": 2000, "postgresql": 10000}
+NOISE_OWNERS = 9
+_SQLITE_SCAN = re.compile(r"^SCAN (persons\w*)")
+
+
+@contextmanager
+def _captured(engine, statements: List[tuple]):
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith(("EXPLAIN", "SAVEPOINT", "RELEASE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def _sequential_scans(db, statement: str, parameters) -> List[str]:
+    """Plan lines that read persons without an index."""
+    if db.get_bind().dialect.name == "postgresql":
+        plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        nodes, found = [plan[0]["Plan"]], []
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "persons":
+                found.append(f"Seq Scan on persons {node.get('Alias', '')} (filter: {node.get('Filter', '-')})")
+            nodes.extend(node.get("Plans", ()))
+        return found
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    # SEARCH is an index lookup; SCAN reads the whole table, also "USING COVERING INDEX"
+    return [row[-1] for row in rows if _SQLITE_SCAN.match(row[-1])]
+
+
+def _cleanup(Session) -> None:
+    with Session() as db:
+        owners = db.query(models.User).filter(models.User.username.like(OWNER_PREFIX + "%"))
+        db.query(models.Person).filter(
+            models.Person.owner_id.in_(owners.with_entities(models.User.id).scalar_subquery())
+        ).delete(synchronize_session=False)
+        owners.delete(synchronize_session=False)
+        db.commit()
+
+
+def _seed(Session, size: int) -> int:
+    """Create the checked owner plus noise owners; returns the checked owner's id."""
+    with Session() as db:
+        owner_ids = []
+        for index in range(NOISE_OWNERS + 1):
+            user = models.User(username=f"{OWNER_PREFIX}{index}", password_hash="-", is_admin=False)
+            db.add(user)
+            db.flush()
+            importer.import_records(db, user.id, synthetic_records(size))
+            owner_ids.append(user.id)
+        db.commit()
+        db.execute(text("ANALYZE"))
+        db.commit()
+        return owner_ids[0]
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def seeded(request):
+    """(engine, Session, owner_id) on a seeded schema: created on SQLite, migrated on Postgres."""
+    if request.param == "postgresql":
+        engine = request.getfixturevalue("pg_engine")
+    else:
+        engine = database.engine
+        database.Base.metadata.drop_all(bind=engine)
+        database.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    _cleanup(Session)
+    yield engine, Session, _seed(Session, PERSONS_PER_OWNER[request.param])
+    _cleanup(Session)
+
+
+def _scenarios(service: FamilyTreeService, owner_id: int) -> dict:
+    db = service.db
+    owned = models.Person.owner_id == owner_id
+    root = service.find_root()
+    middle = db.query(models.Person).filter(owned, models.Person.lineage_path.like(f"/{root.id}/%/")).first()
+    leaf = db.query(models.Person).filter(owned).order_by(models.Person.id.desc()).first()
+    return {
+        "find_root": service.find_root,
+        "get_children": lambda: service.get_children(middle.id),
+        "load_persons": service.load_persons,
+        "subtree depth=3": lambda: service.build_subtree_data(middle.id, 3),
+        "whole subtree": lambda: service.build_subtree_data(middle.id),
+        "descendants": lambda: service.load_descendants(middle),
+        "ancestors": lambda: service.load_ancestors(leaf),
+        "persons page by id": lambda: db.execute(persons_page_statement(owned, ["id"], "id", [middle.id], 100)).all(),
+        "persons page by name": lambda: db.execute(
+            persons_page_statement(owned, ["id"], "name", [leaf.last_name, leaf.first_name, leaf.id], 100)
+        ).all(),
+        "delete subtree": lambda: service.delete_subtree(middle),
+    }
+
+
+@pytest.mark.parametrize("scenario", [
+    "find_root", "get_children", "load_persons", "subtree depth=3", "whole subtree", "descendants", "ancestors",
+    "persons page by id", "persons page by name", "delete subtree",
+])
+def test_no_sequential_scans(seeded, scenario):
+    engine, Session, owner_id = seeded
+    with Session() as db:
+        run = _scenarios(FamilyTreeService(db, owner_id=owner_id), owner_id)[scenario]
+        statements: List[tuple] = []
+        with _captured(engine, statements):
+            run()
+        try:
+            assert statements
+            scans = [scan for statement, params in statements for scan in _sequential_scans(db, statement, params)]
+            assert not scans, scans
+        finally:
+            db.rollback()  # the delete scenario must not change the data
@@ -0,0 +1,23 @@
+"""LcaIndexStore reuse and eviction, and /api/relationship answers."""
+from app.relationship import LcaIndexStore
+from tests.conftest import add_tree
+
+
+def test_store_reuses_unchanged_structure_and_evicts_least_recent_owner():
+    store = LcaIndexStore(max_owners=2)
+    links = [(1, None), (2, 1), (3, 1)]
+    first = store.get(1, links)
+    assert store.get(1, list(links)) is first
+    assert store.get(1, links + [(4, 2)]) is not first
+
+    store.get(2, links)
+    store.get(1, links)  # owner 1 is now the most recently used
+    store.get(3, links)
+    assert list(store._indexes) == [1, 3]
+
+
+def test_relationship_endpoint(client, db, user):
+    add_tree(db, user.id, 13, branching=3)  # 1 -> 2..4, 2 -> 5..7, 3 -> 8..10, 4 -> 11..13
+    kinship = lambda a, b: client.get("/api/relationship", params={"a": a, "b": b}).json()["relationship"]
+    assert kinship(5, 8) == "first cousin"
+    assert kinship(1, 5) in ("grandfather", "grandmother", "grandparent")
@@ -0,0 +1,112 @@
+"""Name search: tier order everywhere, and on Postgres index-ordered plans scoped to the owner."""
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app import importer, models
+from app.search import postgres_tiers, search_persons
+from benchmarks.common import synthetic_records
+
+OWNER_PREFIX = "test_search_"
+
+
+def _add(db, owner_id: int, *names) -> None:
+    for first_name, last_name in names:
+        db.add(models.Person(owner_id=owner_id, first_name=first_name, last_name=last_name,
+                             birth_date=date(1950, 1, 1), gender="other"))
+    db.commit()
+
+
+def test_tiers_come_in_order(db, user):
+    _add(db, user.id, ("Anna", "Berg"), ("Ann", "Zorn"), ("Bert", "Annan"), ("Eva", "Johanson"), ("Zed", "Quill"))
+    hits = search_persons(db, user.id, "ann")
+    assert [(hit["first_name"], hit["match"]) for hit in hits] == [
+        ("Ann", "prefix"), ("Anna", "prefix"), ("Bert", "last_name"),
+    ]
+    assert [hit["first_name"] for hit in search_persons(db, user.id, "ann", limit=2)] == ["Ann", "Anna"]
+    assert [(hit["first_name"], hit["match"]) for hit in search_persons(db, user.id, "johansen")] == [("Eva", "fuzzy")]
+    assert search_persons(db, user.id, "johansen", fuzzy=False) == []
+
+
+def test_prefix_order_is_code_point_order(db, user):
+    # The same order as Postgres' COLLATE "C" keys: "anna b" < "anna-b" < "annab" < "annä"
+    _add(db, user.id, ("Annä", None), ("Annab", None), ("Anna-b", None), ("Anna", "B"))
+    assert [hit["first_name"] for hit in search_persons(db, user.id, "anna")] == ["Anna", "Anna-b", "Annab", "Annä"]
+
+
+def test_other_owners_are_not_searched(client, db, user):
+    other = models.User(username="bob", password_hash="-", is_admin=False)
+    db.add(other)
+    db.commit()
+    _add(db, other.id, ("Anna", "Berg"))
+    assert client.get("/api/persons/search", params={"q": "anna"}).json() == []
+
+
+@pytest.fixture(scope="module")
+def pg_owner(pg_engine):
+    """A Postgres session factory and an owner among noise owners, ANALYZEd."""
+    Session = sessionmaker(bind=pg_engine, autoflush=False)
+
+    def cleanup():
+        with Session() as db:
+            owners = db.query(models.User.id).filter(models.User.username.like(OWNER_PREFIX + "%")).scalar_subquery()
+            db.query(models.Person).filter(models.Person.owner_id.in_(owners)).delete(synchronize_session=False)
+            db.query(models.User).filter(models.User.username.like(OWNER_PREFIX + "%")).delete(
+                synchronize_session=False
+            )
+            db.commit()
+
+    cleanup()
+    with Session() as db:
+        owner_ids = []
+        for index in range(10):
+            user = models.User(username=f"{OWNER_PREFIX}{index}", password_hash="-", is_admin=False)
+            db.add(user)
+            db.flush()
+            importer.import_records(db, user.id, synthetic_records(5000))
+            owner_ids.append(user.id)
+        db.commit()
+        db.execute(text("ANALYZE persons"))
+        db.commit()
+    yield Session, owner_ids[0]
+    cleanup()
+
+
+def _plan_nodes(db, stmt) -> list:
+    compiled = stmt.compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes, found = [plan[0]["Plan"]], []
+    while nodes:
+        node = nodes.pop()
+        found.append(node)
+        nodes.extend(node.get("Plans", ()))
+    return found
+
+
+@pytest.mark.parametrize("q, match, index", [
+    ("person1", "prefix", "ix_persons_owner_search_name"),
+    ("smi", "last_name", "ix_persons_owner_search_last_name"),
+])
+def test_postgres_prefix_tiers_read_the_index_in_order(pg_owner, q, match, index):
+    Session, owner_id = pg_owner
+    with Session() as db:
+        stmt = dict(postgres_tiers(owner_id, q))[match].limit(10)
+        nodes = _plan_nodes(db, stmt)
+        scans = [n for n in nodes if n["Node Type"] in ("Index Scan", "Index Only Scan") and n.get("Index Name") == index]
+        assert scans, nodes
+        assert not [n for n in nodes if "Sort" in n["Node Type"]], nodes
+        assert len(db.execute(stmt).all()) == 10
+
+
+def test_postgres_fuzzy_tier_is_owner_scoped_in_the_index(pg_owner):
+    Session, owner_id = pg_owner
+    with Session() as db:
+        nodes = _plan_nodes(db, dict(postgres_tiers(owner_id, "persn12"))["fuzzy"].limit(10))
+        scans = [n for n in nodes if n.get("Index Name") == "ix_persons_owner_search_name_trgm"]
+        assert scans, nodes
+        assert "owner_id" in scans[0]["Index Cond"]
@@ -0,0 +1,32 @@
+"""/api/tree must cost the same number of queries whatever the tree size (no N+1)."""
+import pytest
+
+from app.tree_cache import tree_cache
+from benchmarks.bench_suite import TREE_QUERY_BUDGET
+from benchmarks.common import QueryCounter
+from tests.conftest import add_tree
+
+
+@pytest.mark.parametrize("accept", ["application/json", "application/vnd.famtree.columnar+json"])
+@pytest.mark.parametrize("layout", [None, "radial"])
+def test_uncached_tree_query_count_is_constant(client, db, user, layout, accept):
+    client.get("/api/auth/me")  # cache the principal, so only tree queries are counted
+    counts = []
+    for size, first_id in ((1, 1), (100, 1000), (3000, 5000)):
+        add_tree(db, user.id, size, first_id=first_id)
+        tree_cache.clear()
+        with QueryCounter() as queries:
+            response = client.get("/api/tree", params={"layout": layout} if layout else {}, headers={"Accept": accept})
+        assert response.status_code == 200
+        counts.append(queries.count)
+    assert counts == [counts[0]] * len(counts), counts
+    assert 1 <= counts[0] <= TREE_QUERY_BUDGET
+
+
+def test_cached_tree_only_checks_the_version(client, db, user):
+    add_tree(db, user.id, 50)
+    client.get("/api/auth/me")
+    assert client.get("/api/tree").status_code == 200
+    with QueryCounter() as queries:
+        assert client.get("/api/tree").status_code == 200
+    assert queries.count == 1  # users.tree_version
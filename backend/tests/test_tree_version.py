@@ -0,0 +1,59 @@
+"""The tree version lives in the database, so writes from anywhere invalidate cached trees."""
+import asyncio
+
+from app import importer, models, schemas
+from app.changes import ChangeFeed
+from app.database import SessionLocal
+from tests.conftest import add_tree
+
+
+def test_write_outside_this_process_invalidates_etag(client, db, user):
+    add_tree(db, user.id, 10)
+    first = client.get("/api/tree")
+    etag = first.headers["ETag"]
+    assert client.get("/api/tree", headers={"If-None-Match": etag}).status_code == 304
+
+    # What import_data.py (or another worker) does: its own session, never touching tree_cache
+    with SessionLocal() as other:
+        root = other.query(models.Person).filter(models.Person.id == 1).one()
+        models.bump_tree_version(other, user.id)
+        root.first_name = "Renamed"
+        other.commit()
+
+    response = client.get("/api/tree", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Renamed"
+    assert int(response.headers["X-Tree-Version"]) > int(first.headers["X-Tree-Version"])
+
+
+def test_import_records_bumps_version(client, db, user):
+    add_tree(db, user.id, 3)
+    before = models.tree_version(db, user.id)
+    fields = schemas.PersonCreate(first_name="Imported", birth_date="1800-01-01", gender="male").model_dump()
+    result = importer.import_records(db, user.id, [importer.ImportRecord("x", None, fields)])
+    db.commit()
+    assert result.version == before + 1 == models.tree_version(db, user.id)
+
+
+def test_api_writes_bump_version(client, db, user):
+    add_tree(db, user.id, 3)
+    versions = [int(client.get("/api/tree").headers["X-Tree-Version"])]
+    assert client.patch("/api/persons/2", json={"first_name": "B"}).status_code == 200
+    versions.append(int(client.get("/api/tree").headers["X-Tree-Version"]))
+    assert client.patch("/api/persons/999", json={"first_name": "B"}).status_code == 404  # rolled back
+    assert client.delete("/api/persons/3").status_code == 200
+    versions.append(int(client.get("/api/tree").headers["X-Tree-Version"]))
+    assert versions == [0, 1, 2]
+
+
+def test_change_feed_resumes_only_without_gaps():
+    async def run():
+        feed = ChangeFeed()
+        feed.publish(1, 2, [{"op": "reload"}])
+        feed.publish(1, 1, [{"op": "reload"}])  # committed first, published late
+        assert [version for version, _ in feed.subscribe(1, 0, current=2).backlog] == [1, 2]
+        assert not feed.subscribe(1, 2, current=2).reset
+        assert feed.subscribe(1, 2, current=3).reset  # version 3 came from another process
+        assert feed.subscribe(1, 9, current=2).reset
+
+    asyncio.run(run())
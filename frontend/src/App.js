@@ -1,10 +1,11 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import './App.css';
 import FamilyTreeChart from './components/FamilyTreeChart';
 import FamilyMembers from './components/FamilyMembers';
 import { useAuth } from './context/AuthContext';
-import { getAuthHeaders } from './context/AuthContext';
+import { getAuthHeaders, getAuthToken } from './context/AuthContext';
+import { applyTreeChanges, indexTree } from './treeChanges';
 
 const apiUrl = process.env.REACT_APP_API_URL || (process.env.NODE_ENV === 'production' ? '' : 'http://localhost:8000');
 
@@ -13,6 +14,11 @@ function App() {
   const [treeData, setTreeData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [treeVersion, setTreeVersion] = useState(null); // X-Tree-Version of the first load
+  const treeRef = useRef(null);
+  const loadedVersion = useRef(0); // tree version treeRef reflects
+  const nodeIndex = useRef(new Map());
+  const streamOpen = useRef(false);
   const { logout, username, isAdmin } = useAuth();
   const navigate = useNavigate();
 
@@ -31,7 +37,11 @@ function App() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
       const data = await response.json();
+      treeRef.current = data;
+      loadedVersion.current = Number(response.headers.get('X-Tree-Version'));
+      nodeIndex.current = indexTree(data);
       setTreeData(data);
+      setTreeVersion((version) => version ?? response.headers.get('X-Tree-Version'));
       setError(null);
     } catch (err) {
       console.error('Error fetching family tree:', err);
@@ -46,8 +56,39 @@ function App() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Live updates: patch the loaded tree from the change stream instead of refetching it
+  useEffect(() => {
+    const token = getAuthToken();
+    if (treeVersion === null || !token) return undefined;
+    const params = new URLSearchParams({ access_token: token, since: treeVersion });
+    const source = new EventSource(`${apiUrl}/api/changes?${params}`);
+    source.onopen = () => { streamOpen.current = true; };
+    source.onerror = () => { streamOpen.current = false; }; // EventSource reconnects with Last-Event-ID
+    source.addEventListener('change', (e) => {
+      const { version, changes } = JSON.parse(e.data);
+      if (version <= loadedVersion.current) return; // already in the loaded tree
+      const tree = treeRef.current;
+      // A skipped version was written by another server process: reload instead of patching
+      if (!tree || version !== loadedVersion.current + 1 || !applyTreeChanges(tree, nodeIndex.current, changes)) {
+        fetchFamilyTree();
+        return;
+      }
+      loadedVersion.current = version;
+      const next = { ...tree }; // new root object so the chart redraws
+      nodeIndex.current.set(next.id, next);
+      treeRef.current = next;
+      setTreeData(next);
+    });
+    source.addEventListener('reset', () => fetchFamilyTree());
+    return () => {
+      streamOpen.current = false;
+      source.close();
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [treeVersion]);
+
   const handleMemberChange = () => {
-    fetchFamilyTree();
+    if (!streamOpen.current) fetchFamilyTree();
   };
 
   const handleLogout = () => {
@@ -7,6 +7,8 @@ const FamilyMembers = ({ onMemberChange }) => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [editingId, setEditingId] = useState(null);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null); // null: no search, show all members
   const [formData, setFormData] = useState({
     first_name: '',
     birth_date: '',
@@ -42,6 +44,34 @@ const FamilyMembers = ({ onMemberChange }) => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Typeahead: ask the server (indexed name search) once typing pauses
+  useEffect(() => {
+    const q = searchQuery.trim();
+    if (!q) {
+      setSearchResults(null);
+      return undefined;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q, limit: '50' });
+        const response = await fetch(`${apiUrl}/api/persons/search?${params}`, {
+          headers: getAuthHeaders(),
+          signal: controller.signal
+        });
+        if (!response.ok) throw new Error('Search failed');
+        setSearchResults(await response.json());
+      } catch (err) {
+        if (err.name !== 'AbortError') setError(err.message);
+      }
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchQuery, members]);
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -157,6 +187,7 @@ const FamilyMembers = ({ onMemberChange }) => {
     return member.last_name ? `${member.first_name} ${member.last_name}` : member.first_name;
   };
 
+  const shownMembers = searchResults || members;
   const rootMember = members.find(m => m.parent_id == null);
   const handleEditRoot = () => {
     if (rootMember) handleEdit(rootMember);
@@ -355,7 +386,16 @@ const FamilyMembers = ({ onMemberChange }) => {
       </form>
 
       <div className="members-list">
-        <h2>All Family Members ({members.length})</h2>
+        <div className="members-list-header">
+          <h2>All Family Members ({members.length})</h2>
+          <input
+            type="search"
+            className="members-search"
+            placeholder="Search by name..."
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+          />
+        </div>
         <div className="members-table-container">
           <table className="members-table">
             <thead>
@@ -373,12 +413,12 @@ const FamilyMembers = ({ onMemberChange }) => {
               </tr>
             </thead>
             <tbody>
-              {members.length === 0 ? (
+              {shownMembers.length === 0 ? (
               <tr>
                 <td colSpan="10" className="no-data">No family members found</td>
               </tr>
               ) : (
-                members.map(member => (
+                shownMembers.map(member => (
                   <tr key={member.id}>
                     <td>{member.id}</td>
                     <td>{member.last_name ? `${member.first_name} ${member.last_name}` : member.first_name}</td>
@@ -42,6 +42,7 @@ const FamilyTreeChart = ({ data }) => {
     if (!data || data.id == null) return;
 
     const tree = JSON.parse(JSON.stringify(data));
+    // Mirrored by sunburst_layout in backend/app/layout.py (label offset suggestions)
     const RING_WIDTH = 80;
     const CENTER_RADIUS = 40;
 
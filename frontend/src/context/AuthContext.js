@@ -78,7 +78,11 @@ export function useAuth() {
   return ctx;
 }
 
+export function getAuthToken() {
+  return localStorage.getItem(TOKEN_KEY);
+}
+
 export function getAuthHeaders() {
-  const token = localStorage.getItem(TOKEN_KEY);
+  const token = getAuthToken();
   return token ? { Authorization: `Bearer ${token}` } : {};
 }
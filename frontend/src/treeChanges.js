@@ -0,0 +1,75 @@
+// Apply /api/changes diffs (see backend/app/changes.py) to the nested tree from /api/tree.
+// Nodes are patched in place through an id -> node index, so each change costs O(change).
+
+export function indexTree(tree) {
+  const index = new Map();
+  const stack = tree ? [tree] : [];
+  while (stack.length) {
+    const node = stack.pop();
+    index.set(node.id, node);
+    (node.children || []).forEach((child) => stack.push(child));
+  }
+  return index;
+}
+
+// Same order as the server: siblings by birth date, then id
+const byBirth = (a, b) => (a.birth_date < b.birth_date ? -1 : a.birth_date > b.birth_date ? 1 : a.id - b.id);
+
+function detach(node, index) {
+  const parent = index.get(node.parent_id);
+  if (parent) parent.children = parent.children.filter((child) => child.id !== node.id);
+}
+
+function attach(node, index) {
+  const parent = index.get(node.parent_id);
+  parent.children = [...parent.children.filter((child) => child.id !== node.id), node].sort(byBirth);
+}
+
+function walk(node, visit) {
+  const stack = [node];
+  while (stack.length) {
+    const current = stack.pop();
+    visit(current);
+    (current.children || []).forEach((child) => stack.push(child));
+  }
+}
+
+// Returns false if the changes can't be applied locally (the caller refetches /api/tree).
+export function applyTreeChanges(tree, index, changes) {
+  for (const change of changes) {
+    if (change.op === 'reload') return false;
+
+    if (change.op === 'add') {
+      const person = change.person;
+      if (person.parent_id == null) return false; // a new root may change which person is the root
+      const parent = index.get(person.parent_id);
+      if (!parent || index.has(person.id)) continue; // not in the loaded tree, or already applied
+      const node = { ...person, children: [], generation: parent.generation + 1 };
+      index.set(node.id, node);
+      attach(node, index);
+    } else if (change.op === 'update') {
+      const node = index.get(change.id);
+      if (!node) continue;
+      const { id, ...fields } = change.fields;
+      if ('parent_id' in fields && fields.parent_id !== node.parent_id) {
+        const parent = index.get(fields.parent_id);
+        if (!parent) return false; // moved to the root or out of the loaded tree
+        detach(node, index);
+        Object.assign(node, fields);
+        attach(node, index);
+        const shift = parent.generation + 1 - node.generation;
+        walk(node, (n) => { n.generation += shift; });
+      } else {
+        Object.assign(node, fields);
+        if ('birth_date' in fields && index.has(node.parent_id)) attach(node, index);
+      }
+    } else if (change.op === 'remove') {
+      const node = index.get(change.id);
+      if (!node) continue;
+      if (node === tree) return false;
+      detach(node, index);
+      walk(node, (n) => index.delete(n.id));
+    }
+  }
+  return true;
+}